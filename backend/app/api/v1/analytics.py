@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional
 from datetime import date
 
 from app.database import get_database
@@ -7,7 +8,10 @@ from app.core.dependencies import get_current_user
 from app.schemas.habit import (
     AnalyticsSummary, HeatmapResponse, SocialFeedResponse
 )
+from app.schemas.task import TaskAnalytics
 from app.services.habit_service import HabitService
+from app.services.task_analytics_service import TaskAnalyticsService
+from app.utils.exceptions import NotFoundException, ValidationException
 
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
@@ -118,3 +122,45 @@ async def get_social_feed(
         }
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/tasks", response_model=TaskAnalytics)
+async def get_task_analytics(
+    start_date: date = Query(..., description="Start date (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="End date (YYYY-MM-DD)"),
+    team_id: Optional[str] = Query(None, description="Report on a team you belong to"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get task productivity analytics for you or one of your teams.
+    
+    Returns:
+    - **throughput**: Tasks created and completed per day
+    - **cumulativeFlow**: Tasks in each status at the end of each day
+    - **totals**: Created, completed and reopened tasks in the range
+    - **leadTimeHours**: Average time from creation to done
+    - **cycleTimeHours**: Average time from first started to done
+    - **overdue**: Nightly snapshots of open overdue tasks
+    
+    Served from daily rollups, so long ranges are as cheap as short ones.
+    
+    - **start_date**: Start date (required)
+    - **end_date**: End date (required, at most 366 days after start)
+    - **team_id**: Team ID (optional; defaults to your own tasks)
+    """
+    analytics_service = TaskAnalyticsService(db)
+    
+    try:
+        return await analytics_service.get_task_analytics(
+            user_id=str(current_user["_id"]),
+            start_date=start_date,
+            end_date=end_date,
+            team_id=team_id
+        )
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
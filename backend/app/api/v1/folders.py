@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
+from typing import List, Optional
 
 from app.database import get_database
 from app.core.dependencies import get_current_user
-from app.schemas.folder import FolderCreate, FolderUpdate, FolderResponse, FolderShare
+from app.schemas.folder import (
+    FolderCreate, FolderUpdate, FolderResponse, FolderShare, FolderMove, FolderSubtreeCounts, FolderSummary
+)
 from app.schemas.common import MessageResponse
 from app.services.folder_service import FolderService
+from app.services.version_service import VersionService
 from app.utils.exceptions import NotFoundException, ValidationException
+from app.utils.etag import build_etag, etag_matches, set_etag_headers, not_modified_response
 
 
 router = APIRouter(prefix="/folders", tags=["Folders"])
@@ -15,14 +19,27 @@ router = APIRouter(prefix="/folders", tags=["Folders"])
 
 @router.get("", response_model=List[FolderResponse])
 async def get_folders(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get all folders for the current user."""
+    """
+    Get all folders for the current user.
+    
+    Supports conditional requests via `If-None-Match` (returns 304 when unchanged).
+    """
     folder_service = FolderService(db)
+    user_id = str(current_user["_id"])
+    
+    version = await VersionService(db).get_version(user_id, "folders")
+    etag = build_etag("folders", version)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    set_etag_headers(response, etag)
     
     try:
-        folders = await folder_service.get_folders(str(current_user["_id"]))
+        folders = await folder_service.get_folders(user_id)
         
         # Convert ObjectIds to strings
         for folder in folders:
@@ -33,6 +50,37 @@ async def get_folders(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/summary", response_model=FolderSummary)
+async def get_folder_summary(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get task counts by status and note counts for every folder of the current user.
+    
+    Each entry counts the tasks and notes directly in a folder and, in
+    `subtreeTasks`/`subtreeNotes`, everything nested below it; the entry with
+    `folderId: null` counts those not in any folder. Trashed items are not counted.
+    
+    Supports conditional requests via `If-None-Match` (returns 304 when unchanged).
+    """
+    folder_service = FolderService(db)
+    
+    try:
+        summary, key = await folder_service.get_summary(str(current_user["_id"]))
+        
+        etag = build_etag("folder_summary", *key)
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+        set_etag_headers(response, etag)
+        
+        return {"folders": summary}
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.post("", response_model=FolderResponse, status_code=status.HTTP_201_CREATED)
 async def create_folder(
     folder_data: FolderCreate,
@@ -44,6 +92,7 @@ async def create_folder(
     
     - **name**: Folder name (required)
     - **color**: Folder color (optional)
+    - **parentId**: Folder to nest it in (optional)
     """
     folder_service = FolderService(db)
     
@@ -54,6 +103,10 @@ async def create_folder(
         )
         folder["_id"] = str(folder["_id"])
         return folder
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -82,13 +135,70 @@ async def update_folder(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.post("/{folder_id}/move", response_model=FolderResponse)
+async def move_folder(
+    folder_id: str,
+    move_data: FolderMove,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Move a folder, with all its subfolders, under another folder.
+    
+    - **parentId**: New parent folder (null moves it to the top level)
+    
+    Tasks and notes stay in their folders and move with them.
+    """
+    folder_service = FolderService(db)
+    
+    try:
+        folder = await folder_service.move_folder(
+            folder_id=folder_id,
+            user_id=str(current_user["_id"]),
+            parent_id=move_data.parentId
+        )
+        folder["_id"] = str(folder["_id"])
+        return folder
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/{folder_id}/counts", response_model=FolderSubtreeCounts)
+async def get_folder_counts(
+    folder_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Count the subfolders, tasks and notes in a folder, including everything
+    nested below it. Trashed tasks and notes are not counted.
+    
+    List the contents with `GET /tasks` or `GET /notes` and
+    `folder_id=...&include_subfolders=true`.
+    """
+    folder_service = FolderService(db)
+    
+    try:
+        return await folder_service.count_subtree(folder_id, str(current_user["_id"]))
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.delete("/{folder_id}", response_model=MessageResponse)
 async def delete_folder(
     folder_id: str,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Delete a folder."""
+    """Delete a folder. Its subfolders move up to the deleted folder's parent."""
     folder_service = FolderService(db)
     
     try:
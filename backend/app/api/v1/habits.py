@@ -1,9 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 
 from app.database import get_database
 from app.core.dependencies import get_current_user
@@ -13,8 +11,12 @@ from app.schemas.habit import (
 )
 from app.schemas.common import MessageResponse
 from app.services.habit_service import HabitService
-from app.utils.exceptions import NotFoundException, ValidationException
-from app.utils.serializers import serialize_dates
+from app.services.version_service import VersionService
+from app.utils.exceptions import NotFoundException, ValidationException, PreconditionFailedException
+from app.utils.responses import FastJSONResponse
+from app.utils.etag import (
+    build_etag, etag_matches, set_etag_headers, not_modified_response, version_etag, parse_if_match
+)
 
 
 router = APIRouter(prefix="/habits", tags=["Habits"])
@@ -25,6 +27,7 @@ async def get_habits(
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     category: Optional[str] = Query(None, description="Filter by category"),
     date: Optional[date] = Query(None, description="Check completion status for this date"),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -37,26 +40,33 @@ async def get_habits(
     - **is_active**: Filter active/archived habits
     - **category**: Filter by category (health, fitness, productivity, etc.)
     - **date**: Check completion status for specific date (YYYY-MM-DD)
+    
+    Supports conditional requests via `If-None-Match` (returns 304 when unchanged).
     """
     habit_service = HabitService(db)
+    user_id = str(current_user["_id"])
+    
+    # Streaks and completedToday roll over with the calendar day
+    version = await VersionService(db).get_version(user_id, "habits")
+    etag = build_etag(
+        "habits", version, is_active, category, date,
+        datetime.utcnow().date(), datetime.now().date()
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
     
     try:
         habits = await habit_service.get_habits(
-            user_id=str(current_user["_id"]),
+            user_id=user_id,
             is_active=is_active,
             category=category,
             check_date=date
         )
         
-        # Serialize all data including dates recursively
-        habits = serialize_dates(habits)
-        
-        # Convert ObjectIds to strings (explicitly handled here too for safety)
-        for habit in habits:
-            habit["_id"] = str(habit["_id"])
-        
-        # Return JSON response directly
-        return JSONResponse(content={"habits": habits, "total": len(habits)})
+        # orjson renders ObjectId and dates directly
+        response = FastJSONResponse(content={"habits": habits, "total": len(habits)})
+        set_etag_headers(response, etag)
+        return response
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -72,7 +82,7 @@ async def get_heatmap(
     try:
         habit_service = HabitService(db)
         heatmap = await habit_service.get_heatmap_data(str(current_user["_id"]))
-        return JSONResponse(content=heatmap)
+        return FastJSONResponse(content=heatmap)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -102,7 +112,6 @@ async def create_habit(
             user_id=str(current_user["_id"]),
             habit_data=habit_data.model_dump()
         )
-        habit = serialize_dates(habit)
         habit["_id"] = str(habit["_id"])
         return habit
     except Exception as e:
@@ -112,16 +121,21 @@ async def create_habit(
 @router.get("/{habit_id}", response_model=HabitResponse)
 async def get_habit(
     habit_id: str,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get a single habit by ID with streak information."""
+    """
+    Get a single habit by ID with streak information.
+    
+    The ETag header carries the habit's version for use in If-Match on updates.
+    """
     habit_service = HabitService(db)
     
     try:
         habit = await habit_service.get_habit_by_id(habit_id, str(current_user["_id"]))
-        habit = serialize_dates(habit)
         habit["_id"] = str(habit["_id"])
+        response.headers["ETag"] = version_etag(habit)
         return habit
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -135,13 +149,18 @@ async def get_habit(
 async def update_habit(
     habit_id: str,
     habit_data: HabitUpdate,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Update a habit.
     
-    Only the habit owner can update. All fields are optional.
+    Only the habit owner can update. All fields are optional. Streaks are
+    not included in the response; fetch the habit to get them.
+    
+    Send the habit's ETag in If-Match to update only if nobody changed it
+    in the meantime (412 Precondition Failed otherwise).
     """
     habit_service = HabitService(db)
     
@@ -149,16 +168,18 @@ async def update_habit(
         habit = await habit_service.update_habit(
             habit_id=habit_id,
             user_id=str(current_user["_id"]),
-            habit_data=habit_data.model_dump(exclude_unset=True)
+            habit_data=habit_data.model_dump(exclude_unset=True),
+            expected_versions=parse_if_match(if_match)
         )
-        habit = serialize_dates(habit)
-        habit["_id"] = str(habit["_id"])
-        # Use JSONResponse
-        return JSONResponse(content=habit)
+        response = FastJSONResponse(content=habit)
+        response.headers["ETag"] = version_etag(habit)
+        return response
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except ValidationException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PreconditionFailedException as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -283,17 +304,13 @@ async def get_habit_logs(
             end_date=end_date
         )
         
-        # Serialize everything
-        habit = serialize_dates(habit)
-        logs = serialize_dates(logs)
-        
         result = {
             "habitId": habit_id,
             "habitName": habit["name"],
             "logs": logs,
             "total": len(logs)
         }
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=result)
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except ValidationException as e:
@@ -346,6 +363,8 @@ async def share_habit(
     - **userId**: User ID to share with (optional)
     - **email**: Email to share with (optional)
     - **accessType**: Access type - viewer or collaborator
+    
+    Streaks are not included in the response; fetch the habit to get them.
     """
     habit_service = HabitService(db)
     
@@ -1,27 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response, WebSocket, WebSocketDisconnect
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import Optional, List
+from typing import Optional, List, Union
 
+from app.config import settings
 from app.database import get_database
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, get_websocket_user
 from app.schemas.note import (
     NoteCreate, NoteUpdate, NotePinUpdate, NoteResponse, NoteList,
-    NoteInvite, NoteCollaboratorList
+    NoteInvite, NoteCollaboratorList, NoteView, NoteSummary, NoteSummaryList,
+    NoteContentPatch, NoteContentPatchResult, NoteVersionList, NoteVersionContent,
+    RelatedNoteList, DuplicateNoteGroupList
 )
 from app.schemas.common import MessageResponse
+from app.services.collab_service import CollabService, CLOSE_NOTE_GONE, CLOSE_UNAUTHENTICATED
+from app.services.markdown_renderer import MarkdownRenderer
+from app.services.note_history_service import NoteHistoryService
 from app.services.note_service import NoteService
-from app.utils.exceptions import NotFoundException, ValidationException
+from app.services.note_similarity_service import NoteSimilarityService
+from app.services.version_service import VersionService
+from app.utils.exceptions import NotFoundException, ValidationException, PreconditionFailedException
+from app.utils.etag import (
+    build_etag, etag_matches, set_etag_headers, not_modified_response, version_etag, parse_if_match
+)
+from app.utils.responses import FastJSONResponse, model_projection, trusted_documents
 
 
 router = APIRouter(prefix="/notes", tags=["Notes"])
 
 
-@router.get("", response_model=NoteList)
+def _list_model(view: NoteView) -> type:
+    """Get the per-note response model for a list view."""
+    return NoteSummary if view == NoteView.SUMMARY else NoteResponse
+
+
+@router.get("", response_model=Union[NoteSummaryList, NoteList])
 async def get_notes(
     folder_id: Optional[str] = Query(None, description="Filter by folder ID"),
+    include_subfolders: bool = Query(False, description="With folder_id, include notes in nested folders"),
     tags: Optional[List[str]] = Query(None, description="Filter by tags"),
+    match_all_tags: bool = Query(False, description="Require all tags instead of any"),
     is_pinned: Optional[bool] = Query(None, description="Filter by pinned status"),
     is_favorite: Optional[bool] = Query(None, description="Filter by favorite status"),
+    view: NoteView = Query(NoteView.SUMMARY, description="summary (excerpt, no content) or full"),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -29,55 +50,100 @@ async def get_notes(
     Get all notes for the current user.
     
     Optional filters:
-    - **folder_id**: Filter by folder
-    - **tags**: Filter by tags (can specify multiple)
+    - **folder_id**: Filter by folder (and its subfolders with `include_subfolders=true`)
+    - **tags**: Filter by tags (can specify multiple; any of them, or all of them with `match_all_tags=true`)
     - **is_pinned**: Filter pinned notes
     - **is_favorite**: Filter favorite notes
     
     Notes are returned with pinned notes first, then sorted by creation date (newest first).
+    
+    By default each note carries a short plain-text **excerpt** instead of its
+    content; load the full note from `GET /notes/{id}`, or pass `view=full`.
+    
+    Responses carry a weak ETag; send it back in `If-None-Match` to get
+    `304 Not Modified` when no note visible to you has changed.
     """
     note_service = NoteService(db)
+    user_id = str(current_user["_id"])
+    
+    version = await VersionService(db).get_version(user_id, "notes")
+    # Moving folders changes which notes a subtree holds without touching notes
+    folders_version = await VersionService(db).get_version(user_id, "folders") if include_subfolders else None
+    etag = build_etag(
+        "notes", version, folders_version, view.value, folder_id, include_subfolders,
+        sorted(tags or []), match_all_tags, is_pinned, is_favorite
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
     
     try:
         notes = await note_service.get_notes(
-            user_id=str(current_user["_id"]),
+            user_id=user_id,
             folder_id=folder_id,
+            include_subfolders=include_subfolders,
             tags=tags,
             is_pinned=is_pinned,
-            is_favorite=is_favorite
+            is_favorite=is_favorite,
+            projection=model_projection(_list_model(view)),
+            match_all_tags=match_all_tags
         )
         
-        # Convert ObjectIds to strings
-        for note in notes:
-            note["_id"] = str(note["_id"])
-        
-        return {"notes": notes, "total": len(notes)}
+        # Documents come from our own writes: skip NoteList re-validation
+        response = FastJSONResponse(content={
+            "notes": trusted_documents(notes, _list_model(view)),
+            "total": len(notes)
+        })
+        set_etag_headers(response, etag)
+        return response
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@router.get("/favorites", response_model=NoteList)
+@router.get("/favorites", response_model=Union[NoteSummaryList, NoteList])
 async def get_favorite_notes(
+    view: NoteView = Query(NoteView.SUMMARY, description="summary (excerpt, no content) or full"),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Get all favorite/starred notes for the current user.
     
-    Returns notes marked as favorite, with pinned notes first.
+    Returns notes marked as favorite, with pinned notes first, as summaries
+    unless `view=full`.
     """
     note_service = NoteService(db)
     
     try:
         notes = await note_service.get_favorite_notes(
-            user_id=str(current_user["_id"])
+            user_id=str(current_user["_id"]),
+            projection=model_projection(_list_model(view))
         )
         
-        # Convert ObjectIds to strings
-        for note in notes:
-            note["_id"] = str(note["_id"])
-        
-        return {"notes": notes, "total": len(notes)}
+        return FastJSONResponse(content={
+            "notes": trusted_documents(notes, _list_model(view)),
+            "total": len(notes)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/duplicates", response_model=DuplicateNoteGroupList)
+async def get_duplicate_notes(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Find groups of near-duplicate notes owned by the current user.
+    
+    Notes are compared by their word sequences, so copies with small edits
+    are grouped together. Notes are indexed in the background shortly after
+    they change.
+    """
+    similarity_service = NoteSimilarityService(db)
+    
+    try:
+        groups = await similarity_service.get_duplicate_groups(str(current_user["_id"]))
+        return {"groups": groups, "total": len(groups)}
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -116,19 +182,22 @@ async def create_note(
 @router.get("/{note_id}", response_model=NoteResponse)
 async def get_note(
     note_id: str,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Get a single note by ID with full content.
     
-    Supports Markdown or JSON-based Rich Text content.
+    Supports Markdown or JSON-based Rich Text content. The ETag header
+    carries the note's version for use in If-Match on updates.
     """
     note_service = NoteService(db)
     
     try:
         note = await note_service.get_note_by_id(note_id, str(current_user["_id"]))
         note["_id"] = str(note["_id"])
+        response.headers["ETag"] = version_etag(note)
         return note
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -138,10 +207,137 @@ async def get_note(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/{note_id}/html", response_class=Response)
+async def get_note_html(
+    note_id: str,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get a Markdown note rendered to sanitized HTML.
+    
+    The ETag is derived from the content hash: send it back in
+    `If-None-Match` to get `304 Not Modified` (without the server loading or
+    rendering the content) until the note's content changes. Rendered HTML
+    is cached server-side by content hash, so shared notes render once for
+    all viewers.
+    """
+    note_service = NoteService(db)
+    user_id = str(current_user["_id"])
+    
+    try:
+        digest = await note_service.get_note_content_hash(note_id, user_id)
+        etag = MarkdownRenderer.etag(digest)
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+        
+        html, digest = await note_service.render_note_html(note_id, user_id)
+        response = Response(content=html, media_type="text/html; charset=utf-8")
+        set_etag_headers(response, MarkdownRenderer.etag(digest))
+        return response
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/{note_id}/related", response_model=RelatedNoteList)
+async def get_related_notes(
+    note_id: str,
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of notes"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get the current user's notes most related to a note, best match first.
+    
+    Notes are ranked by TF-IDF similarity of their words; `duplicate` marks
+    notes with near-identical text.
+    """
+    similarity_service = NoteSimilarityService(db)
+    
+    try:
+        notes = await similarity_service.get_related_notes(note_id, str(current_user["_id"]), limit)
+        return {"notes": notes, "total": len(notes)}
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.websocket("/{note_id}/collab")
+async def collaborate_on_note(
+    websocket: WebSocket,
+    note_id: str,
+    current_user: Optional[dict] = Depends(get_websocket_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Edit a note together in real time (y-websocket protocol over binary frames).
+    
+    Connect with `?token=<access token>` and bind a Yjs document to it; the
+    note's content is the document's "content" text. The owner and editors
+    can write; viewers receive updates only. Edits are saved to the note
+    every few seconds and when the last editor disconnects.
+    
+    Close codes: 4401 unauthenticated, 4404 note not found or trashed,
+    4403 access revoked, 1013 too many editors, 1009 message too large.
+    """
+    if current_user is None:
+        await websocket.close(code=CLOSE_UNAUTHENTICATED)
+        return
+    
+    note_service = NoteService(db)
+    collab_service = CollabService(db)
+    user_id = str(current_user["_id"])
+    
+    try:
+        role = await note_service.get_note_role(note_id, user_id)
+    except (NotFoundException, ValidationException):
+        await websocket.close(code=CLOSE_NOTE_GONE)
+        return
+    
+    await websocket.accept()
+    try:
+        room = await collab_service.join(note_id, websocket, user_id, can_edit=role != "viewer")
+    except NotFoundException:
+        await websocket.close(code=CLOSE_NOTE_GONE)
+        return
+    except ValidationException:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                continue  # The protocol is binary; ignore text frames
+            if len(data) > settings.collab_max_message_bytes:
+                await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                break
+            await collab_service.handle_message(room, websocket, data)
+    except ValidationException:
+        await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA)
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # Closed by the client, or by the server (deleted note, revoked access)
+    finally:
+        await collab_service.leave(room, websocket)
+
+
 @router.put("/{note_id}", response_model=NoteResponse)
 async def update_note(
     note_id: str,
     note_data: NoteUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -155,6 +351,9 @@ async def update_note(
     - **tags**: List of tags
     - **isPinned**: Pin status
     - **isFavorite**: Favorite status
+    
+    Send the note's ETag in If-Match to update only if nobody changed it
+    in the meantime (412 Precondition Failed otherwise).
     """
     note_service = NoteService(db)
     
@@ -162,14 +361,63 @@ async def update_note(
         note = await note_service.update_note(
             note_id=note_id,
             user_id=str(current_user["_id"]),
-            note_data=note_data.model_dump(exclude_unset=True)
+            note_data=note_data.model_dump(exclude_unset=True),
+            expected_versions=parse_if_match(if_match)
         )
         note["_id"] = str(note["_id"])
+        response.headers["ETag"] = version_etag(note)
         return note
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except ValidationException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PreconditionFailedException as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.patch("/{note_id}/content", response_model=NoteContentPatchResult)
+async def patch_note_content(
+    note_id: str,
+    patch_data: NoteContentPatch,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Update a note's content by sending only the edits (for autosave).
+    
+    - **baseVersion**: The note's version when the client last synced its content
+    - **baseHash**: The note's `contentHash` at that version
+    - **edits**: `{offset, delete, insert}` against the base content, sorted by
+      offset and non-overlapping (offsets count Unicode code points)
+    - **resultHash**: Optional SHA-256 of the expected result, to catch diverged clients
+    
+    Returns the new version and contentHash (the next patch's base), not the
+    content. 412 means the note changed since the base version: reload it
+    and re-diff.
+    """
+    note_service = NoteService(db)
+    
+    try:
+        result = await note_service.patch_note_content(
+            note_id=note_id,
+            user_id=str(current_user["_id"]),
+            base_version=patch_data.baseVersion,
+            base_hash=patch_data.baseHash,
+            edits=[edit.model_dump() for edit in patch_data.edits],
+            result_hash=patch_data.resultHash
+        )
+        result["_id"] = str(result["_id"])
+        response.headers["ETag"] = version_etag(result)
+        return result
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PreconditionFailedException as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -178,6 +426,8 @@ async def update_note(
 async def pin_unpin_note(
     note_id: str,
     pin_data: NotePinUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -194,14 +444,18 @@ async def pin_unpin_note(
         note = await note_service.pin_unpin_note(
             note_id=note_id,
             user_id=str(current_user["_id"]),
-            is_pinned=pin_data.isPinned
+            is_pinned=pin_data.isPinned,
+            expected_versions=parse_if_match(if_match)
         )
         note["_id"] = str(note["_id"])
+        response.headers["ETag"] = version_etag(note)
         return note
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except ValidationException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PreconditionFailedException as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -239,13 +493,15 @@ async def get_trashed_notes(
     note_service = NoteService(db)
     
     try:
-        notes = await note_service.get_trashed_notes(str(current_user["_id"]))
-        
-        # Convert ObjectIds to strings
-        for note in notes:
-            note["_id"] = str(note["_id"])
+        notes = await note_service.get_trashed_notes(
+            str(current_user["_id"]),
+            projection=model_projection(NoteResponse)
+        )
         
-        return {"notes": notes, "total": len(notes)}
+        return FastJSONResponse(content={
+            "notes": trusted_documents(notes, NoteResponse),
+            "total": len(notes)
+        })
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -271,6 +527,90 @@ async def restore_note(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/{note_id}/versions", response_model=NoteVersionList)
+async def get_note_versions(
+    note_id: str,
+    limit: int = Query(50, ge=1, le=200, description="Versions per page"),
+    before: Optional[int] = Query(None, description="Only versions older than this one (from nextBefore)"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    List a note's version history, newest first.
+    
+    Only metadata is returned; load a version's content from
+    `GET /notes/{id}/versions/{version}`. Versions are recorded shortly
+    after content changes, so autosaves made close together share one.
+    """
+    history_service = NoteHistoryService(db)
+    
+    try:
+        return await history_service.list_versions(note_id, str(current_user["_id"]), limit, before)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/{note_id}/versions/{version}", response_model=NoteVersionContent)
+async def get_note_version(
+    note_id: str,
+    version: int,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get a note's content as it was at a recorded version."""
+    history_service = NoteHistoryService(db)
+    
+    try:
+        return await history_service.get_version(note_id, str(current_user["_id"]), version)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/{note_id}/versions/{version}/restore", response_model=NoteResponse)
+async def restore_note_version(
+    note_id: str,
+    version: int,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Restore a note's content to a recorded version.
+    
+    The restored content is saved as a new version; history is kept.
+    Supports If-Match like `PUT /notes/{id}`.
+    """
+    note_service = NoteService(db)
+    
+    try:
+        note = await note_service.restore_note_version(
+            note_id=note_id,
+            user_id=str(current_user["_id"]),
+            version=version,
+            expected_versions=parse_if_match(if_match)
+        )
+        note["_id"] = str(note["_id"])
+        response.headers["ETag"] = version_etag(note)
+        return note
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PreconditionFailedException as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.delete("/{note_id}/permanent", response_model=MessageResponse)
 async def permanently_delete_note(
     note_id: str,
@@ -0,0 +1,160 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import List
+
+from app.database import get_database
+from app.core.dependencies import get_current_user
+from app.schemas.smart_list import (
+    SmartListCreate, SmartListUpdate, SmartListResponse, SmartListTasks
+)
+from app.schemas.task import TaskResponse
+from app.schemas.common import MessageResponse
+from app.services.smart_list_service import SmartListService
+from app.utils.exceptions import NotFoundException, ValidationException
+from app.utils.responses import FastJSONResponse, model_projection, trusted_documents
+
+
+router = APIRouter(prefix="/smart-lists", tags=["Smart Lists"])
+
+
+def _serialize(smart_list: dict) -> dict:
+    """Drop stored bookkeeping fields and stringify the ID for a smart list response."""
+    smart_list.pop("taskIds", None)
+    smart_list.pop("evaluatedOn", None)
+    smart_list["_id"] = str(smart_list["_id"])
+    return smart_list
+
+
+@router.get("", response_model=List[SmartListResponse])
+async def get_smart_lists(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get the current user's smart lists with their task counts.
+    
+    Counts are maintained as tasks change, so this is a cheap read suitable
+    for sidebar badges.
+    """
+    smart_list_service = SmartListService(db)
+    
+    try:
+        smart_lists = await smart_list_service.get_smart_lists(str(current_user["_id"]))
+        return [_serialize(smart_list) for smart_list in smart_lists]
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("", response_model=SmartListResponse, status_code=status.HTTP_201_CREATED)
+async def create_smart_list(
+    smart_list_data: SmartListCreate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Create a smart list (a saved task filter).
+    
+    - **name**: List name (required)
+    - **color**: List color (optional)
+    - **filters**: status, priority, tags (+ matchAllTags), labels, folderId,
+      dueWithinDays (+ includeOverdue)
+    """
+    smart_list_service = SmartListService(db)
+    
+    try:
+        smart_list = await smart_list_service.create_smart_list(
+            user_id=str(current_user["_id"]),
+            data=smart_list_data.model_dump()
+        )
+        return _serialize(smart_list)
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/{list_id}/tasks", response_model=SmartListTasks)
+async def get_smart_list_tasks(
+    list_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get the tasks currently in a smart list.
+    
+    Tasks are looked up by their stored IDs rather than by re-running the filter.
+    """
+    smart_list_service = SmartListService(db)
+    
+    try:
+        smart_list, tasks = await smart_list_service.get_smart_list_tasks(
+            list_id=list_id,
+            user_id=str(current_user["_id"]),
+            projection=model_projection(TaskResponse)
+        )
+        return FastJSONResponse(content={
+            "smartList": _serialize(smart_list),
+            "tasks": trusted_documents(tasks, TaskResponse)
+        })
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.put("/{list_id}", response_model=SmartListResponse)
+async def update_smart_list(
+    list_id: str,
+    smart_list_data: SmartListUpdate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Rename a smart list or change its filters (changing filters rebuilds its membership)."""
+    smart_list_service = SmartListService(db)
+    
+    try:
+        smart_list = await smart_list_service.update_smart_list(
+            list_id=list_id,
+            user_id=str(current_user["_id"]),
+            data=smart_list_data.model_dump(exclude_unset=True)
+        )
+        return _serialize(smart_list)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/{list_id}/refresh", response_model=SmartListResponse)
+async def refresh_smart_list(
+    list_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Recompute a smart list's membership from scratch."""
+    smart_list_service = SmartListService(db)
+    
+    try:
+        smart_list = await smart_list_service.refresh_smart_list(list_id, str(current_user["_id"]))
+        return _serialize(smart_list)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.delete("/{list_id}", response_model=MessageResponse)
+async def delete_smart_list(
+    list_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Delete a smart list. Its tasks are not affected."""
+    smart_list_service = SmartListService(db)
+    
+    try:
+        return await smart_list_service.delete_smart_list(list_id, str(current_user["_id"]))
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional
+
+from app.database import get_database
+from app.core.dependencies import get_current_user
+from app.schemas.sync import SyncResponse
+from app.services.sync_service import SyncService
+from app.utils.exceptions import ValidationException
+from app.utils.serializers import serialize_dates
+
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("", response_model=SyncResponse)
+async def sync_changes(
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous sync"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get tasks, notes, folders and habits changed since the last sync.
+    
+    - **cursor**: Cursor from the previous response (omit for a full snapshot)
+    
+    Created and updated documents (including ones moved to trash) are returned
+    in full. Permanently deleted or unshared documents are listed in `deleted`.
+    When `fullResync` is true the client should replace its local state.
+    """
+    sync_service = SyncService(db)
+    
+    try:
+        changes = await sync_service.get_changes(
+            user_id=str(current_user["_id"]),
+            cursor=cursor
+        )
+        
+        # Convert ObjectIds to strings
+        for collection in ("tasks", "notes", "folders"):
+            for doc in changes[collection]:
+                doc["_id"] = str(doc["_id"])
+        changes["habits"] = serialize_dates(changes["habits"])
+        
+        return changes
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional
+
+from app.database import get_database
+from app.core.dependencies import get_current_user
+from app.schemas.tag import TagCollection, TagList
+from app.services.tag_index_service import TagIndexService
+from app.utils.exceptions import ValidationException
+
+
+router = APIRouter(prefix="/tags", tags=["Tags"])
+
+
+@router.get("", response_model=TagList)
+async def get_tags(
+    collection: Optional[TagCollection] = Query(None, description="Only tags used by notes or by tasks"),
+    prefix: Optional[str] = Query(None, max_length=100, description="Only tags starting with this (case-insensitive)"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of tags"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get the current user's tags with usage counts, most used first.
+    
+    Counts cover your own live (not trashed) notes and tasks and come from
+    a per-user tag index, so this is cheap enough for tag facets and for
+    autocomplete as you type:
+    - **collection**: `notes` or `tasks` to count only one of them
+    - **prefix**: Autocomplete: tags starting with this text
+    - **limit**: Maximum number of tags returned
+    
+    Filter by several tags with `tags` on `GET /notes` or `GET /tasks`
+    (any of them, or all of them with `match_all_tags=true`).
+    """
+    tag_index_service = TagIndexService(db)
+    
+    try:
+        tags = await tag_index_service.get_tags(
+            str(current_user["_id"]),
+            collection=collection.value if collection else None,
+            prefix=prefix,
+            limit=limit
+        )
+        return {"tags": tags}
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,50 +1,137 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import Optional
+from typing import List, Optional
+from datetime import datetime
+from urllib.parse import quote
 
 from app.database import get_database
 from app.core.dependencies import get_current_user
 from app.schemas.task import (
     TaskCreate, TaskUpdate, TaskResponse, TaskList,
     TaskAssign, TaskInvite, TaskCollaboratorList,
-    TaskReorderRequest
+    TaskReorderRequest, TaskStatus, TaskPriority, TaskBoard, TaskColumnPage,
+    Subtask, SubtaskCreate, SubtaskUpdate, SubtaskMove, Attachment,
+    CalendarFeedLink
 )
 from app.schemas.common import MessageResponse
+from app.config import settings
+from app.services.attachment_service import AttachmentService
+from app.services.calendar_service import CalendarService
 from app.services.task_service import TaskService
-from app.utils.exceptions import NotFoundException, ValidationException
+from app.services.version_service import VersionService
+from app.utils.exceptions import (
+    NotFoundException, ValidationException, PayloadTooLargeException, PreconditionFailedException
+)
+from app.utils.file_handler import FileHandler
+from app.utils.ranges import parse_range_header, RangeNotSatisfiable
+from app.utils.etag import (
+    build_etag, etag_matches, set_etag_headers, not_modified_response, version_etag, parse_if_match
+)
+from app.utils.responses import FastJSONResponse, model_projection, trusted_documents
 
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
 
+def _split_values(values: Optional[List[str]]) -> Optional[List[str]]:
+    """Accept repeated (?tag=a&tag=b) and comma-separated (?tag=a,b) multi-value parameters."""
+    if not values:
+        return None
+    return [v.strip() for value in values for v in value.split(",") if v.strip()] or None
+
+
+def _split_enum_values(values: Optional[List[str]], enum: type, name: str) -> Optional[List[str]]:
+    """Split a multi-value parameter and reject values that aren't members of an enum (400)."""
+    split = _split_values(values)
+    allowed = [member.value for member in enum]
+    unknown = [value for value in split or [] if value not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {name} {', '.join(unknown)} (expected {', '.join(allowed)})"
+        )
+    return split
+
+
 @router.get("", response_model=TaskList)
 async def get_tasks(
     folder_id: Optional[str] = Query(None, description="Filter by folder ID"),
-    status: Optional[str] = Query(None, description="Filter by status"),
+    include_subfolders: bool = Query(False, description="With folder_id, include tasks in nested folders"),
+    status_filter: Optional[List[str]] = Query(None, alias="status", description="Filter by status (multi-value)"),
+    priority: Optional[List[str]] = Query(None, description="Filter by priority (multi-value)"),
+    tags: Optional[List[str]] = Query(None, alias="tag", description="Filter by tag (multi-value)"),
+    match_all_tags: bool = Query(False, description="Require all tags instead of any"),
+    labels: Optional[List[str]] = Query(None, alias="label", description="Filter by label name (multi-value)"),
+    due_from: Optional[datetime] = Query(None, description="Only tasks due at or after this time"),
+    due_to: Optional[datetime] = Query(None, description="Only tasks due before this time"),
+    sort: Optional[str] = Query(None, description="Sort fields, e.g. dueDate,-priority"),
+    start: Optional[datetime] = Query(None, description="Due date window start (requires end)"),
+    end: Optional[datetime] = Query(None, description="Due date window end (requires start)"),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Get all tasks for the current user.
     
-    Optional filters:
-    - **folder_id**: Filter by folder
+    Optional filters (multi-value ones accept repeats or commas, e.g. `status=todo,doing`):
+    - **folder_id**: Filter by folder (and its subfolders with `include_subfolders=true`)
     - **status**: Filter by status (todo, doing, done)
+    - **priority**: Filter by priority (low, medium, high)
+    - **tag**: Tasks with any of these tags (all of them with `match_all_tags=true`)
+    - **label**: Tasks with a label of one of these names
+    - **due_from** / **due_to**: Due date range
+    - **start** / **end**: Only tasks due in this window, with recurring
+      tasks expanded into their occurrences
+    
+    **sort** takes dueDate, priority, status, position, title, createdAt or
+    updatedAt, comma-separated, `-` for descending. Ties keep a stable order.
+    
+    Responses carry a weak ETag; send it back in `If-None-Match` to get
+    `304 Not Modified` when no task visible to you has changed.
     """
     task_service = TaskService(db)
+    user_id = str(current_user["_id"])
+    
+    filters = {
+        "folder_id": folder_id,
+        "include_subfolders": include_subfolders,
+        "status": _split_enum_values(status_filter, TaskStatus, "status"),
+        "priority": _split_enum_values(priority, TaskPriority, "priority"),
+        "tags": _split_values(tags),
+        "match_all_tags": match_all_tags,
+        "labels": _split_values(labels),
+        "due_from": due_from,
+        "due_to": due_to,
+        "sort": sort,
+        "start": start,
+        "end": end
+    }
+    
+    version = await VersionService(db).get_version(user_id, "tasks")
+    # Moving folders changes which tasks a subtree holds without touching tasks
+    folders_version = await VersionService(db).get_version(user_id, "folders") if include_subfolders else None
+    etag = build_etag("tasks", version, folders_version, *filters.values())
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
     
     try:
         tasks = await task_service.get_tasks(
-            user_id=str(current_user["_id"]),
-            folder_id=folder_id,
-            status=status
+            user_id=user_id,
+            projection=model_projection(TaskResponse),
+            **filters
         )
         
-        # Convert ObjectIds to strings
-        for task in tasks:
-            task["_id"] = str(task["_id"])
-        
-        return {"tasks": tasks, "total": len(tasks)}
+        # Documents come from our own writes: skip TaskList re-validation
+        response = FastJSONResponse(content={
+            "tasks": trusted_documents(tasks, TaskResponse),
+            "total": len(tasks)
+        })
+        set_etag_headers(response, etag)
+        return response
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -65,6 +152,7 @@ async def create_task(
     - **dueDate**: Due date (optional)
     - **folderId**: Folder ID (optional)
     - **teamId**: Team ID (optional)
+    - **recurrence**: RRULE subset such as `FREQ=WEEKLY;BYDAY=MO,WE` (optional, needs dueDate)
     """
     task_service = TaskService(db)
     
@@ -75,22 +163,203 @@ async def create_task(
         )
         task["_id"] = str(task["_id"])
         return task
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/board", response_model=TaskBoard)
+async def get_board(
+    limit: int = Query(20, ge=1, le=100, description="Tasks per column"),
+    folder_id: Optional[str] = Query(None, description="Filter by folder ID"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get the kanban board in one request.
+    
+    Returns every status column with its total count and the first
+    **limit** tasks ordered by position. Load more cards for a column
+    with `/tasks/board/{column}?cursor=<nextCursor>`.
+    
+    Supports `If-None-Match` like `GET /tasks`.
+    """
+    task_service = TaskService(db)
+    user_id = str(current_user["_id"])
+    
+    version = await VersionService(db).get_version(user_id, "tasks")
+    etag = build_etag("tasks", version, "board", limit, folder_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    
+    try:
+        board = await task_service.get_board(
+            user_id=user_id,
+            limit=limit,
+            folder_id=folder_id,
+            projection=model_projection(TaskResponse)
+        )
+        
+        for column in board["columns"]:
+            trusted_documents(column["tasks"], TaskResponse)
+        
+        response = FastJSONResponse(content=board)
+        set_etag_headers(response, etag)
+        return response
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/board/{column}", response_model=TaskColumnPage)
+async def get_board_column(
+    column: TaskStatus,
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Tasks to return"),
+    folder_id: Optional[str] = Query(None, description="Filter by folder ID"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Load more tasks for one board column (todo, doing, done).
+    
+    Pages are keyset-based, so cards added or moved elsewhere on the
+    board don't shift the page boundaries.
+    """
+    task_service = TaskService(db)
+    
+    try:
+        page = await task_service.get_board_column(
+            user_id=str(current_user["_id"]),
+            status=column.value,
+            cursor=cursor,
+            limit=limit,
+            folder_id=folder_id,
+            projection=model_projection(TaskResponse)
+        )
+        
+        trusted_documents(page["tasks"], TaskResponse)
+        return FastJSONResponse(content=page)
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/calendar", response_model=TaskList)
+async def get_calendar_tasks(
+    start: datetime = Query(..., description="Range start (inclusive)"),
+    end: datetime = Query(..., description="Range end (exclusive)"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get tasks due between **start** and **end**, ordered by due date.
+    
+    Supports `If-None-Match` like `GET /tasks`.
+    """
+    task_service = TaskService(db)
+    user_id = str(current_user["_id"])
+    
+    version = await VersionService(db).get_version(user_id, "tasks")
+    etag = build_etag("tasks", version, "calendar", start, end)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    
+    try:
+        tasks = await task_service.get_calendar_tasks(
+            user_id=user_id,
+            start=start,
+            end=end,
+            projection=model_projection(TaskResponse)
+        )
+        
+        response = FastJSONResponse(content={
+            "tasks": trusted_documents(tasks, TaskResponse),
+            "total": len(tasks)
+        })
+        set_etag_headers(response, etag)
+        return response
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/calendar/feed-url", response_model=CalendarFeedLink)
+async def get_calendar_feed_url(
+    request: Request,
+    rotate: bool = Query(False, description="Issue a new URL, revoking the old one"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get your private iCalendar feed URL for external calendar apps.
+    
+    Anyone with the URL can read your task due dates; pass **rotate=true**
+    to revoke previously shared URLs.
+    """
+    calendar_service = CalendarService(db)
+    
+    try:
+        token = await calendar_service.get_feed_token(str(current_user["_id"]), rotate=rotate)
+        return {"url": str(request.url_for("get_calendar_feed", token=token))}
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/calendar/feed/{token}.ics", name="get_calendar_feed")
+async def get_calendar_feed(
+    token: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    iCalendar feed of your tasks (no auth header; the signed URL is the credential).
+    
+    The feed is rendered once per change to your tasks and cached; calendar
+    apps that send `If-None-Match` get `304 Not Modified` until then.
+    """
+    calendar_service = CalendarService(db)
+    
+    try:
+        user_id = await calendar_service.resolve_feed_token(token)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    
+    version = await VersionService(db).get_version(user_id, "tasks")
+    etag = build_etag("tasks", version, "ics", datetime.utcnow().date())
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    
+    body, (version, day) = await calendar_service.get_feed(user_id)
+    
+    response = Response(content=body, media_type="text/calendar; charset=utf-8")
+    set_etag_headers(response, build_etag("tasks", version, "ics", day))
+    return response
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: str,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get a single task by ID."""
+    """
+    Get a single task by ID.
+    
+    The ETag header carries the task's version; send it back in If-Match
+    when updating to avoid overwriting someone else's changes.
+    """
     task_service = TaskService(db)
     
     try:
         task = await task_service.get_task_by_id(task_id, str(current_user["_id"]))
         task["_id"] = str(task["_id"])
+        response.headers["ETag"] = version_etag(task)
         return task
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -102,6 +371,8 @@ async def get_task(
 async def update_task(
     task_id: str,
     task_data: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -109,6 +380,9 @@ async def update_task(
     Update a task.
     
     All fields are optional. Only provided fields will be updated.
+    
+    Send the task's ETag in If-Match to update only if nobody changed it
+    in the meantime (412 Precondition Failed otherwise).
     """
     task_service = TaskService(db)
     
@@ -116,12 +390,18 @@ async def update_task(
         task = await task_service.update_task(
             task_id=task_id,
             user_id=str(current_user["_id"]),
-            task_data=task_data.model_dump(exclude_unset=True)
+            task_data=task_data.model_dump(exclude_unset=True),
+            expected_versions=parse_if_match(if_match)
         )
         task["_id"] = str(task["_id"])
+        response.headers["ETag"] = version_etag(task)
         return task
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PreconditionFailedException as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -157,13 +437,15 @@ async def get_trashed_tasks(
     task_service = TaskService(db)
     
     try:
-        tasks = await task_service.get_trashed_tasks(str(current_user["_id"]))
-        
-        # Convert ObjectIds to strings
-        for task in tasks:
-            task["_id"] = str(task["_id"])
+        tasks = await task_service.get_trashed_tasks(
+            str(current_user["_id"]),
+            projection=model_projection(TaskResponse)
+        )
         
-        return {"tasks": tasks, "total": len(tasks)}
+        return FastJSONResponse(content={
+            "tasks": trusted_documents(tasks, TaskResponse),
+            "total": len(tasks)
+        })
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -171,6 +453,7 @@ async def get_trashed_tasks(
 @router.post("/{task_id}/restore", response_model=TaskResponse)
 async def restore_task(
     task_id: str,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -180,6 +463,7 @@ async def restore_task(
     try:
         task = await task_service.restore_task(task_id, str(current_user["_id"]))
         task["_id"] = str(task["_id"])
+        response.headers["ETag"] = version_etag(task)
         return task
     except NotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -387,3 +671,308 @@ async def reorder_tasks(
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+
+@router.post("/{task_id}/subtasks", response_model=Subtask, status_code=status.HTTP_201_CREATED)
+async def add_subtask(
+    task_id: str,
+    subtask_data: SubtaskCreate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Add a subtask without resending the whole checklist.
+    
+    - **title**: Subtask title (required)
+    - **completed**: Initial state (default: false)
+    - **position**: Index to insert at (optional, defaults to the end)
+    
+    Returns only the new subtask.
+    """
+    task_service = TaskService(db)
+    
+    try:
+        return await task_service.add_subtask(
+            task_id=task_id,
+            user_id=str(current_user["_id"]),
+            title=subtask_data.title,
+            completed=subtask_data.completed,
+            position=subtask_data.position
+        )
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.patch("/{task_id}/subtasks/{subtask_id}", response_model=Subtask)
+async def update_subtask(
+    task_id: str,
+    subtask_id: str,
+    subtask_data: SubtaskUpdate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Rename a subtask and/or set its completion state.
+    
+    Returns only the updated subtask.
+    """
+    task_service = TaskService(db)
+    
+    try:
+        return await task_service.update_subtask(
+            task_id=task_id,
+            user_id=str(current_user["_id"]),
+            subtask_id=subtask_id,
+            subtask_data=subtask_data.model_dump(exclude_unset=True)
+        )
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/{task_id}/subtasks/{subtask_id}/toggle", response_model=Subtask)
+async def toggle_subtask(
+    task_id: str,
+    subtask_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Flip a subtask between completed and not completed."""
+    task_service = TaskService(db)
+    
+    try:
+        return await task_service.toggle_subtask(task_id, str(current_user["_id"]), subtask_id)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.patch("/{task_id}/subtasks/{subtask_id}/move", response_model=Subtask)
+async def move_subtask(
+    task_id: str,
+    subtask_id: str,
+    move_data: SubtaskMove,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Move a subtask to a new position in the checklist.
+    
+    - **position**: Target index (positions past the end move it last)
+    """
+    task_service = TaskService(db)
+    
+    try:
+        return await task_service.move_subtask(
+            task_id=task_id,
+            user_id=str(current_user["_id"]),
+            subtask_id=subtask_id,
+            position=move_data.position
+        )
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.delete("/{task_id}/subtasks/{subtask_id}", response_model=Subtask)
+async def remove_subtask(
+    task_id: str,
+    subtask_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Remove a subtask. Returns the removed subtask."""
+    task_service = TaskService(db)
+    
+    try:
+        return await task_service.remove_subtask(task_id, str(current_user["_id"]), subtask_id)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/{task_id}/attachments", response_model=Attachment, status_code=status.HTTP_201_CREATED)
+async def upload_attachment(
+    task_id: str,
+    request: Request,
+    filename: str = Query(..., min_length=1, max_length=255, description="Original filename"),
+    content_type: Optional[str] = Header(None),
+    content_length: Optional[int] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Upload a file and attach it to a task.
+    
+    Send the raw file bytes as the request body (not multipart) with the
+    file's `Content-Type`. The body is streamed to disk in chunks, so large
+    files are never held in memory; uploads over the size limit are
+    rejected with 413 as soon as the limit is crossed. Identical files are
+    stored once.
+    """
+    if content_length is not None and content_length > settings.max_attachment_size:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+    
+    attachment_service = AttachmentService(db)
+    
+    try:
+        return await attachment_service.upload_attachment(
+            task_id=task_id,
+            user_id=str(current_user["_id"]),
+            filename=filename,
+            content_type=content_type or "application/octet-stream",
+            chunks=request.stream()
+        )
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PayloadTooLargeException as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/{task_id}/attachments/{attachment_id}")
+async def download_attachment(
+    task_id: str,
+    attachment_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Download an attachment.
+    
+    Supports `Range: bytes=start-end` (resumable and partial downloads,
+    answered with 206) and `If-None-Match` / `If-Range` against the
+    file's content-hash ETag.
+    """
+    attachment_service = AttachmentService(db)
+    
+    try:
+        attachment, path = await attachment_service.get_attachment(
+            task_id, str(current_user["_id"]), attachment_id
+        )
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    
+    etag = f'"{attachment["sha256"]}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    
+    size = attachment["size"]
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(attachment['filename'])}"
+    }
+    
+    # A stale If-Range validator means the client's partial copy is outdated: send it all
+    byte_range = None
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+    
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            FileHandler.iter_file(path, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=attachment.get("fileType"),
+            headers=headers
+        )
+    
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(
+        FileHandler.iter_file(path),
+        media_type=attachment.get("fileType"),
+        headers=headers
+    )
+
+
+@router.delete("/{task_id}/attachments/{attachment_id}", response_model=Attachment)
+async def delete_attachment(
+    task_id: str,
+    attachment_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Remove an attachment from a task. Returns the removed attachment."""
+    attachment_service = AttachmentService(db)
+    
+    try:
+        return await attachment_service.delete_attachment(task_id, str(current_user["_id"]), attachment_id)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.put("/{task_id}/occurrences/{occurrence}", response_model=TaskResponse)
+async def update_occurrence(
+    task_id: str,
+    occurrence: datetime,
+    task_data: TaskUpdate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Edit or complete one occurrence of a recurring task.
+    
+    **occurrence** is the occurrence's original due date (its
+    `occurrenceDate`). The first change stores the occurrence as its own
+    task; later changes update that task.
+    """
+    task_service = TaskService(db)
+    
+    try:
+        task = await task_service.update_occurrence(
+            task_id=task_id,
+            user_id=str(current_user["_id"]),
+            occurrence=occurrence,
+            task_data=task_data.model_dump(exclude_unset=True)
+        )
+        task["_id"] = str(task["_id"])
+        return task
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.delete("/{task_id}/occurrences/{occurrence}", response_model=MessageResponse)
+async def delete_occurrence(
+    task_id: str,
+    occurrence: datetime,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Skip one occurrence of a recurring task."""
+    task_service = TaskService(db)
+    
+    try:
+        return await task_service.delete_occurrence(task_id, str(current_user["_id"]), occurrence)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
+from typing import List, Optional
 
 from app.database import get_database
 from app.core.dependencies import get_current_user
 from app.schemas.team import (
     TeamCreate, TeamUpdate, TeamResponse, TeamInvite,
-    MemberRoleUpdate, MemberListResponse, ActivityListResponse
+    MemberRoleUpdate, MemberListResponse, ActivityListResponse, TeamWorkload
 )
+from app.schemas.task import TaskStatus, TaskPriority, TaskResponse, TeamTaskPage
 from app.schemas.common import MessageResponse
+from app.services.task_service import TaskService
 from app.services.team_service import TeamService
+from app.services.version_service import VersionService
 from app.utils.exceptions import NotFoundException, ValidationException
+from app.utils.etag import build_etag, etag_matches, set_etag_headers, not_modified_response
+from app.utils.responses import FastJSONResponse, model_projection, trusted_documents
 
 
 router = APIRouter(prefix="/teams", tags=["Teams"])
@@ -18,14 +23,27 @@ router = APIRouter(prefix="/teams", tags=["Teams"])
 
 @router.get("", response_model=List[TeamResponse])
 async def get_teams(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get all teams where user is owner or member."""
+    """
+    Get all teams where user is owner or member.
+    
+    Supports conditional requests via `If-None-Match` (returns 304 when unchanged).
+    """
     team_service = TeamService(db)
+    user_id = str(current_user["_id"])
+    
+    version = await VersionService(db).get_version(user_id, "teams")
+    etag = build_etag("teams", version)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    set_etag_headers(response, etag)
     
     try:
-        teams = await team_service.get_teams(str(current_user["_id"]))
+        teams = await team_service.get_teams(user_id)
         
         # Convert ObjectIds to strings
         for team in teams:
@@ -260,3 +278,70 @@ async def get_team_activity(
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+
+
+@router.get("/{team_id}/tasks", response_model=TeamTaskPage)
+async def get_team_tasks(
+    team_id: str,
+    status_filter: Optional[TaskStatus] = Query(None, alias="status", description="Filter by status"),
+    priority: Optional[TaskPriority] = Query(None, description="Filter by priority"),
+    assignee_id: Optional[str] = Query(None, description="Only tasks assigned to this user"),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    limit: int = Query(50, ge=1, le=100, description="Tasks to return"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    List a team's tasks, ordered by status and board position.
+    
+    Pages are keyset-based: pass the returned nextCursor to get the next page.
+    
+    - **status**: todo, doing or done (optional)
+    - **priority**: low, medium or high (optional)
+    - **assignee_id**: User ID of an assignee (optional)
+    """
+    task_service = TaskService(db)
+    
+    try:
+        page = await task_service.get_team_tasks(
+            team_id=team_id,
+            user_id=str(current_user["_id"]),
+            status=status_filter.value if status_filter else None,
+            priority=priority.value if priority else None,
+            assignee_id=assignee_id,
+            cursor=cursor,
+            limit=limit,
+            projection=model_projection(TaskResponse)
+        )
+        
+        trusted_documents(page["tasks"], TaskResponse)
+        return FastJSONResponse(content=page)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/{team_id}/workload", response_model=TeamWorkload)
+async def get_team_workload(
+    team_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get open task counts per assignee for a team.
+    
+    Each assignee shows open, todo, doing, high-priority and overdue task
+    counts, busiest first. Open tasks without an assignee are counted
+    separately.
+    """
+    task_service = TaskService(db)
+    
+    try:
+        return await task_service.get_team_workload(team_id, str(current_user["_id"]))
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -26,6 +26,8 @@ class Settings(BaseSettings):
     upload_dir: str = "uploads"
     max_upload_size: int = 5242880  # 5MB
     allowed_extensions: str = "jpg,jpeg,png,gif,webp"
+    max_attachment_size: int = 52428800  # 50MB
+    upload_chunk_size: int = 1048576  # 1MB read/write chunks
     
     # Email Configuration
     smtp_host: str = "smtp.gmail.com"
@@ -45,6 +47,80 @@ class Settings(BaseSettings):
     verification_token_expire_hours: int = 24
     reset_token_expire_hours: int = 1
     
+    # Sync Configuration
+    sync_tombstone_retention_days: int = 30  # Older cursors trigger a full resync
+    sync_cursor_overlap_seconds: int = 5  # Re-scan window for writes in flight
+    
+    # Folder Configuration
+    folder_max_depth: int = 10  # Nesting levels, counting top-level folders as 1
+    folder_summary_cache_size: int = 1000  # Folder contents summaries kept in memory (one per user)
+    
+    # Trash Configuration
+    trash_retention_days: int = 30  # Trashed items are purged after this; 0 disables
+    trash_purge_interval_minutes: int = 60
+    trash_purge_batch_size: int = 500
+    trash_purge_dry_run: bool = False  # Log what would be purged without deleting
+    
+    # Calendar Configuration
+    calendar_max_range_days: int = 366
+    calendar_feed_past_days: int = 90  # Feed includes tasks due from this many days ago onwards
+    calendar_feed_cache_size: int = 1000  # Rendered feeds kept in memory (one per user)
+    
+    # Task Analytics Configuration
+    task_rollup_reconcile_enabled: bool = True
+    task_rollup_reconcile_interval_hours: int = 24  # Full rebuild of task_daily_rollups
+    
+    # Index Advisor Configuration
+    index_advisor_enabled: bool = True
+    index_advisor_interval_minutes: int = 60
+    index_advisor_min_count: int = 50  # Query shapes seen fewer times are ignored
+    index_advisor_max_shapes: int = 20  # Busiest shapes explained per review
+    index_advisor_auto_create: bool = False  # Create recommended indexes instead of only logging them
+    index_advisor_max_auto_indexes: int = 5
+    
+    # Notes Configuration
+    note_excerpt_length: int = 160  # Plain-text excerpt stored with each note for list views
+    note_patch_max_edits: int = 1000  # Edits accepted per PATCH /notes/{id}/content
+    note_compression_threshold_bytes: int = 16384  # Content this large (UTF-8) is stored zlib-compressed
+    note_compression_level: int = 6  # zlib level, 1 (fastest) to 9 (smallest)
+    note_history_enabled: bool = True
+    note_history_flush_seconds: int = 10  # Autosaves within this window coalesce into one version
+    note_history_snapshot_interval: int = 20  # Max reverse deltas between full snapshots
+    note_history_max_versions: int = 200  # Per note; oldest versions are dropped first
+    note_history_retention_days: int = 90  # Versions older than this expire (TTL index)
+    markdown_render_workers: int = 2  # Threads rendering note Markdown to HTML
+    markdown_cache_memory_mb: int = 64  # Rendered HTML kept in memory (LRU)
+    markdown_cache_disk_mb: int = 512  # Evicted HTML spills here; 0 disables the disk tier
+    markdown_cache_dir: str = "cache/markdown"  # Must not be under upload_dir (served publicly)
+    
+    # Collaborative Editing Configuration
+    collab_batch_ms: int = 50  # Updates arriving within this window are broadcast as one message
+    collab_persist_seconds: int = 5  # How often open rooms with changes are saved to the note
+    collab_max_connections_per_note: int = 50
+    collab_max_message_bytes: int = 1048576
+    collab_state_retention_days: int = 30  # Saved CRDT state of notes not edited live for this long expires
+    
+    # Related Notes Configuration
+    note_similarity_enabled: bool = True
+    note_similarity_flush_seconds: int = 30  # Edited notes are re-indexed in the background this often
+    note_similarity_max_terms: int = 64  # Most frequent terms kept per note for TF-IDF ranking
+    note_similarity_min_score: float = 0.05  # Related notes scoring below this cosine are dropped
+    note_similarity_duplicate_threshold: float = 0.8  # Estimated shingle Jaccard similarity for near-duplicates
+    note_similarity_max_candidates: int = 200  # Bucket matches scored per related-notes query
+    note_similarity_max_bucket_size: int = 50  # Larger duplicate buckets compare members to one note only
+    
+    # Smart List Configuration
+    smart_list_max_per_user: int = 50  # Every task write re-evaluates the audience's lists
+    smart_list_refresh_interval_minutes: int = 15  # Rebuilds relative due windows after midnight UTC
+    
+    # Due Date Reminder Configuration
+    due_scheduler_enabled: bool = True
+    due_soon_minutes: int = 60  # "Due soon" fires this long before dueDate
+    due_scheduler_horizon_hours: int = 24  # Only tasks due within this window are kept in memory
+    due_scheduler_overdue_lookback_hours: int = 24  # Overdue tasks older than this are not reminded
+    due_scheduler_reseed_minutes: int = 10
+    due_scheduler_lease_seconds: int = 90  # Must exceed the 60s tick
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
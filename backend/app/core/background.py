@@ -0,0 +1,52 @@
+import asyncio
+import traceback
+from typing import Awaitable, Callable, Dict, List
+
+
+class BackgroundJobs:
+    """Registry of periodic in-process jobs started and stopped with the app lifespan."""
+
+    _jobs: List[tuple] = []
+    _tasks: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def register(cls, name: str, interval_seconds: float, job: Callable[[], Awaitable[None]]) -> None:
+        """
+        Register a job to run every `interval_seconds` once the app starts.
+
+        Args:
+            name: Unique job name (used in logs)
+            interval_seconds: Delay between the end of one run and the start of the next
+            job: Coroutine function taking no arguments
+        """
+        cls._jobs.append((name, interval_seconds, job))
+
+    @classmethod
+    async def _run_forever(cls, name: str, interval_seconds: float, job: Callable[[], Awaitable[None]]) -> None:
+        """Run a job in a loop, logging failures without stopping the loop."""
+        while True:
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Background job '{name}' failed: {e}")
+                traceback.print_exc()
+            await asyncio.sleep(interval_seconds)
+
+    @classmethod
+    def start(cls) -> None:
+        """Start all registered jobs on the running event loop."""
+        for name, interval_seconds, job in cls._jobs:
+            if name not in cls._tasks:
+                cls._tasks[name] = asyncio.create_task(cls._run_forever(name, interval_seconds, job))
+                print(f"✅ Background job started: {name}")
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Cancel all running jobs and wait for them to finish."""
+        tasks = list(cls._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        cls._tasks.clear()
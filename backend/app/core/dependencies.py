@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import Optional
@@ -96,3 +96,20 @@ async def get_current_user_optional(
         return await get_current_user(credentials, db)
     except HTTPException:
         return None
+
+
+async def get_websocket_user(
+    token: Optional[str] = Query(None, description="Access token (browsers can't set headers on WebSockets)"),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> Optional[dict]:
+    """
+    Authenticate a WebSocket connection from its `token` query parameter.
+    Returns user if authenticated, None otherwise (the endpoint closes the socket).
+    """
+    if not token:
+        return None
+    
+    try:
+        return await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+    except HTTPException:
+        return None
@@ -1,14 +1,24 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import os
 
 from app.config import settings
 from app.database import Database
-from app.api.v1 import auth, users, tasks, folders, teams, notes, habits, analytics, notifications
+from app.core.background import BackgroundJobs
+from app.services.trash_service import TrashPurgeService
+from app.services.due_date_scheduler import DueDateScheduler
+from app.services.task_analytics_service import TaskAnalyticsService
+from app.services.index_advisor import IndexAdvisor
+from app.services.smart_list_service import SmartListService
+from app.services.note_history_service import NoteHistoryService
+from app.services.note_similarity_service import NoteSimilarityService
+from app.services.collab_service import CollabService
+from app.services.markdown_renderer import MarkdownRenderer
+from app.api.v1 import auth, users, tasks, folders, teams, notes, habits, analytics, notifications, sync, smart_lists, tags
 from app.utils.exceptions import AppException
+from app.utils.responses import FastJSONResponse
 
 
 @asynccontextmanager
@@ -20,9 +30,61 @@ async def lifespan(app: FastAPI):
     # Ensure upload directories exist
     os.makedirs(os.path.join(settings.upload_dir, "avatars"), exist_ok=True)
     
+    # Periodic jobs
+    if settings.trash_retention_days > 0:
+        BackgroundJobs.register(
+            "trash_purge",
+            settings.trash_purge_interval_minutes * 60,
+            lambda: TrashPurgeService(Database.get_db()).purge_expired()
+        )
+    if settings.due_scheduler_enabled:
+        BackgroundJobs.register("due_date_reminders", 60, lambda: DueDateScheduler.tick(Database.get_db()))
+    if settings.task_rollup_reconcile_enabled:
+        BackgroundJobs.register(
+            "task_rollup_reconcile",
+            3600,
+            lambda: TaskAnalyticsService(Database.get_db()).reconcile_if_due()
+        )
+    if settings.index_advisor_enabled:
+        BackgroundJobs.register(
+            "index_advisor",
+            settings.index_advisor_interval_minutes * 60,
+            lambda: IndexAdvisor.review(Database.get_db())
+        )
+    if settings.note_history_enabled:
+        BackgroundJobs.register(
+            "note_history",
+            settings.note_history_flush_seconds,
+            lambda: NoteHistoryService.flush(Database.get_db())
+        )
+    if settings.note_similarity_enabled:
+        BackgroundJobs.register(
+            "note_similarity",
+            settings.note_similarity_flush_seconds,
+            lambda: NoteSimilarityService.flush(Database.get_db())
+        )
+    BackgroundJobs.register(
+        "collab_persist",
+        settings.collab_persist_seconds,
+        lambda: CollabService.persist_all(Database.get_db())
+    )
+    BackgroundJobs.register(
+        "smart_list_refresh",
+        settings.smart_list_refresh_interval_minutes * 60,
+        lambda: SmartListService(Database.get_db()).refresh_stale()
+    )
+    BackgroundJobs.start()
+    
     yield
     
     # Shutdown
+    await BackgroundJobs.stop()
+    await CollabService.shutdown(Database.get_db())  # Unsaved live edits; queues their history
+    if settings.note_history_enabled:
+        await NoteHistoryService.flush(Database.get_db())  # Versions still queued
+    if settings.note_similarity_enabled:
+        await NoteSimilarityService.flush(Database.get_db())
+    MarkdownRenderer.shutdown()
     await Database.close_db()
 
 
@@ -55,6 +117,7 @@ app = FastAPI(
     """,
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -76,7 +139,7 @@ if os.path.exists(settings.upload_dir):
 @app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
     """Handle custom application exceptions."""
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
         content={"success": False, "message": exc.message}
     )
@@ -91,6 +154,9 @@ app.include_router(notes.router, prefix="/api/v1")
 app.include_router(habits.router, prefix="/api/v1")
 app.include_router(analytics.router, prefix="/api/v1")
 app.include_router(notifications.router, prefix="/api/v1")
+app.include_router(sync.router, prefix="/api/v1")
+app.include_router(smart_lists.router, prefix="/api/v1")
+app.include_router(tags.router, prefix="/api/v1")
 
 # Root endpoint
 @app.get("/", tags=["Root"])
@@ -130,6 +196,10 @@ async def detailed_health_check():
         "status": "healthy" if db_status == "connected" else "degraded",
         "environment": settings.environment,
         "database": db_status,
+        "trashPurge": TrashPurgeService.metrics,
+        "indexAdvisor": IndexAdvisor.report(),
+        "markdownCache": MarkdownRenderer.report(),
+        "collab": CollabService.report(),
         "version": "1.0.0"
     }
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 
@@ -7,6 +7,7 @@ class FolderCreate(BaseModel):
     """Schema for creating a folder."""
     name: str = Field(..., min_length=1, max_length=100)
     color: Optional[str] = Field(None, max_length=20)
+    parentId: Optional[str] = Field(None, description="Parent folder ID (top level when omitted)")
 
 
 class FolderUpdate(BaseModel):
@@ -15,6 +16,11 @@ class FolderUpdate(BaseModel):
     color: Optional[str] = Field(None, max_length=20)
 
 
+class FolderMove(BaseModel):
+    """Schema for moving a folder (with its subfolders)."""
+    parentId: Optional[str] = Field(None, description="New parent folder ID (null for top level)")
+
+
 class FolderShare(BaseModel):
     """Schema for sharing a folder with a team."""
     teamId: str = Field(..., description="Team ID to share the folder with")
@@ -26,6 +32,8 @@ class FolderResponse(BaseModel):
     userId: str
     name: str
     color: Optional[str] = None
+    parentId: Optional[str] = None
+    path: Optional[str] = None  # Folder IDs from the top level down: "/<root>/.../<id>/"
     sharedWithTeams: List[str] = []
     createdAt: datetime
     updatedAt: datetime
@@ -33,3 +41,26 @@ class FolderResponse(BaseModel):
     class Config:
         populate_by_name = True
 
+
+class FolderSubtreeCounts(BaseModel):
+    """Schema for the contents of a folder and all its subfolders."""
+    folderId: str
+    folders: int  # Subfolders at any depth
+    tasks: int
+    notes: int
+
+
+class FolderSummaryEntry(BaseModel):
+    """Schema for the contents counts of one folder."""
+    folderId: Optional[str] = None  # None: tasks and notes not in any folder
+    tasksByStatus: Dict[str, int]  # Tasks directly in the folder, per status
+    tasks: int
+    notes: int
+    subtreeTasks: int  # Including folders nested below it
+    subtreeNotes: int
+
+
+class FolderSummary(BaseModel):
+    """Schema for the contents counts of all of a user's folders."""
+    folders: List[FolderSummaryEntry]
+
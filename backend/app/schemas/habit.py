@@ -78,6 +78,7 @@ class HabitResponse(BaseModel):
     longestStreak: int = 0
     totalCompletions: int = 0
     sharedWith: List[str] = []
+    version: int = 0  # Incremented on every write; sent as the ETag for If-Match
     createdAt: datetime
     updatedAt: datetime
     
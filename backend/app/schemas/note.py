@@ -32,6 +32,35 @@ class NoteUpdate(BaseModel):
     isFavorite: Optional[bool] = Field(None, description="Whether the note is marked as favorite")
 
 
+class NoteTextEdit(BaseModel):
+    """Schema for one positional edit of note content."""
+    offset: int = Field(..., ge=0, description="Position in the base content (Unicode code points)")
+    delete: int = Field(0, ge=0, description="Number of characters removed at offset")
+    insert: str = Field("", description="Text inserted at offset")
+
+
+class NoteContentPatch(BaseModel):
+    """Schema for a patch-based content update."""
+    baseVersion: int = Field(..., ge=0, description="Version of the note the edits were made against")
+    baseHash: str = Field(..., pattern="^[0-9a-f]{64}$", description="SHA-256 (hex) of the base content")
+    edits: List[NoteTextEdit] = Field(..., description="Edits sorted by offset, non-overlapping")
+    resultHash: Optional[str] = Field(
+        None, pattern="^[0-9a-f]{64}$", description="SHA-256 of the content after the edits, to verify"
+    )
+
+
+class NoteContentPatchResult(BaseModel):
+    """Schema for the result of a content patch (the content itself is not echoed)."""
+    id: str = Field(..., alias="_id")
+    version: int
+    contentHash: str
+    excerpt: str = ""
+    updatedAt: datetime
+    
+    class Config:
+        populate_by_name = True
+
+
 class NotePinUpdate(BaseModel):
     """Schema for pinning/unpinning a note."""
     isPinned: bool = Field(..., description="Whether to pin or unpin the note")
@@ -43,6 +72,7 @@ class NoteResponse(BaseModel):
     userId: str
     title: str
     content: str
+    contentHash: Optional[str] = None  # SHA-256 of content; the baseHash for content patches
     folderId: Optional[str] = None
     tags: List[str] = []
     color: Optional[str] = None  # Hex color code
@@ -50,6 +80,7 @@ class NoteResponse(BaseModel):
     isFavorite: bool = False
     isDeleted: bool = False
     deletedAt: Optional[datetime] = None
+    version: int = 0  # Incremented on every write; sent as the ETag for If-Match
     createdAt: datetime
     updatedAt: datetime
     
@@ -78,6 +109,98 @@ class NoteList(BaseModel):
     total: int
 
 
+class NoteView(str, Enum):
+    """Note list view: summaries (no content) or full notes."""
+    SUMMARY = "summary"
+    FULL = "full"
+
+
+class NoteSummary(BaseModel):
+    """Schema for a note in list views: a stored excerpt instead of the content."""
+    id: str = Field(..., alias="_id")
+    userId: str
+    title: str
+    excerpt: str = ""  # Plain-text start of the content, written with the note
+    folderId: Optional[str] = None
+    tags: List[str] = []
+    color: Optional[str] = None
+    isPinned: bool = False
+    isFavorite: bool = False
+    version: int = 0
+    createdAt: datetime
+    updatedAt: datetime
+    
+    class Config:
+        populate_by_name = True
+
+
+class NoteSummaryList(BaseModel):
+    """Schema for note summary list response."""
+    notes: List[NoteSummary]
+    total: int
+
+
+class NoteVersionInfo(BaseModel):
+    """Schema for a recorded note version (metadata only)."""
+    version: int
+    size: int  # Content length in characters
+    contentHash: str
+    createdAt: datetime
+
+
+class NoteVersionList(BaseModel):
+    """Schema for a page of a note's version history, newest first."""
+    versions: List[NoteVersionInfo]
+    nextBefore: Optional[int] = None  # Pass as before to load older versions
+
+
+class NoteVersionContent(NoteVersionInfo):
+    """Schema for a note's content at a recorded version."""
+    content: str
+
+
+class RelatedNote(BaseModel):
+    """Schema for a note similar to another note."""
+    id: str = Field(..., alias="_id")
+    title: str
+    excerpt: str = ""
+    updatedAt: datetime
+    score: float  # TF-IDF cosine similarity, 0 to 1
+    duplicate: bool = False  # Near-identical text
+    
+    class Config:
+        populate_by_name = True
+
+
+class RelatedNoteList(BaseModel):
+    """Schema for related notes, best match first."""
+    notes: List[RelatedNote]
+    total: int
+
+
+class DuplicateNote(BaseModel):
+    """Schema for a note in a group of near-duplicates."""
+    id: str = Field(..., alias="_id")
+    title: str
+    excerpt: str = ""
+    updatedAt: datetime
+    
+    class Config:
+        populate_by_name = True
+
+
+class DuplicateNoteGroup(BaseModel):
+    """Schema for notes with near-identical text, newest first."""
+    notes: List[DuplicateNote]
+    similarity: float  # Lowest estimated pairwise similarity in the group
+
+
+class DuplicateNoteGroupList(BaseModel):
+    """Schema for a user's groups of near-duplicate notes."""
+    groups: List[DuplicateNoteGroup]
+    total: int
+
+
 class NoteCollaborator(BaseModel):
     """Schema for note collaborator."""
     userId: str
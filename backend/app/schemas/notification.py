@@ -8,6 +8,8 @@ class NotificationType(str, Enum):
     """Notification type enum."""
     TASK_ASSIGNED = "task_assigned"
     TASK_SHARED = "task_shared"
+    TASK_DUE_SOON = "task_due_soon"
+    TASK_OVERDUE = "task_overdue"
     NOTE_SHARED = "note_shared"
     TEAM_INVITE = "team_invite"
     TEAM_MEMBER_ADDED = "team_member_added"
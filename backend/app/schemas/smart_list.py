@@ -0,0 +1,56 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+from app.schemas.task import TaskStatus, TaskPriority, TaskResponse
+
+
+class SmartListFilters(BaseModel):
+    """Schema for a smart list's filter definition (same filters as GET /tasks)."""
+    status: List[TaskStatus] = Field(default_factory=list, description="Tasks in any of these statuses")
+    priority: List[TaskPriority] = Field(default_factory=list, description="Tasks with any of these priorities")
+    tags: List[str] = Field(default_factory=list, description="Tasks with any (or all) of these tags")
+    matchAllTags: bool = Field(False, description="Require every tag instead of any")
+    labels: List[str] = Field(default_factory=list, description="Tasks with a label of any of these names")
+    folderId: Optional[str] = Field(None, description="Tasks in this folder")
+    dueWithinDays: Optional[int] = Field(
+        None, ge=0, le=366,
+        description="Tasks due from today through this many days ahead (0 = today, 6 = this week)"
+    )
+    includeOverdue: bool = Field(False, description="With dueWithinDays, also match tasks due before today")
+
+
+class SmartListCreate(BaseModel):
+    """Schema for creating a smart list."""
+    name: str = Field(..., min_length=1, max_length=100)
+    color: Optional[str] = Field(None, max_length=20)
+    filters: SmartListFilters = Field(default_factory=SmartListFilters)
+
+
+class SmartListUpdate(BaseModel):
+    """Schema for updating a smart list."""
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    color: Optional[str] = Field(None, max_length=20)
+    filters: Optional[SmartListFilters] = None
+
+
+class SmartListResponse(BaseModel):
+    """Schema for smart list response (with its badge count)."""
+    id: str = Field(..., alias="_id")
+    userId: str
+    name: str
+    color: Optional[str] = None
+    filters: SmartListFilters
+    count: int = 0
+    evaluatedAt: Optional[datetime] = None
+    createdAt: datetime
+    updatedAt: datetime
+    
+    class Config:
+        populate_by_name = True
+
+
+class SmartListTasks(BaseModel):
+    """Schema for the tasks currently in a smart list."""
+    smartList: SmartListResponse
+    tasks: List[TaskResponse]
@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any
+from datetime import datetime
+
+from app.schemas.task import TaskResponse
+from app.schemas.note import NoteResponse
+from app.schemas.folder import FolderResponse
+
+
+class SyncTombstone(BaseModel):
+    """Schema for a document that was permanently deleted or is no longer shared."""
+    collection: str  # "tasks", "notes", "folders", "habits"
+    documentId: str
+    deletedAt: datetime
+
+
+class SyncResponse(BaseModel):
+    """Schema for delta sync response."""
+    tasks: List[TaskResponse]
+    notes: List[NoteResponse]
+    folders: List[FolderResponse]
+    habits: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Raw habit documents (streak statistics are served by /habits)"
+    )
+    deleted: List[SyncTombstone] = Field(
+        default_factory=list,
+        description="Drop these documents locally unless a newer copy was received"
+    )
+    cursor: str = Field(..., description="Pass as `cursor` on the next sync")
+    fullResync: bool = Field(..., description="Replace local state instead of merging")
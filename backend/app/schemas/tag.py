@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List
+from enum import Enum
+
+
+class TagCollection(str, Enum):
+    """Which documents a tag listing counts."""
+    NOTES = "notes"
+    TASKS = "tasks"
+
+
+class TagCount(BaseModel):
+    """Schema for a tag with the number of live notes and tasks carrying it."""
+    tag: str
+    notes: int
+    tasks: int
+    total: int
+
+
+class TagList(BaseModel):
+    """Schema for a list of tags, most used first."""
+    tags: List[TagCount]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -33,16 +33,37 @@ class Label(BaseModel):
 
 class Subtask(BaseModel):
     """Schema for subtask."""
+    id: Optional[str] = None  # Assigned by the server; used by /tasks/{id}/subtasks/{subtaskId}
     title: str = Field(..., min_length=1, max_length=200)
     completed: bool = False
 
 
+class SubtaskCreate(BaseModel):
+    """Schema for adding a subtask."""
+    title: str = Field(..., min_length=1, max_length=200)
+    completed: bool = False
+    position: Optional[int] = Field(None, ge=0, description="Index to insert at (defaults to the end)")
+
+
+class SubtaskUpdate(BaseModel):
+    """Schema for renaming a subtask or setting its completion state."""
+    title: Optional[str] = Field(None, min_length=1, max_length=200)
+    completed: Optional[bool] = None
+
+
+class SubtaskMove(BaseModel):
+    """Schema for moving a subtask within its task."""
+    position: int = Field(..., ge=0, description="Target index")
+
+
 class Attachment(BaseModel):
     """Schema for task attachment."""
+    id: Optional[str] = None  # Set for files uploaded via /tasks/{id}/attachments (send it back to keep one)
     filename: str
     url: str
     fileType: str  # e.g., 'image/png', 'application/pdf'
-    size: Optional[int] = None  # File size in bytes
+    size: Optional[int] = None  # File size in bytes (server-set)
+    sha256: Optional[str] = None  # Content hash of stored uploads (server-set, ignored on input)
     uploadedAt: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -61,6 +82,10 @@ class TaskCreate(BaseModel):
     position: Optional[int] = None  # For custom ordering within status columns
     subtasks: Optional[List[Subtask]] = Field(default_factory=list)
     attachments: Optional[List[Attachment]] = Field(default_factory=list)
+    recurrence: Optional[str] = Field(
+        None, max_length=200,
+        description="RRULE subset, e.g. FREQ=WEEKLY;BYDAY=MO,WE (dueDate is the first occurrence)"
+    )
 
 
 class TaskUpdate(BaseModel):
@@ -78,6 +103,7 @@ class TaskUpdate(BaseModel):
     position: Optional[int] = None
     subtasks: Optional[List[Subtask]] = None
     attachments: Optional[List[Attachment]] = None
+    recurrence: Optional[str] = Field(None, max_length=200, description="RRULE subset; empty string stops recurring")
 
 
 class TaskResponse(BaseModel):
@@ -99,6 +125,11 @@ class TaskResponse(BaseModel):
     position: Optional[int] = None
     subtasks: Optional[List[Subtask]] = Field(default_factory=list)
     attachments: Optional[List[Attachment]] = Field(default_factory=list)
+    recurrence: Optional[str] = None  # Set on recurring tasks (the series)
+    recurrenceId: Optional[str] = None  # Set on occurrences: ID of the recurring task
+    occurrenceDate: Optional[datetime] = None  # Set on occurrences: original due date
+    isOccurrence: bool = False  # True for generated occurrences that aren't stored yet
+    version: int = 0  # Incremented on every write; sent as the ETag for If-Match
     createdAt: datetime
     updatedAt: datetime
     
@@ -126,6 +157,77 @@ class TaskList(BaseModel):
     total: int
 
 
+class CalendarFeedLink(BaseModel):
+    """Schema for a user's iCalendar feed URL."""
+    url: str
+
+
+class TaskColumnPage(BaseModel):
+    """Schema for a page of tasks in one board column."""
+    status: str
+    tasks: List[TaskResponse]
+    nextCursor: Optional[str] = None  # Pass to /tasks/board/{status} to load more
+
+
+class TaskBoardColumn(TaskColumnPage):
+    """Schema for a board column with its total task count."""
+    count: int
+
+
+class TeamTaskPage(BaseModel):
+    """Schema for a page of a team's tasks."""
+    tasks: List[TaskResponse]
+    nextCursor: Optional[str] = None  # Pass as cursor to load the next page
+
+
+class TaskBoard(BaseModel):
+    """Schema for kanban board response."""
+    columns: List[TaskBoardColumn]
+    total: int
+
+
+class TaskThroughputDay(BaseModel):
+    """Schema for tasks created and completed on one day."""
+    date: str
+    created: int
+    completed: int
+
+
+class TaskFlowDay(BaseModel):
+    """Schema for the number of tasks in each status at the end of one day."""
+    date: str
+    todo: int
+    doing: int
+    done: int
+
+
+class TaskOverdueDay(BaseModel):
+    """Schema for the nightly overdue task snapshot."""
+    date: str
+    overdue: int
+
+
+class TaskAnalyticsTotals(BaseModel):
+    """Schema for task event totals over a range."""
+    created: int
+    completed: int
+    reopened: int
+
+
+class TaskAnalytics(BaseModel):
+    """Schema for task productivity analytics."""
+    scope: str  # "user" or "team"
+    scopeId: str
+    startDate: date
+    endDate: date
+    throughput: List[TaskThroughputDay]
+    cumulativeFlow: List[TaskFlowDay]
+    totals: TaskAnalyticsTotals
+    leadTimeHours: Optional[float] = None  # Average created -> done
+    cycleTimeHours: Optional[float] = None  # Average started -> done
+    overdue: List[TaskOverdueDay]
+
+
 class TaskCollaborator(BaseModel):
     """Schema for task collaborator."""
     userId: str
@@ -72,6 +72,26 @@ class TeamResponse(BaseModel):
         populate_by_name = True
 
 
+class AssigneeWorkload(BaseModel):
+    """Schema for one assignee's open task counts."""
+    userId: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+    open: int
+    todo: int
+    doing: int
+    highPriority: int
+    overdue: int
+
+
+class TeamWorkload(BaseModel):
+    """Schema for team workload response."""
+    teamId: str
+    assignees: List[AssigneeWorkload]
+    unassigned: int  # Open tasks without an assignee
+    totalOpen: int
+
+
 class ActivityType(str, Enum):
     """Activity type enum."""
     TASK_CREATED = "task_created"
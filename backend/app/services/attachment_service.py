@@ -0,0 +1,268 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from typing import Optional, Dict, Any, AsyncIterator, Iterable, Tuple
+from datetime import datetime
+import os
+import re
+import uuid
+
+from app.config import settings
+from app.services.version_service import VersionService
+from app.utils.exceptions import NotFoundException
+from app.utils.file_handler import FileHandler
+
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+class AttachmentService:
+    """
+    Service for task file attachments.
+
+    Files are stored once per content hash under uploads/attachments and
+    reference-counted in the attachment_blobs collection, so the same file
+    attached to many tasks (or duplicated tasks) takes space only once.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.tasks_collection = db.tasks
+        self.blobs_collection = db.attachment_blobs
+        self.version_service = VersionService(db)
+
+    @staticmethod
+    def blob_path(sha256: str) -> str:
+        """
+        Get the on-disk path of a stored blob.
+
+        Raises:
+            ValueError: If sha256 is not a hex SHA-256 digest (it becomes part of the path)
+        """
+        if not isinstance(sha256, str) or not _SHA256.fullmatch(sha256):
+            raise ValueError("Invalid attachment hash")
+        return os.path.join(settings.upload_dir, "attachments", sha256[:2], sha256)
+
+    @staticmethod
+    def _task_filter(task_id: str, user_id: str, editable: bool = False) -> Dict[str, Any]:
+        """Build the query for a live task the user can see (or edit)."""
+        if editable:
+            collaborator = {"collaborators": {"$elemMatch": {
+                "userId": user_id,
+                "role": {"$in": ["editor", "assignee"]}
+            }}}
+        else:
+            collaborator = {"collaborators.userId": user_id}
+
+        return {
+            "_id": ObjectId(task_id),
+            "$or": [{"userId": user_id}, collaborator],
+            "isDeleted": {"$ne": True}
+        }
+
+    async def _bump_version(self, task: Dict[str, Any]) -> None:
+        """Bump the tasks collection version for everyone who sees the task."""
+        user_ids = [task.get("userId")] + [c["userId"] for c in task.get("collaborators", [])]
+        await self.version_service.bump(user_ids, "tasks")
+
+    async def retain(self, sha256s: Iterable[Optional[str]]) -> None:
+        """Add a reference to each stored blob (e.g. when a task is duplicated)."""
+        for sha256 in sha256s:
+            if sha256 and _SHA256.fullmatch(sha256):
+                await self.blobs_collection.update_one({"_id": sha256}, {"$inc": {"refCount": 1}})
+
+    async def release(self, sha256s: Iterable[Optional[str]]) -> int:
+        """
+        Drop a reference to each stored blob, deleting blobs nobody references.
+
+        Args:
+            sha256s: Content hashes of the attachments being removed
+
+        Returns:
+            Number of files deleted from disk
+        """
+        removed = 0
+
+        for sha256 in sha256s:
+            if not sha256 or not _SHA256.fullmatch(sha256):
+                continue
+
+            blob = await self.blobs_collection.find_one_and_update(
+                {"_id": sha256},
+                {"$inc": {"refCount": -1}},
+                return_document=True
+            )
+            if not blob or blob["refCount"] > 0:
+                continue
+
+            # Only the caller that deletes the record removes the file
+            result = await self.blobs_collection.delete_one({"_id": sha256, "refCount": {"$lte": 0}})
+            if result.deleted_count and FileHandler.delete_file(self.blob_path(sha256)):
+                removed += 1
+
+        return removed
+
+    async def upload_attachment(
+        self,
+        task_id: str,
+        user_id: str,
+        filename: str,
+        content_type: str,
+        chunks: AsyncIterator[bytes]
+    ) -> Dict[str, Any]:
+        """
+        Stream an upload to disk and attach it to a task.
+
+        Args:
+            task_id: Task's ObjectId as string
+            user_id: User's ID (for authorization)
+            filename: Original filename
+            content_type: MIME type reported by the client
+            chunks: Request body chunks
+
+        Returns:
+            Attachment metadata
+
+        Raises:
+            NotFoundException: If task not found or user can't edit it
+            PayloadTooLargeException: If the upload exceeds max_attachment_size
+        """
+        try:
+            task_filter = self._task_filter(task_id, user_id, editable=True)
+        except Exception:
+            raise NotFoundException("Task not found")
+
+        # Check access before accepting the body
+        if not await self.tasks_collection.find_one(task_filter, {"_id": 1}):
+            raise NotFoundException("Task not found or you don't have permission")
+
+        temp_path = os.path.join(settings.upload_dir, "attachments", "tmp", f"{uuid.uuid4().hex}.part")
+        size, sha256 = await FileHandler.stream_to_file(chunks, temp_path, settings.max_attachment_size)
+
+        # Register the reference first so a concurrent release keeps the file
+        await self.blobs_collection.update_one(
+            {"_id": sha256},
+            {
+                "$inc": {"refCount": 1},
+                "$setOnInsert": {"size": size, "createdAt": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+        final_path = self.blob_path(sha256)
+        if os.path.exists(final_path):
+            FileHandler.delete_file(temp_path)  # Deduplicated
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp_path, final_path)
+
+        attachment_id = str(ObjectId())
+        attachment = {
+            "id": attachment_id,
+            "filename": os.path.basename(filename),
+            "url": f"/api/v1/tasks/{task_id}/attachments/{attachment_id}",
+            "fileType": content_type,
+            "size": size,
+            "sha256": sha256,
+            "uploadedAt": datetime.utcnow()
+        }
+
+        result = await self.tasks_collection.find_one_and_update(
+            task_filter,
+            {
+                "$push": {"attachments": attachment},
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
+            },
+            projection={"userId": 1, "collaborators.userId": 1}
+        )
+
+        if not result:
+            # Task was deleted while the upload streamed
+            await self.release([sha256])
+            raise NotFoundException("Task not found")
+
+        await self._bump_version(result)
+
+        return attachment
+
+    async def get_attachment(self, task_id: str, user_id: str, attachment_id: str) -> Tuple[Dict[str, Any], str]:
+        """
+        Get an attachment's metadata and file path.
+
+        Args:
+            task_id: Task's ObjectId as string
+            user_id: User's ID (for authorization)
+            attachment_id: Attachment ID
+
+        Returns:
+            Tuple of (attachment metadata, path on disk)
+
+        Raises:
+            NotFoundException: If task, attachment or stored file not found
+        """
+        try:
+            query = self._task_filter(task_id, user_id)
+        except Exception:
+            raise NotFoundException("Task not found")
+
+        query["attachments.id"] = attachment_id
+        task = await self.tasks_collection.find_one(
+            query,
+            {"attachments": {"$elemMatch": {"id": attachment_id}}}
+        )
+
+        if not task or not task.get("attachments"):
+            raise NotFoundException("Attachment not found")
+
+        attachment = task["attachments"][0]
+        sha256 = attachment.get("sha256")
+        path = self.blob_path(sha256) if sha256 and _SHA256.fullmatch(sha256) else None
+
+        if not path or not os.path.exists(path):
+            raise NotFoundException("Attachment file not found")
+
+        return attachment, path
+
+    async def delete_attachment(self, task_id: str, user_id: str, attachment_id: str) -> Dict[str, Any]:
+        """
+        Remove an attachment from a task, deleting the file if nothing else uses it.
+
+        Args:
+            task_id: Task's ObjectId as string
+            user_id: User's ID (for authorization)
+            attachment_id: Attachment ID
+
+        Returns:
+            Removed attachment metadata
+
+        Raises:
+            NotFoundException: If task or attachment not found
+        """
+        try:
+            query = self._task_filter(task_id, user_id, editable=True)
+        except Exception:
+            raise NotFoundException("Task not found")
+
+        query["attachments.id"] = attachment_id
+        result = await self.tasks_collection.find_one_and_update(
+            query,
+            {
+                "$pull": {"attachments": {"id": attachment_id}},
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
+            },
+            projection={
+                "userId": 1,
+                "collaborators.userId": 1,
+                "attachments": {"$elemMatch": {"id": attachment_id}}
+            }
+        )
+
+        if not result or not result.get("attachments"):
+            raise NotFoundException("Attachment not found")
+
+        attachment = result["attachments"][0]
+        await self.release([attachment.get("sha256")])
+        await self._bump_version(result)
+
+        return attachment
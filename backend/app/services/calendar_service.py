@@ -0,0 +1,142 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from collections import OrderedDict
+from typing import Tuple
+from datetime import date, datetime, timedelta
+import secrets
+
+from app.config import settings
+from app.services.version_service import VersionService
+from app.utils.exceptions import NotFoundException
+from app.utils.ical import build_calendar
+from app.utils.token_manager import token_manager
+
+
+class CalendarService:
+    """Service for the per-user iCalendar task feed."""
+    
+    # Rendered feeds per user: userId -> ((tasks version, window day), ics body)
+    _feed_cache: "OrderedDict[str, Tuple[Tuple[int, date], str]]" = OrderedDict()
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.tasks_collection = db.tasks
+        self.users_collection = db.users
+        self.version_service = VersionService(db)
+    
+    async def get_feed_token(self, user_id: str, rotate: bool = False) -> str:
+        """
+        Get the signed token for a user's calendar feed URL.
+        
+        Args:
+            user_id: User's ID
+            rotate: Issue a new key, revoking every previously shared feed URL
+        
+        Returns:
+            Feed token
+        """
+        user = await self.users_collection.find_one(
+            {"_id": ObjectId(user_id)},
+            {"calendarFeedKey": 1}
+        )
+        feed_key = user.get("calendarFeedKey") if user else None
+        
+        if rotate or not feed_key:
+            feed_key = secrets.token_urlsafe(16)
+            await self.users_collection.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$set": {"calendarFeedKey": feed_key}}
+            )
+        
+        return token_manager.generate_calendar_feed_token(user_id, feed_key)
+    
+    async def resolve_feed_token(self, token: str) -> str:
+        """
+        Resolve a feed token to its user.
+        
+        Args:
+            token: Token from the feed URL
+        
+        Returns:
+            User's ID
+        
+        Raises:
+            NotFoundException: If the token is invalid or has been rotated
+        """
+        data = token_manager.verify_calendar_feed_token(token)
+        
+        if not data or data.get("type") != "calendar_feed" or not ObjectId.is_valid(data.get("user_id")):
+            raise NotFoundException("Calendar feed not found")
+        
+        user = await self.users_collection.find_one(
+            {"_id": ObjectId(data["user_id"]), "calendarFeedKey": data.get("key")},
+            {"_id": 1}
+        )
+        
+        if not user:
+            raise NotFoundException("Calendar feed not found")
+        
+        return data["user_id"]
+    
+    async def _render_feed(self, user_id: str) -> str:
+        """Render a user's feed from tasks due from calendar_feed_past_days ago onwards."""
+        since = datetime.utcnow() - timedelta(days=settings.calendar_feed_past_days)
+        
+        tasks = await self.tasks_collection.find(
+            {
+                "$or": [
+                    {"userId": user_id},
+                    {"collaborators.userId": user_id}
+                ],
+                "dueDate": {"$gte": since},
+                "isDeleted": {"$ne": True}
+            },
+            {"title": 1, "description": 1, "status": 1, "dueDate": 1, "updatedAt": 1}
+        ).sort("dueDate", 1).to_list(length=None)
+        
+        frontend_url = settings.frontend_url.rstrip("/")
+        events = [
+            {
+                "uid": f"{task['_id']}@taskflow",
+                "start": task["dueDate"],
+                "end": task["dueDate"] + timedelta(minutes=30),
+                "stamp": task.get("updatedAt") or task["dueDate"],
+                "summary": f"✓ {task['title']}" if task.get("status") == "done" else task["title"],
+                "description": task.get("description"),
+                "url": f"{frontend_url}/tasks/{task['_id']}"
+            }
+            for task in tasks
+        ]
+        
+        return build_calendar("TaskFlow Tasks", events)
+    
+    async def get_feed(self, user_id: str) -> Tuple[str, Tuple[int, date]]:
+        """
+        Get a user's rendered iCalendar feed.
+        
+        The feed is rendered once per tasks version (and day, since its date
+        window slides) and served from memory until any task visible to the
+        user changes.
+        
+        Args:
+            user_id: User's ID
+        
+        Returns:
+            Tuple of (ics body, (tasks version, day) it was rendered for)
+        """
+        version = await self.version_service.get_version(user_id, "tasks")
+        key = (version, datetime.utcnow().date())
+        
+        cached = self._feed_cache.get(user_id)
+        if cached and cached[0] == key:
+            self._feed_cache.move_to_end(user_id)
+            return cached[1], key
+        
+        body = await self._render_feed(user_id)
+        
+        self._feed_cache[user_id] = (key, body)
+        self._feed_cache.move_to_end(user_id)
+        while len(self._feed_cache) > settings.calendar_feed_cache_size:
+            self._feed_cache.popitem(last=False)
+        
+        return body, key
@@ -0,0 +1,356 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId, Binary
+from fastapi import WebSocket
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+import asyncio
+
+from pycrdt import (
+    Doc, Text, YMessageType, YSyncMessageType,
+    create_sync_message, create_update_message, handle_sync_message, merge_updates, read_message
+)
+
+from app.config import settings
+from app.services.note_history_service import NoteHistoryService
+from app.services.note_similarity_service import NoteSimilarityService
+from app.services.version_service import VersionService
+from app.utils.compression import compress_content, decompress_content
+from app.utils.excerpt import make_excerpt
+from app.utils.exceptions import NotFoundException, ValidationException
+from app.utils.text_patch import content_hash, diff_edits
+
+
+EMPTY_UPDATE = b"\x00\x00"
+
+# WebSocket close codes (4000-4999 are application-defined)
+CLOSE_SERVICE_RESTART = 1012
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOTE_GONE = 4404
+
+
+class CollabRoom:
+    """A note's shared document and the editors connected to it."""
+
+    def __init__(self, note_id: str, doc: Doc, text: Text, persisted_hash: str):
+        self.note_id = note_id
+        self.doc = doc
+        self.text = text
+        self.persisted_hash = persisted_hash
+        self.connections: Dict[WebSocket, Dict[str, Any]] = {}  # Socket -> {"userId", "canEdit"}
+        self.batch: List[tuple] = []  # (sending socket or None, update)
+        self.flush_task: Optional[asyncio.Task] = None
+        self.dirty = False
+
+
+class CollabService:
+    """
+    Real-time collaborative note editing.
+
+    Each note being edited has a room holding a Yjs document (via pycrdt)
+    whose "content" text mirrors the note's content. Clients speak the
+    y-websocket protocol: sync step 1/2 on connect, then incremental
+    updates. Updates received within collab_batch_ms are merged into one
+    message per recipient; awareness messages (cursors, presence) are
+    relayed immediately. Rooms with changes are persisted to the notes
+    collection every collab_persist_seconds and when the last editor
+    leaves, together with the compacted Yjs state, so clients that
+    reconnect with local state merge into the same document.
+
+    Rooms live in this process: when running several workers, a note's
+    WebSocket connections must be routed to the same worker.
+    """
+
+    _rooms: Dict[str, CollabRoom] = {}
+    _lock = asyncio.Lock()
+
+    metrics: Dict[str, int] = {"updates": 0, "batches": 0, "persists": 0}
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.notes_collection = db.notes
+        self.states_collection = db.note_collab_states
+        self.version_service = VersionService(db)
+
+    # Document helpers
+
+    @staticmethod
+    def _replace_text(room: CollabRoom, content: str) -> None:
+        """Edit the shared text into `content` with a minimal (line-level) diff."""
+        current = str(room.text)
+        edits = diff_edits(current, content)
+        if not edits:
+            return
+
+        # Yjs text offsets count UTF-8 bytes; diff offsets count code points
+        byte_offsets = []
+        position = byte_position = 0
+        for edit in edits:
+            byte_position += len(current[position:edit["offset"]].encode("utf-8"))
+            start = byte_position
+            byte_position += len(current[edit["offset"]:edit["offset"] + edit["delete"]].encode("utf-8"))
+            position = edit["offset"] + edit["delete"]
+            byte_offsets.append((start, byte_position, edit["insert"]))
+
+        with room.doc.transaction():
+            # Back to front, so earlier offsets stay valid
+            for start, end, insert in reversed(byte_offsets):
+                if end > start:
+                    del room.text[start:end]
+                if insert:
+                    room.text.insert(start, insert)
+
+    async def _load(self, note_id: str) -> CollabRoom:
+        """Build a room from the note's content and saved CRDT state."""
+        note = await self.notes_collection.find_one({"_id": ObjectId(note_id)}, {"content": 1})
+        if not note:
+            raise NotFoundException(f"Note with ID {note_id} not found")
+        content = decompress_content(note.get("content")) or ""
+
+        doc = Doc()
+        text = doc.get("content", type=Text)
+        saved = await self.states_collection.find_one({"_id": note_id}, {"state": 1})
+        if saved:
+            doc.apply_update(bytes(saved["state"]))
+
+        room = CollabRoom(note_id, doc, text, content_hash(content))
+        # Content may have been saved through the REST API since the state was saved
+        self._replace_text(room, content)
+        return room
+
+    # Connections
+
+    async def join(self, note_id: str, websocket: WebSocket, user_id: str, can_edit: bool) -> CollabRoom:
+        """
+        Add an accepted WebSocket to the note's room (opening it if needed) and start syncing.
+
+        Args:
+            note_id: Note's ObjectId as string
+            websocket: Accepted connection
+            user_id: Connected user's ID
+            can_edit: Whether the user's updates are applied (viewers only receive)
+
+        Returns:
+            The note's room
+
+        Raises:
+            NotFoundException: If the note doesn't exist
+            ValidationException: If the room is full
+        """
+        async with self._lock:
+            room = self._rooms.get(note_id)
+            if room is None:
+                room = await self._load(note_id)
+                self._rooms[note_id] = room
+
+            if len(room.connections) >= settings.collab_max_connections_per_note:
+                raise ValidationException("Too many editors are connected to this note")
+            room.connections[websocket] = {"userId": user_id, "canEdit": can_edit}
+
+        await websocket.send_bytes(create_sync_message(room.doc))
+        return room
+
+    async def leave(self, room: CollabRoom, websocket: WebSocket) -> None:
+        """Remove a connection; the last one out persists and closes the room."""
+        room.connections.pop(websocket, None)
+        if room.connections or self._rooms.get(room.note_id) is not room:
+            return
+
+        await self.persist(room)
+
+        async with self._lock:
+            # Someone may have joined while persisting
+            if not room.connections and self._rooms.get(room.note_id) is room:
+                del self._rooms[room.note_id]
+                if room.flush_task:
+                    room.flush_task.cancel()
+
+    @classmethod
+    async def _close_connections(cls, connections: List[WebSocket], code: int) -> None:
+        for websocket in connections:
+            try:
+                await websocket.close(code=code)
+            except Exception:
+                pass  # Already closed
+
+    @classmethod
+    async def close_room(cls, note_id: str, code: int = CLOSE_NOTE_GONE) -> None:
+        """Disconnect everyone from a note's room without persisting it (e.g. the note was deleted)."""
+        room = cls._rooms.pop(note_id, None)
+        if room is None:
+            return
+        if room.flush_task:
+            room.flush_task.cancel()
+        await cls._close_connections(list(room.connections), code)
+
+    async def save_and_close_room(self, note_id: str, code: int = CLOSE_NOTE_GONE) -> None:
+        """Persist a note's room, then disconnect everyone from it (e.g. the note was trashed)."""
+        room = self._rooms.get(note_id)
+        if room is not None:
+            await self.persist(room)
+            await self.close_room(note_id, code)
+
+    @classmethod
+    async def disconnect_user(cls, note_id: str, user_id: str) -> None:
+        """Disconnect a user who lost access to a note."""
+        room = cls._rooms.get(note_id)
+        if room is not None:
+            await cls._close_connections(
+                [ws for ws, info in room.connections.items() if info["userId"] == user_id],
+                CLOSE_FORBIDDEN
+            )
+
+    # Messages
+
+    async def handle_message(self, room: CollabRoom, websocket: WebSocket, message: bytes) -> None:
+        """
+        Handle one y-websocket protocol message from a client.
+
+        Raises:
+            ValidationException: If the message is malformed
+        """
+        try:
+            if message[0] == YMessageType.SYNC:
+                if message[1] == YSyncMessageType.SYNC_STEP1:
+                    reply = handle_sync_message(message[1:], room.doc)
+                    await websocket.send_bytes(reply)
+                elif message[1] in (YSyncMessageType.SYNC_STEP2, YSyncMessageType.SYNC_UPDATE):
+                    update = read_message(message[2:])
+                    if update != EMPTY_UPDATE and room.connections.get(websocket, {}).get("canEdit"):
+                        room.doc.apply_update(update)
+                        room.dirty = True
+                        self.metrics["updates"] += 1
+                        self._queue(room, websocket, update)
+            elif message[0] == YMessageType.AWARENESS:
+                await self._send(room, message, exclude=websocket)
+        except (IndexError, AssertionError, ValueError, RuntimeError) as e:
+            raise ValidationException("Malformed collaboration message") from e
+
+    @staticmethod
+    async def _send(room: CollabRoom, message: bytes, exclude: Optional[WebSocket] = None) -> None:
+        targets = [ws for ws in room.connections if ws is not exclude]
+        # A failed send surfaces as a disconnect in that connection's receive loop
+        await asyncio.gather(*(ws.send_bytes(message) for ws in targets), return_exceptions=True)
+
+    @classmethod
+    def _queue(cls, room: CollabRoom, sender: Optional[WebSocket], update: bytes) -> None:
+        """Queue an update for the room's next broadcast batch."""
+        room.batch.append((sender, update))
+        if room.flush_task is None:
+            room.flush_task = asyncio.get_running_loop().create_task(cls._broadcast_batch(room))
+
+    @classmethod
+    async def _broadcast_batch(cls, room: CollabRoom) -> None:
+        """After collab_batch_ms, send each connection one merged update of what others changed."""
+        await asyncio.sleep(settings.collab_batch_ms / 1000)
+        batch, room.batch = room.batch, []
+        room.flush_task = None
+
+        senders = {sender for sender, _ in batch}
+        merged: Dict[Optional[WebSocket], bytes] = {}  # Keyed by the sender left out (None: nobody)
+        sends = []
+        for websocket in list(room.connections):
+            key = websocket if websocket in senders else None
+            if key not in merged:
+                updates = [update for sender, update in batch if key is None or sender is not key]
+                merged[key] = create_update_message(merge_updates(*updates)) if updates else b""
+            if merged[key]:
+                sends.append(websocket.send_bytes(merged[key]))
+
+        await asyncio.gather(*sends, return_exceptions=True)
+        cls.metrics["batches"] += 1
+
+    @classmethod
+    def apply_content(cls, note_id: str, content: str) -> None:
+        """
+        Merge content saved through the REST API into an open room (called by NoteService).
+
+        Connected editors receive the difference as a regular update.
+        """
+        room = cls._rooms.get(note_id)
+        if room is None or str(room.text) == content:
+            return
+
+        state = room.doc.get_state()
+        cls._replace_text(room, content)
+        room.persisted_hash = content_hash(content)
+        cls._queue(room, None, room.doc.get_update(state))
+
+    # Persistence
+
+    async def persist(self, room: CollabRoom) -> None:
+        """Save a room's content to its note (if changed) and its CRDT state."""
+        if not room.dirty:
+            return
+        room.dirty = False
+
+        content = str(room.text)
+        digest = content_hash(content)
+        now = datetime.utcnow()
+        try:
+            if digest != room.persisted_hash:
+                note = await self.notes_collection.find_one_and_update(
+                    {"_id": ObjectId(room.note_id)},
+                    {
+                        "$set": {
+                            "content": compress_content(content),
+                            "contentHash": digest,
+                            "excerpt": make_excerpt(content, settings.note_excerpt_length),
+                            "updatedAt": now
+                        },
+                        "$inc": {"version": 1}
+                    },
+                    projection={"userId": 1, "collaborators.userId": 1}
+                )
+                if not note:
+                    await self.close_room(room.note_id)
+                    return
+
+                room.persisted_hash = digest
+                NoteHistoryService.enqueue(room.note_id)
+                NoteSimilarityService.enqueue(room.note_id)
+                await self.version_service.bump(
+                    [note["userId"]] + [c["userId"] for c in note.get("collaborators", [])],
+                    "notes"
+                )
+
+            await self.states_collection.update_one(
+                {"_id": room.note_id},
+                {"$set": {"state": Binary(room.doc.get_update()), "contentHash": digest, "updatedAt": now}},
+                upsert=True
+            )
+            self.metrics["persists"] += 1
+        except Exception:
+            room.dirty = True  # Retry on the next run
+            raise
+
+    @classmethod
+    async def persist_all(cls, db: AsyncIOMotorDatabase) -> None:
+        """Persist every room with unsaved changes (run periodically by BackgroundJobs)."""
+        service = cls(db)
+        for room in list(cls._rooms.values()):
+            try:
+                await service.persist(room)
+            except Exception as e:
+                print(f"⚠️ Could not persist collaborative edits of note {room.note_id}: {e}")
+
+    @classmethod
+    async def shutdown(cls, db: AsyncIOMotorDatabase) -> None:
+        """Persist all rooms and disconnect their editors (called on app shutdown)."""
+        await cls.persist_all(db)
+        for note_id in list(cls._rooms):
+            await cls.close_room(note_id, CLOSE_SERVICE_RESTART)
+
+    async def delete_state(self, note_ids: List[str]) -> None:
+        """Delete saved CRDT state of permanently deleted notes."""
+        if note_ids:
+            await self.states_collection.delete_many({"_id": {"$in": note_ids}})
+
+    @classmethod
+    def report(cls) -> Dict[str, int]:
+        """Summarize open rooms (for the detailed health check)."""
+        return {
+            **cls.metrics,
+            "rooms": len(cls._rooms),
+            "connections": sum(len(room.connections) for room in cls._rooms.values())
+        }
@@ -0,0 +1,219 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone
+import heapq
+import itertools
+import os
+import socket
+import uuid
+
+from app.config import settings
+from app.services.notification_service import NotificationService
+
+
+DUE_SOON = "dueSoon"
+OVERDUE = "overdue"
+
+
+class DueDateScheduler:
+    """
+    In-process scheduler for task "due soon" and "overdue" notifications.
+
+    Upcoming reminders live in a min-heap keyed by fire time, seeded from an
+    indexed dueDate range query and kept current by TaskService hooks.
+    Entries are invalidated lazily: a popped entry fires only if the task's
+    scheduled due date still matches. Only the worker holding the lease
+    document fires reminders; each task records which due date it was
+    reminded for, so a lease handover never sends duplicates.
+    """
+
+    _heap: List[Tuple[datetime, int, str, str, datetime]] = []
+    _due_dates: Dict[str, datetime] = {}  # taskId -> due date the heap entries are for
+    _counter = itertools.count()
+    _worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    _is_leader = False
+    _seeded_at: Optional[datetime] = None
+
+    LEASE_ID = "due_date_scheduler"
+
+    # Heap maintenance (called by TaskService on every write)
+
+    @classmethod
+    def _horizon(cls, now: datetime) -> datetime:
+        return now + timedelta(hours=settings.due_scheduler_horizon_hours)
+
+    @classmethod
+    def schedule(cls, task: Dict[str, Any]) -> None:
+        """
+        Schedule (or reschedule) reminders for a task.
+
+        Tasks that are done, trashed, have no due date, or are due beyond the
+        scheduling horizon are dropped; the periodic reseed picks the latter
+        up once they come into range.
+        """
+        task_id = str(task["_id"])
+        due_date = task.get("dueDate")
+
+        if isinstance(due_date, datetime) and due_date.tzinfo is not None:
+            # Request payloads may be tz-aware; MongoDB stores and returns naive UTC
+            due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
+
+        if (
+            not isinstance(due_date, datetime)
+            or task.get("status") == "done"
+            or task.get("isDeleted")
+            or due_date > cls._horizon(datetime.utcnow())
+        ):
+            cls.unschedule(task_id)
+            return
+
+        if cls._due_dates.get(task_id) == due_date:
+            return
+
+        cls._due_dates[task_id] = due_date
+        due_soon_at = due_date - timedelta(minutes=settings.due_soon_minutes)
+        heapq.heappush(cls._heap, (due_soon_at, next(cls._counter), task_id, DUE_SOON, due_date))
+        heapq.heappush(cls._heap, (due_date, next(cls._counter), task_id, OVERDUE, due_date))
+
+    @classmethod
+    def unschedule(cls, task_id: str) -> None:
+        """Cancel a task's pending reminders (stale heap entries are skipped when popped)."""
+        cls._due_dates.pop(task_id, None)
+
+    @classmethod
+    def _pop_due(cls, now: datetime) -> List[Tuple[str, str, datetime]]:
+        """Pop every live entry whose fire time has passed."""
+        due = []
+        while cls._heap and cls._heap[0][0] <= now:
+            _, _, task_id, kind, due_date = heapq.heappop(cls._heap)
+            if cls._due_dates.get(task_id) != due_date:
+                continue  # Rescheduled or cancelled since it was pushed
+            if kind == DUE_SOON and due_date <= now:
+                continue  # Already overdue; only the overdue reminder is sent
+            due.append((task_id, kind, due_date))
+            if kind == OVERDUE:
+                cls._due_dates.pop(task_id, None)
+        return due
+
+    # Lease and firing (run once a minute by BackgroundJobs)
+
+    @classmethod
+    async def _acquire_lease(cls, db: AsyncIOMotorDatabase, now: datetime) -> bool:
+        """Take or renew the scheduler lease; False if another worker holds it."""
+        try:
+            await db.scheduler_leases.find_one_and_update(
+                {
+                    "_id": cls.LEASE_ID,
+                    "$or": [
+                        {"holder": cls._worker_id},
+                        {"expiresAt": {"$lt": now}}
+                    ]
+                },
+                {"$set": {
+                    "holder": cls._worker_id,
+                    "expiresAt": now + timedelta(seconds=settings.due_scheduler_lease_seconds)
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    @classmethod
+    async def seed(cls, db: AsyncIOMotorDatabase) -> int:
+        """
+        Rebuild the heap from tasks due within the scheduling window.
+
+        Returns:
+            Number of tasks scheduled
+        """
+        now = datetime.utcnow()
+        cursor = db.tasks.find(
+            {
+                "dueDate": {
+                    "$gte": now - timedelta(hours=settings.due_scheduler_overdue_lookback_hours),
+                    "$lte": cls._horizon(now)
+                },
+                "isDeleted": {"$ne": True},
+                "status": {"$ne": "done"}
+            },
+            {"dueDate": 1, "status": 1, "isDeleted": 1}
+        )
+
+        cls._heap = []
+        cls._due_dates = {}
+        count = 0
+        async for task in cursor:
+            cls.schedule(task)
+            count += 1
+
+        cls._seeded_at = now
+        return count
+
+    @classmethod
+    async def _fire(cls, db: AsyncIOMotorDatabase, due: List[Tuple[str, str, datetime]]) -> int:
+        """Send one batch of reminders, skipping tasks already reminded or no longer due."""
+        sent = 0
+
+        for kind in (DUE_SOON, OVERDUE):
+            expected = {
+                task_id: due_date
+                for task_id, entry_kind, due_date in due
+                if entry_kind == kind and ObjectId.is_valid(task_id)
+            }
+            if not expected:
+                continue
+
+            tasks = await db.tasks.find(
+                {
+                    "_id": {"$in": [ObjectId(task_id) for task_id in expected]},
+                    "isDeleted": {"$ne": True},
+                    "status": {"$ne": "done"}
+                },
+                {"title": 1, "dueDate": 1, "userId": 1, "collaborators": 1}
+            ).to_list(length=None)
+
+            claimed = []
+            for task in tasks:
+                if task.get("dueDate") != expected[str(task["_id"])]:
+                    continue
+                # Claim before sending so a concurrent or later leader never resends
+                result = await db.tasks.update_one(
+                    {"_id": task["_id"], f"dueReminders.{kind}": {"$ne": task["dueDate"]}},
+                    {"$set": {f"dueReminders.{kind}": task["dueDate"]}}
+                )
+                if result.modified_count:
+                    claimed.append(task)
+
+            if claimed:
+                sent += await NotificationService(db).notify_tasks_due(claimed, overdue=(kind == OVERDUE))
+
+        return sent
+
+    @classmethod
+    async def tick(cls, db: AsyncIOMotorDatabase) -> int:
+        """
+        Run one scheduler cycle: hold the lease, reseed if needed, fire due reminders.
+
+        Returns:
+            Number of notifications sent
+        """
+        now = datetime.utcnow()
+
+        if not await cls._acquire_lease(db, now):
+            cls._is_leader = False
+            return 0
+
+        reseed_after = timedelta(minutes=settings.due_scheduler_reseed_minutes)
+        if not cls._is_leader or cls._seeded_at is None or now - cls._seeded_at >= reseed_after:
+            # Other workers' writes only reach their own heaps; reseeding catches them up
+            await cls.seed(db)
+        cls._is_leader = True
+
+        due = cls._pop_due(now)
+        if not due:
+            return 0
+
+        return await cls._fire(db, due)
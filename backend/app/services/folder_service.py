@@ -1,37 +1,148 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Iterable, Tuple
 from datetime import datetime
+import asyncio
+import re
 
+from app.config import settings
+from app.schemas.task import TaskStatus
+from app.services.sync_service import SyncService
+from app.services.version_service import VersionService
 from app.utils.exceptions import NotFoundException, ValidationException
 
 
 class FolderService:
-    """Service for folder operations."""
+    """
+    Service for folder operations.
+    
+    Folders nest: each stores its parentId and a materialized path of folder
+    IDs from the top level down to itself ("/<root>/<child>/"), so a whole
+    subtree is one anchored prefix query on the path index and moving a
+    subtree is one bulk rewrite of its paths. Tasks and notes only reference
+    their folderId and are never rewritten when folders move.
+    """
+    
+    # Folder contents summaries per user: userId -> ((contents version, folders version), summary)
+    _summary_cache: "OrderedDict[str, Tuple[Tuple[int, int], List[Dict[str, Any]]]]" = OrderedDict()
+    
+    # Task and note fields that change a folder contents summary
+    SUMMARY_FIELDS = ("folderId", "isDeleted", "status")
     
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.folders_collection = db.folders
         self.teams_collection = db.teams
+        self.tasks_collection = db.tasks
+        self.notes_collection = db.notes
+        self.version_service = VersionService(db)
+        self.sync_service = SyncService(db)
+    
+    @staticmethod
+    def _path(folder: Dict[str, Any]) -> str:
+        """Get a folder's materialized path (folders from before nesting are top-level)."""
+        return folder.get("path") or f"/{folder['_id']}/"
+    
+    @staticmethod
+    def _depth(path: str) -> int:
+        """Get the nesting level of a path (1 for top-level folders)."""
+        return path.count("/") - 1
+    
+    @staticmethod
+    def _under(path: str) -> Dict[str, str]:
+        """Query condition for paths inside a folder's subtree (an index range scan)."""
+        return {"$regex": f"^{re.escape(path)}"}
+    
+    async def _rebase_paths(
+        self,
+        user_id: str,
+        old_path: str,
+        new_path: str,
+        parent_update: Dict[str, Any]
+    ) -> int:
+        """
+        Move every folder under old_path to new_path in one bulk update.
+        
+        Args:
+            user_id: Owner's ID
+            old_path: Path prefix being replaced
+            new_path: Path prefix replacing it
+            parent_update: Aggregation expression for the new parentId
+        
+        Returns:
+            Number of folders updated
+        """
+        result = await self.folders_collection.update_many(
+            {"userId": user_id, "path": self._under(old_path)},
+            [{"$set": {
+                "path": {"$concat": [
+                    new_path,
+                    {"$substrCP": ["$path", len(old_path), {"$strLenCP": "$path"}]}
+                ]},
+                "parentId": parent_update,
+                "updatedAt": datetime.utcnow()
+            }}]
+        )
+        return result.modified_count
     
     async def get_folders(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all folders for a user."""
         folders = await self.folders_collection.find({"userId": user_id}).to_list(length=None)
         return folders
     
+    async def _get_parent_path(self, parent_id: Optional[str], user_id: str) -> str:
+        """Get the path a folder under parent_id starts with ("/" for top level)."""
+        if not parent_id:
+            return "/"
+        if not ObjectId.is_valid(parent_id):
+            raise ValidationException("Invalid parent folder ID format")
+        
+        parent = await self.folders_collection.find_one(
+            {"_id": ObjectId(parent_id), "userId": user_id},
+            {"path": 1}
+        )
+        if not parent:
+            raise NotFoundException("Parent folder not found")
+        
+        return self._path(parent)
+    
     async def create_folder(self, user_id: str, folder_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new folder."""
+        """
+        Create a new folder.
+        
+        Args:
+            user_id: User's ID
+            folder_data: Folder data (name, color, optional parentId)
+        
+        Returns:
+            Created folder document
+        
+        Raises:
+            NotFoundException: If the parent folder doesn't exist
+            ValidationException: If the parent ID is invalid or nesting is too deep
+        """
+        parent_id = folder_data.get("parentId") or None
+        parent_path = await self._get_parent_path(parent_id, user_id)
+        if self._depth(parent_path) >= settings.folder_max_depth:
+            raise ValidationException(f"Folders can be nested at most {settings.folder_max_depth} levels deep")
+        
+        folder_id = ObjectId()
         folder_doc = {
+            "_id": folder_id,
             "userId": user_id,
             "name": folder_data.get("name"),
             "color": folder_data.get("color", ""),
+            "parentId": parent_id,
+            "path": f"{parent_path}{folder_id}/",
             "sharedWithTeams": [],
             "createdAt": datetime.utcnow(),
             "updatedAt": datetime.utcnow()
         }
         
-        result = await self.folders_collection.insert_one(folder_doc)
-        folder_doc["_id"] = result.inserted_id
+        await self.folders_collection.insert_one(folder_doc)
+        
+        await self.version_service.bump([user_id], "folders")
         
         return folder_doc
     
@@ -61,23 +172,258 @@ class FolderService:
         if not result:
             raise NotFoundException("Folder not found")
         
+        await self.version_service.bump([user_id], "folders")
+        
         return result
     
     async def delete_folder(self, folder_id: str, user_id: str) -> Dict[str, str]:
-        """Delete a folder."""
+        """Delete a folder; its subfolders move up to the deleted folder's parent."""
         try:
-            result = await self.folders_collection.delete_one({
-                "_id": ObjectId(folder_id),
-                "userId": user_id
-            })
+            folder = await self.folders_collection.find_one_and_delete(
+                {"_id": ObjectId(folder_id), "userId": user_id},
+                projection={"parentId": 1, "path": 1}
+            )
         except Exception:
             raise NotFoundException("Folder not found")
         
-        if result.deleted_count == 0:
+        if not folder:
             raise NotFoundException("Folder not found")
         
+        old_path = self._path(folder)
+        await self._rebase_paths(
+            user_id,
+            old_path,
+            old_path[:-len(folder_id) - 1],
+            {"$cond": [{"$eq": ["$parentId", folder_id]}, folder.get("parentId"), "$parentId"]}
+        )
+        
+        await self.version_service.bump([user_id], "folders")
+        await self.sync_service.record_tombstones([user_id], "folders", folder_id)
+        
         return {"message": "Folder deleted successfully"}
     
+    async def move_folder(
+        self,
+        folder_id: str,
+        user_id: str,
+        parent_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Move a folder, with all its subfolders, under another folder.
+        
+        Args:
+            folder_id: Folder's ObjectId as string
+            user_id: User's ID (for authorization, must own both folders)
+            parent_id: New parent folder's ID (None for top level)
+        
+        Returns:
+            Updated folder document
+        
+        Raises:
+            NotFoundException: If the folder or new parent doesn't exist
+            ValidationException: If an ID is invalid, the folder would move into
+                its own subtree, or nesting would get too deep
+        """
+        if not ObjectId.is_valid(folder_id):
+            raise ValidationException("Invalid folder ID format")
+        
+        folder = await self.folders_collection.find_one(
+            {"_id": ObjectId(folder_id), "userId": user_id},
+            {"path": 1}
+        )
+        if not folder:
+            raise NotFoundException("Folder not found")
+        
+        old_path = self._path(folder)
+        parent_path = await self._get_parent_path(parent_id, user_id)
+        if parent_path.startswith(old_path):
+            raise ValidationException("A folder can't be moved into itself or one of its subfolders")
+        
+        new_path = f"{parent_path}{folder_id}/"
+        if new_path != old_path:
+            subtree = await self.folders_collection.find(
+                {"userId": user_id, "path": self._under(old_path)},
+                {"path": 1}
+            ).to_list(length=None)
+            deepest = max([self._depth(f["path"]) for f in subtree] + [self._depth(old_path)])
+            if deepest - self._depth(old_path) + self._depth(new_path) > settings.folder_max_depth:
+                raise ValidationException(f"Folders can be nested at most {settings.folder_max_depth} levels deep")
+            
+            if "path" not in folder:
+                # Written before nesting: give it its path so the rebase below includes it
+                await self.folders_collection.update_one({"_id": folder["_id"]}, {"$set": {"path": old_path}})
+            
+            await self._rebase_paths(
+                user_id,
+                old_path,
+                new_path,
+                {"$cond": [{"$eq": ["$_id", folder["_id"]]}, parent_id or None, "$parentId"]}
+            )
+            await self.version_service.bump([user_id], "folders")
+        
+        return await self.folders_collection.find_one({"_id": folder["_id"]})
+    
+    async def get_subtree_ids(self, folder_id: str) -> List[str]:
+        """
+        Get the IDs of a folder and all folders nested under it.
+        
+        Args:
+            folder_id: Folder's ObjectId as string
+        
+        Returns:
+            Folder IDs, the folder itself first (just it when unknown)
+        """
+        if not ObjectId.is_valid(folder_id):
+            return [folder_id]
+        
+        folder = await self.folders_collection.find_one({"_id": ObjectId(folder_id)}, {"path": 1})
+        if not folder:
+            return [folder_id]
+        
+        descendants = await self.folders_collection.find(
+            {"path": self._under(self._path(folder)), "_id": {"$ne": folder["_id"]}},
+            {"_id": 1}
+        ).to_list(length=None)
+        return [folder_id] + [str(f["_id"]) for f in descendants]
+    
+    async def count_subtree(self, folder_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Count the subfolders, tasks and notes in a folder's subtree.
+        
+        Args:
+            folder_id: Folder's ObjectId as string
+            user_id: User's ID (must own the folder; counts tasks and notes they can see)
+        
+        Returns:
+            Dictionary with folderId, folders (nested below it), tasks and notes
+            (not trashed)
+        
+        Raises:
+            NotFoundException: If folder not found
+            ValidationException: If folder_id is invalid
+        """
+        if not ObjectId.is_valid(folder_id):
+            raise ValidationException("Invalid folder ID format")
+        
+        if not await self.folders_collection.find_one({"_id": ObjectId(folder_id), "userId": user_id}, {"_id": 1}):
+            raise NotFoundException("Folder not found")
+        
+        folder_ids = await self.get_subtree_ids(folder_id)
+        query = {
+            "$or": [{"userId": user_id}, {"collaborators.userId": user_id}],
+            "folderId": {"$in": folder_ids},
+            "isDeleted": {"$ne": True}
+        }
+        return {
+            "folderId": folder_id,
+            "folders": len(folder_ids) - 1,
+            "tasks": await self.tasks_collection.count_documents(query),
+            "notes": await self.notes_collection.count_documents(query)
+        }
+    
+    async def invalidate_summary(self, user_ids: Iterable[Optional[str]]) -> None:
+        """
+        Invalidate the folder contents summaries of the owners of changed tasks or notes.
+        
+        Called by TaskService and NoteService after writes that add or remove a
+        document or change one of SUMMARY_FIELDS. The counter is stored like the
+        collection versions, so summaries cached by every worker go stale together.
+        
+        Args:
+            user_ids: Owners of the changed documents
+        """
+        await self.version_service.bump(user_ids, "folder_contents")
+    
+    async def _build_summary(self, user_id: str) -> List[Dict[str, Any]]:
+        """Count a user's tasks (by status) and notes per folder with one $group per collection."""
+        match = {"$match": {"userId": user_id, "isDeleted": {"$ne": True}}}
+        folders, task_rows, note_rows = await asyncio.gather(
+            self.folders_collection.find({"userId": user_id}, {"path": 1}).to_list(length=None),
+            self.tasks_collection.aggregate([
+                match,
+                {"$group": {"_id": {"folderId": "$folderId", "status": "$status"}, "count": {"$sum": 1}}}
+            ]).to_list(length=None),
+            self.notes_collection.aggregate([
+                match,
+                {"$group": {"_id": "$folderId", "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+        )
+        
+        # None holds tasks and notes not in any folder
+        summary = {
+            folder_id: {
+                "folderId": folder_id,
+                "tasksByStatus": {s.value: 0 for s in TaskStatus},
+                "tasks": 0,
+                "notes": 0,
+                "subtreeTasks": 0,
+                "subtreeNotes": 0
+            }
+            for folder_id in [None] + [str(f["_id"]) for f in folders]
+        }
+        
+        for row in task_rows:
+            entry = summary.get(row["_id"].get("folderId") or None)
+            if entry is None:
+                continue  # Folder was deleted
+            status = row["_id"].get("status") or TaskStatus.TODO.value
+            entry["tasksByStatus"][status] = entry["tasksByStatus"].get(status, 0) + row["count"]
+            entry["tasks"] += row["count"]
+        for row in note_rows:
+            entry = summary.get(row["_id"] or None)
+            if entry is not None:
+                entry["notes"] += row["count"]
+        
+        # Roll counts up the tree: every folder on a path contains what's below it
+        for folder in folders:
+            entry = summary[str(folder["_id"])]
+            for ancestor_id in self._path(folder).strip("/").split("/"):
+                ancestor = summary.get(ancestor_id)
+                if ancestor is not None:
+                    ancestor["subtreeTasks"] += entry["tasks"]
+                    ancestor["subtreeNotes"] += entry["notes"]
+        summary[None]["subtreeTasks"] = summary[None]["tasks"]
+        summary[None]["subtreeNotes"] = summary[None]["notes"]
+        
+        return list(summary.values())
+    
+    async def get_summary(self, user_id: str) -> Tuple[List[Dict[str, Any]], Tuple[int, int]]:
+        """
+        Get task counts by status and note counts for each of a user's folders.
+        
+        The summary is computed once per (contents version, folders version)
+        and served from memory until a task or note write invalidates it
+        (see invalidate_summary) or folders change.
+        
+        Args:
+            user_id: User's ID
+        
+        Returns:
+            Tuple of (summary entries, (contents version, folders version) it was
+            computed for). Entries hold folderId (None for tasks and notes not in
+            a folder), tasksByStatus, tasks and notes directly in the folder, and
+            subtreeTasks and subtreeNotes including nested folders. Trashed tasks
+            and notes are not counted.
+        """
+        key = (
+            await self.version_service.get_version(user_id, "folder_contents"),
+            await self.version_service.get_version(user_id, "folders")
+        )
+        
+        cached = self._summary_cache.get(user_id)
+        if cached and cached[0] == key:
+            self._summary_cache.move_to_end(user_id)
+            return cached[1], key
+        
+        summary = await self._build_summary(user_id)
+        
+        self._summary_cache[user_id] = (key, summary)
+        self._summary_cache.move_to_end(user_id)
+        while len(self._summary_cache) > settings.folder_summary_cache_size:
+            self._summary_cache.popitem(last=False)
+        
+        return summary, key
+    
     async def share_folder(
         self,
         folder_id: str,
@@ -140,6 +486,8 @@ class FolderService:
             }
         )
         
+        await self.version_service.bump([user_id], "folders")
+        
         # Return updated folder
         updated_folder = await self.folders_collection.find_one({"_id": ObjectId(folder_id)})
         return updated_folder
@@ -186,6 +534,8 @@ class FolderService:
             }
         )
         
+        await self.version_service.bump([user_id], "folders")
+        
         # Return updated folder
         updated_folder = await self.folders_collection.find_one({"_id": ObjectId(folder_id)})
         return updated_folder
@@ -3,8 +3,12 @@ from bson import ObjectId
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date, timedelta
 import calendar
+from pymongo import ReturnDocument
 
-from app.utils.exceptions import NotFoundException, ValidationException
+from app.services.sync_service import SyncService
+from app.services.version_service import VersionService
+from app.utils.etag import version_condition
+from app.utils.exceptions import NotFoundException, PreconditionFailedException, ValidationException
 
 
 class HabitService:
@@ -16,6 +20,13 @@ class HabitService:
         self.habit_logs_collection = db.habit_logs
         self.users_collection = db.users
         self.dashboard_shares_collection = db.dashboard_shares
+        self.version_service = VersionService(db)
+        self.sync_service = SyncService(db)
+    
+    async def _bump_version(self, habit: Dict[str, Any]) -> None:
+        """Bump the habits collection version for the habit's owner and shared users."""
+        user_ids = [habit.get("userId")] + list(habit.get("sharedWith", []))
+        await self.version_service.bump(user_ids, "habits")
     
     async def get_habits(
         self,
@@ -145,11 +156,14 @@ class HabitService:
         if not habit:
             raise NotFoundException(f"Habit with ID {habit_id} not found or you don't have access")
         
-        # Calculate streaks
+        return await self._with_streaks(habit)
+    
+    async def _with_streaks(self, habit: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the streak and completion counts derived from a habit's logs."""
+        habit_id = str(habit["_id"])
         habit["currentStreak"] = await self._calculate_current_streak(habit_id)
         habit["longestStreak"] = await self._calculate_longest_streak(habit_id)
         habit["totalCompletions"] = await self._count_total_completions(habit_id)
-        
         return habit
     
     async def create_habit(self, user_id: str, habit_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -175,6 +189,7 @@ class HabitService:
             "color": habit_data.get("color"),
             "isActive": habit_data.get("isActive", True),
             "sharedWith": [],
+            "version": 1,
             "createdAt": now,
             "updatedAt": now
         }
@@ -182,6 +197,8 @@ class HabitService:
         result = await self.habits_collection.insert_one(habit_document)
         habit_document["_id"] = result.inserted_id
         
+        await self._bump_version(habit_document)
+        
         # Add initial streak info
         habit_document["currentStreak"] = 0
         habit_document["longestStreak"] = 0
@@ -193,7 +210,8 @@ class HabitService:
         self,
         habit_id: str,
         user_id: str,
-        habit_data: Dict[str, Any]
+        habit_data: Dict[str, Any],
+        expected_versions: Optional[List[int]] = None
     ) -> Dict[str, Any]:
         """
         Update a habit.
@@ -202,6 +220,7 @@ class HabitService:
             habit_id: Habit's ObjectId as string
             user_id: User's ID (for authorization, must be owner)
             habit_data: Updated habit data
+            expected_versions: Only update if the habit is at one of these versions (If-Match)
         
         Returns:
             Updated habit document
@@ -209,31 +228,31 @@ class HabitService:
         Raises:
             NotFoundException: If habit not found
             ValidationException: If user is not the owner
+            PreconditionFailedException: If the habit changed since the expected version
         """
         if not ObjectId.is_valid(habit_id):
             raise ValidationException("Invalid habit ID format")
         
-        # Check if habit exists and user is owner
-        habit = await self.habits_collection.find_one({
-            "_id": ObjectId(habit_id),
-            "userId": user_id
-        })
-        
-        if not habit:
-            raise NotFoundException(f"Habit with ID {habit_id} not found or you're not the owner")
-        
         # Prepare update data
         update_data = {**habit_data, "updatedAt": datetime.utcnow()}
         
-        # Update habit
-        await self.habits_collection.update_one(
-            {"_id": ObjectId(habit_id)},
-            {"$set": update_data}
+        # Update habit (ownership and If-Match are checked by the same write)
+        updated_habit = await self.habits_collection.find_one_and_update(
+            {"_id": ObjectId(habit_id), "userId": user_id, **version_condition(expected_versions)},
+            {"$set": update_data, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER
         )
         
-        # Return updated habit with streaks
-        updated_habit = await self.get_habit_by_id(habit_id, user_id)
-        return updated_habit
+        if not updated_habit:
+            if expected_versions is not None and await self.habits_collection.find_one(
+                {"_id": ObjectId(habit_id), "userId": user_id}, {"_id": 1}
+            ):
+                raise PreconditionFailedException("Habit has been modified since it was read")
+            raise NotFoundException(f"Habit with ID {habit_id} not found or you're not the owner")
+        
+        await self._bump_version(updated_habit)
+        
+        return await self._with_streaks(updated_habit)
     
     async def delete_habit(self, habit_id: str, user_id: str) -> Dict[str, str]:
         """
@@ -265,9 +284,11 @@ class HabitService:
         # Archive habit (set isActive to False)
         await self.habits_collection.update_one(
             {"_id": ObjectId(habit_id)},
-            {"$set": {"isActive": False, "updatedAt": datetime.utcnow()}}
+            {"$set": {"isActive": False, "updatedAt": datetime.utcnow()}, "$inc": {"version": 1}}
         )
         
+        await self._bump_version(habit)
+        
         return {"message": "Habit archived successfully"}
     
     async def log_habit(
@@ -357,6 +378,9 @@ class HabitService:
             result = await self.habit_logs_collection.insert_one(log_document)
             log_document["_id"] = result.inserted_id
         
+        # Streaks and completion flags in the habit list depend on logs
+        await self._bump_version(habit)
+        
         return log_document
     
     async def delete_habit_log(
@@ -402,6 +426,13 @@ class HabitService:
             if result.deleted_count == 0:
                 raise NotFoundException(f"Log not found for date {log_date}")
         
+        habit = await self.habits_collection.find_one(
+            {"_id": ObjectId(habit_id)},
+            {"userId": 1, "sharedWith": 1}
+        )
+        if habit:
+            await self._bump_version(habit)
+        
         return {"message": "Log deleted successfully"}
     
     async def get_habit_logs(
@@ -528,15 +559,6 @@ class HabitService:
         if not ObjectId.is_valid(habit_id):
             raise ValidationException("Invalid habit ID format")
         
-        # Check if habit exists and user is owner
-        habit = await self.habits_collection.find_one({
-            "_id": ObjectId(habit_id),
-            "userId": owner_id
-        })
-        
-        if not habit:
-            raise NotFoundException(f"Habit with ID {habit_id} not found or you're not the owner")
-        
         # Find user to share with
         target_user_id = share_user_id
         if share_email and not share_user_id:
@@ -548,22 +570,25 @@ class HabitService:
         if not target_user_id:
             raise ValidationException("Must provide either userId or email")
         
-        # Check if already shared
-        if target_user_id in habit.get("sharedWith", []):
-            raise ValidationException("Habit is already shared with this user")
-        
-        # Share habit
-        await self.habits_collection.update_one(
-            {"_id": ObjectId(habit_id)},
+        # Share habit (ownership and "not yet shared" are checked by the same write)
+        updated_habit = await self.habits_collection.find_one_and_update(
+            {"_id": ObjectId(habit_id), "userId": owner_id, "sharedWith": {"$ne": target_user_id}},
             {
                 "$addToSet": {"sharedWith": target_user_id},
-                "$set": {"updatedAt": datetime.utcnow()}
-            }
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
+            },
+            return_document=ReturnDocument.AFTER
         )
         
-        # Return updated habit
-        updated_habit = await self.get_habit_by_id(habit_id, owner_id)
-        return updated_habit
+        if not updated_habit:
+            if await self.habits_collection.find_one({"_id": ObjectId(habit_id), "userId": owner_id}, {"_id": 1}):
+                raise ValidationException("Habit is already shared with this user")
+            raise NotFoundException(f"Habit with ID {habit_id} not found or you're not the owner")
+        
+        await self._bump_version(updated_habit)
+        
+        return await self._with_streaks(updated_habit)
     
     async def unshare_habit(
         self,
@@ -603,10 +628,15 @@ class HabitService:
             {"_id": ObjectId(habit_id)},
             {
                 "$pull": {"sharedWith": user_id},
-                "$set": {"updatedAt": datetime.utcnow()}
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
             }
         )
         
+        # The unshared user is still in the pre-update audience
+        await self._bump_version(habit)
+        await self.sync_service.record_tombstones([user_id], "habits", habit_id)
+        
         return {"message": "Habit unshared successfully"}
     
     async def get_habit_collaborators(
@@ -0,0 +1,224 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime
+
+from app.config import settings
+
+
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$exists", "$type", "$not"}
+
+
+class IndexAdvisor:
+    """
+    In-process advisor that suggests compound indexes for the queries the API runs.
+
+    Services record each filtered/sorted query; the advisor groups them by
+    shape (which fields are matched by equality, sorted on, or ranged over)
+    and keeps one concrete sample per shape. A periodic review runs explain()
+    on the busiest shapes, flags collection scans and in-memory sorts, and
+    recommends an index ordered equality -> sort -> range (optionally
+    creating it when index_advisor_auto_create is on).
+    """
+
+    _shapes: Dict[str, Dict[str, Any]] = {}
+    _recommendations: Dict[str, Dict[str, Any]] = {}
+    _reviewed_at: Optional[datetime] = None
+
+    MAX_SHAPES = 500
+    INDEX_PREFIX = "advisor_"
+
+    # Shape extraction
+
+    @staticmethod
+    def _classify(condition: Any) -> str:
+        """Classify a field condition as an equality or range predicate."""
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            if set(condition) & RANGE_OPERATORS:
+                return "range"
+            return "equality"  # $eq, $in, $all, $elemMatch
+        return "equality"
+
+    @classmethod
+    def _branches(cls, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Flatten a query into its $or branches, each merged with the top-level predicates."""
+        base = {}
+        branches: List[Dict[str, Any]] = [{}]
+
+        for key, value in query.items():
+            if key == "$and":
+                for clause in value:
+                    sub = cls._branches(clause)
+                    branches = [{**b, **s} for b in branches for s in sub]
+            elif key == "$or":
+                branches = [{**b, **alt} for b in branches for alt in value]
+            elif not key.startswith("$"):
+                base[key] = value
+
+        return [{**base, **branch} for branch in branches]
+
+    @classmethod
+    def recommend_key(cls, query: Dict[str, Any], sort: List[Tuple[str, int]]) -> List[List[Tuple[str, int]]]:
+        """
+        Recommend index keys for a query (one per $or branch), following equality -> sort -> range.
+
+        Args:
+            query: MongoDB filter
+            sort: Sort specification as (field, direction) pairs
+
+        Returns:
+            Index key lists
+        """
+        sort_fields = [field for field, _ in sort]
+        keys = []
+
+        for branch in cls._branches(query):
+            nested = {}
+            for field, condition in branch.items():
+                if field.startswith("$"):
+                    continue
+                nested[field] = cls._classify(condition)
+
+            equality = sorted(f for f, kind in nested.items() if kind == "equality" and f not in sort_fields)
+            ranged = sorted(f for f, kind in nested.items() if kind == "range" and f not in sort_fields)
+
+            key = [(field, 1) for field in equality] + list(sort) + [(field, 1) for field in ranged]
+            if key and key not in keys:
+                keys.append(key)
+
+        return keys
+
+    @classmethod
+    def record(cls, collection: str, query: Dict[str, Any], sort: Optional[List[Tuple[str, int]]] = None) -> None:
+        """
+        Record a query the API just ran. Cheap enough to call on every request.
+
+        Args:
+            collection: Collection name
+            query: MongoDB filter that was executed
+            sort: Sort specification that was executed (optional)
+        """
+        if not settings.index_advisor_enabled:
+            return
+
+        sort = list(sort or [])
+        keys = cls.recommend_key(query, sort)
+        if not keys:
+            return
+
+        shape = f"{collection}:{keys!r}"
+        entry = cls._shapes.get(shape)
+        if entry is None:
+            if len(cls._shapes) >= cls.MAX_SHAPES:
+                return
+            entry = cls._shapes[shape] = {"collection": collection, "keys": keys, "count": 0}
+
+        entry["count"] += 1
+        entry["sample"] = (query, sort)
+        entry["lastSeen"] = datetime.utcnow()
+
+    # Review (run periodically by BackgroundJobs)
+
+    @staticmethod
+    def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+        """Collect every stage name in a query plan tree."""
+        stages = [plan.get("stage", "")]
+        for child_key in ("inputStage", "queryPlan"):
+            if isinstance(plan.get(child_key), dict):
+                stages.extend(IndexAdvisor._plan_stages(plan[child_key]))
+        for child in plan.get("inputStages", []):
+            stages.extend(IndexAdvisor._plan_stages(child))
+        return stages
+
+    @staticmethod
+    def _is_covered(key: List[Tuple[str, int]], existing: List[List[Tuple[str, int]]]) -> bool:
+        """Check whether an existing index starts with the recommended key."""
+        return any(index[:len(key)] == key for index in existing)
+
+    @classmethod
+    async def review(cls, db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+        """
+        Explain the busiest query shapes and recommend (or create) missing indexes.
+
+        Returns:
+            Current recommendations
+        """
+        busiest = sorted(cls._shapes.values(), key=lambda entry: entry["count"], reverse=True)
+        existing_by_collection: Dict[str, List[List[Tuple[str, int]]]] = {}
+        created = sum(1 for rec in cls._recommendations.values() if rec.get("created"))
+
+        for entry in busiest[:settings.index_advisor_max_shapes]:
+            if entry["count"] < settings.index_advisor_min_count:
+                break
+
+            collection = entry["collection"]
+            query, sort = entry["sample"]
+
+            cursor = db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            try:
+                explain = await cursor.explain()
+            except OperationFailure as e:
+                print(f"⚠️ Index advisor could not explain a {collection} query: {e}")
+                continue
+
+            stages = cls._plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+            collscan = "COLLSCAN" in stages
+            blocking_sort = "SORT" in stages
+            if not (collscan or blocking_sort):
+                continue
+
+            if collection not in existing_by_collection:
+                indexes = await db[collection].index_information()
+                existing_by_collection[collection] = [list(info["key"]) for info in indexes.values()]
+            existing = existing_by_collection[collection]
+
+            for key in entry["keys"]:
+                if cls._is_covered(key, existing):
+                    continue
+
+                name = cls.INDEX_PREFIX + "_".join(f"{field}_{direction}" for field, direction in key)
+                recommendation = cls._recommendations.setdefault(name, {
+                    "collection": collection,
+                    "key": key,
+                    "created": False
+                })
+                recommendation.update({
+                    "queries": entry["count"],
+                    "collectionScan": collscan,
+                    "inMemorySort": blocking_sort
+                })
+
+                if settings.index_advisor_auto_create and created < settings.index_advisor_max_auto_indexes:
+                    await db[collection].create_index(key, name=name, background=True)
+                    existing.append(key)
+                    recommendation["created"] = True
+                    created += 1
+                    print(f"✅ Index advisor created {collection}.{name}")
+                elif not recommendation["created"]:
+                    problem = "collection scan" if collscan else "in-memory sort"
+                    print(f"💡 Index advisor: {entry['count']} {collection} queries hit a {problem}; "
+                          f"consider create_index({key})")
+
+        cls._reviewed_at = datetime.utcnow()
+        return list(cls._recommendations.values())
+
+    @classmethod
+    def report(cls) -> Dict[str, Any]:
+        """Summarize tracked shapes and recommendations (for the detailed health check)."""
+        return {
+            "shapes": len(cls._shapes),
+            "reviewedAt": cls._reviewed_at,
+            "recommendations": [
+                {
+                    "collection": rec["collection"],
+                    "key": [list(part) for part in rec["key"]],
+                    "queries": rec.get("queries", 0),
+                    "collectionScan": rec.get("collectionScan", False),
+                    "inMemorySort": rec.get("inMemorySort", False),
+                    "created": rec["created"]
+                }
+                for rec in cls._recommendations.values()
+            ]
+        }
@@ -0,0 +1,214 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import asyncio
+import os
+import uuid
+
+import aiofiles
+import nh3
+from markdown_it import MarkdownIt
+
+from app.config import settings
+
+
+# Bump when rendering or sanitizing changes, so cached HTML from older rules is not served
+RENDER_VERSION = 1
+
+
+class MarkdownRenderer:
+    """
+    Renders note Markdown to sanitized HTML, cached by content hash.
+
+    Raw HTML in Markdown is escaped by the parser and the output is run
+    through nh3's allow-list sanitizer. Rendering runs in a thread pool so
+    large notes don't block the event loop. Results are kept in an LRU
+    bounded by size (counted in characters); entries evicted from memory
+    spill to disk (markdown_cache_dir) and are promoted back on their next hit.
+    Concurrent requests for the same content share one render.
+    """
+
+    _memory: "OrderedDict[str, str]" = OrderedDict()
+    _memory_size = 0
+    _disk_bytes_written = 0
+    _inflight: Dict[str, asyncio.Future] = {}
+    _executor: Optional[ThreadPoolExecutor] = None
+    _parser: Optional[MarkdownIt] = None
+
+    metrics: Dict[str, int] = {"memoryHits": 0, "diskHits": 0, "renders": 0, "spilled": 0}
+
+    # Rendering (runs in the worker pool)
+
+    @classmethod
+    def _render_sync(cls, content: str) -> str:
+        if cls._parser is None:
+            cls._parser = MarkdownIt("commonmark", {"html": False, "linkify": False}).enable(
+                ["table", "strikethrough"]
+            )
+        return nh3.clean(cls._parser.render(content))
+
+    @classmethod
+    def _pool(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=settings.markdown_render_workers,
+                thread_name_prefix="markdown"
+            )
+        return cls._executor
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Stop the worker pool (called on app shutdown)."""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    # Cache tiers
+
+    @staticmethod
+    def _key(digest: str) -> str:
+        return f"v{RENDER_VERSION}-{digest}"
+
+    @staticmethod
+    def _disk_path(key: str) -> str:
+        return os.path.join(settings.markdown_cache_dir, key[-2:], f"{key}.html")
+
+    @classmethod
+    def _remember(cls, key: str, html: str) -> None:
+        """Put HTML in the memory LRU, spilling the least recently used entries to disk."""
+        if key in cls._memory:
+            cls._memory.move_to_end(key)
+            return
+
+        cls._memory[key] = html
+        cls._memory_size += len(html)
+
+        while cls._memory_size > settings.markdown_cache_memory_mb * 1024 * 1024 and len(cls._memory) > 1:
+            evicted_key, evicted = cls._memory.popitem(last=False)
+            cls._memory_size -= len(evicted)
+            asyncio.get_running_loop().create_task(cls._spill(evicted_key, evicted))
+
+    @classmethod
+    async def _spill(cls, key: str, html: str) -> None:
+        """Write an evicted entry to the disk tier (best effort)."""
+        if settings.markdown_cache_disk_mb <= 0:
+            return
+
+        path = cls._disk_path(key)
+        if os.path.exists(path):
+            return
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{uuid.uuid4().hex}.part"
+            async with aiofiles.open(temp_path, "w", encoding="utf-8") as f:
+                await f.write(html)
+            os.replace(temp_path, path)  # Readers never see a partial file
+        except OSError as e:
+            print(f"⚠️ Markdown cache could not spill {key}: {e}")
+            return
+
+        cls.metrics["spilled"] += 1
+        cls._disk_bytes_written += len(html)
+        # Prune once a tenth of the budget has been written since the last prune
+        if cls._disk_bytes_written > settings.markdown_cache_disk_mb * 1024 * 1024 // 10:
+            cls._disk_bytes_written = 0
+            await asyncio.get_running_loop().run_in_executor(cls._pool(), cls._prune_disk)
+
+    @staticmethod
+    def _prune_disk() -> None:
+        """Delete the least recently used disk entries until the tier fits its budget."""
+        entries = []
+        for root, _, files in os.walk(settings.markdown_cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        budget = settings.markdown_cache_disk_mb * 1024 * 1024
+        for _, size, path in sorted(entries):
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    @classmethod
+    async def _load_from_disk(cls, key: str) -> Optional[str]:
+        path = cls._disk_path(key)
+        try:
+            async with aiofiles.open(path, "r", encoding="utf-8") as f:
+                html = await f.read()
+            os.utime(path)  # Keep recently read entries when pruning
+            return html
+        except OSError:
+            return None
+
+    # Public API
+
+    @staticmethod
+    def etag(digest: str) -> str:
+        """Strong ETag for the HTML rendered from content with this hash."""
+        return f'"html-v{RENDER_VERSION}-{digest[:32]}"'
+
+    @classmethod
+    async def render(cls, content: str, digest: str) -> str:
+        """
+        Get sanitized HTML for Markdown content.
+
+        Args:
+            content: Markdown source
+            digest: SHA-256 of the content (the cache key)
+
+        Returns:
+            Sanitized HTML
+        """
+        key = cls._key(digest)
+
+        html = cls._memory.get(key)
+        if html is not None:
+            cls._memory.move_to_end(key)
+            cls.metrics["memoryHits"] += 1
+            return html
+
+        inflight = cls._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        cls._inflight[key] = future
+        try:
+            html = await cls._load_from_disk(key)
+            if html is not None:
+                cls.metrics["diskHits"] += 1
+            else:
+                html = await asyncio.get_running_loop().run_in_executor(cls._pool(), cls._render_sync, content)
+                cls.metrics["renders"] += 1
+
+            cls._remember(key, html)
+            future.set_result(html)
+            return html
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            cls._inflight.pop(key, None)
+
+    @classmethod
+    def report(cls) -> Dict[str, int]:
+        """Summarize cache usage (for the detailed health check)."""
+        return {
+            **cls.metrics,
+            "memoryEntries": len(cls._memory),
+            "memorySize": cls._memory_size
+        }
@@ -0,0 +1,283 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId, Binary
+from pymongo.errors import DuplicateKeyError
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+import json
+import zlib
+
+from app.config import settings
+from app.utils.compression import decompress_content
+from app.utils.exceptions import NotFoundException, ValidationException
+from app.utils.text_patch import apply_edits, content_hash, diff_edits
+
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+
+class NoteHistoryService:
+    """
+    Version history for note content.
+
+    Each recorded version is a note_versions document. The newest version
+    of a note is always stored in full (a snapshot); when the next version
+    is recorded, the previous one is rewritten as a reverse delta (edits
+    that turn the newer content back into it), except every
+    note_history_snapshot_interval versions, where it stays a snapshot.
+    Reading a version therefore decompresses one snapshot and applies at
+    most that many deltas. Snapshots and deltas are zlib-compressed.
+
+    Versions are recorded off the request path: NoteService enqueues the
+    note after a content write, and a background job records whatever
+    content the note has when it runs, so rapid autosaves coalesce.
+    """
+
+    _pending: Dict[str, None] = {}  # Insertion-ordered set of note IDs
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.notes_collection = db.notes
+        self.versions_collection = db.note_versions
+
+    # Queue (called by NoteService on content writes)
+
+    @classmethod
+    def enqueue(cls, note_id: str) -> None:
+        """Mark a note's content as changed so the next flush records a version."""
+        if settings.note_history_enabled:
+            cls._pending[note_id] = None
+
+    @classmethod
+    async def flush(cls, db: AsyncIOMotorDatabase) -> int:
+        """
+        Record a version for every queued note (run periodically by BackgroundJobs).
+
+        Returns:
+            Number of versions recorded
+        """
+        pending, cls._pending = list(cls._pending), {}
+        service = cls(db)
+        recorded = 0
+
+        for note_id in pending:
+            try:
+                if await service.record(note_id):
+                    recorded += 1
+            except Exception as e:
+                print(f"⚠️ Could not record history for note {note_id}: {e}")
+                cls._pending[note_id] = None  # Retry on the next flush
+
+        return recorded
+
+    # Encoding
+
+    @staticmethod
+    def _compress(value: Any) -> Binary:
+        raw = value.encode("utf-8") if isinstance(value, str) else json.dumps(value).encode("utf-8")
+        return Binary(zlib.compress(raw))
+
+    @staticmethod
+    def _decompress(data: bytes) -> str:
+        return zlib.decompress(data).decode("utf-8")
+
+    # Recording
+
+    async def record(self, note_id: str) -> bool:
+        """
+        Record the note's current content as a new version, if it changed.
+
+        Args:
+            note_id: Note's ObjectId as string
+
+        Returns:
+            True if a version was recorded
+        """
+        note = await self.notes_collection.find_one(
+            {"_id": ObjectId(note_id)},
+            {"content": 1, "contentHash": 1, "version": 1, "userId": 1}
+        )
+        if not note:
+            return False
+
+        content = decompress_content(note.get("content")) or ""
+        digest = note.get("contentHash") or content_hash(content)
+        version = note.get("version", 0)
+
+        latest = await self.versions_collection.find_one(
+            {"noteId": note_id},
+            {"version": 1, "kind": 1, "depth": 1, "contentHash": 1, "data": 1},
+            sort=[("version", -1)]
+        )
+        if latest and (latest["version"] >= version or latest["contentHash"] == digest):
+            return False  # Already recorded, or only metadata changed
+
+        # The previous snapshot becomes a delta unless it's due to stay a full snapshot
+        convert = (
+            latest is not None
+            and latest["kind"] == SNAPSHOT
+            and latest.get("depth", 1) < settings.note_history_snapshot_interval
+        )
+
+        try:
+            await self.versions_collection.insert_one({
+                "noteId": note_id,
+                "userId": note["userId"],
+                "version": version,
+                "kind": SNAPSHOT,
+                "depth": latest.get("depth", 1) + 1 if convert else 1,
+                "data": self._compress(content),
+                "size": len(content),
+                "contentHash": digest,
+                "createdAt": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            return False  # Another worker recorded this version
+
+        # Inserted first so a failure here leaves a valid (if larger) history
+        if convert:
+            previous = self._decompress(latest["data"])
+            delta = self._compress(diff_edits(content, previous))
+            if len(delta) < len(latest["data"]):
+                # Only the newest snapshot is converted; a racing recorder that lost keeps it whole
+                await self.versions_collection.update_one(
+                    {"_id": latest["_id"], "kind": SNAPSHOT},
+                    {"$set": {"kind": DELTA, "baseVersion": version, "data": delta}}
+                )
+
+        await self._prune(note_id)
+        return True
+
+    async def _prune(self, note_id: str) -> None:
+        """Drop the oldest versions beyond note_history_max_versions (deltas only point at newer versions)."""
+        oldest_kept = await self.versions_collection.find(
+            {"noteId": note_id},
+            {"version": 1}
+        ).sort("version", -1).skip(settings.note_history_max_versions - 1).limit(1).to_list(length=1)
+
+        if oldest_kept:
+            await self.versions_collection.delete_many(
+                {"noteId": note_id, "version": {"$lt": oldest_kept[0]["version"]}}
+            )
+
+    async def delete_history(self, note_ids: List[str]) -> None:
+        """Delete all versions of permanently deleted notes."""
+        if note_ids:
+            await self.versions_collection.delete_many({"noteId": {"$in": note_ids}})
+
+    # Reading
+
+    async def _check_access(self, note_id: str, user_id: str) -> None:
+        """Ensure the user can read the note (owner or collaborator)."""
+        if not ObjectId.is_valid(note_id):
+            raise ValidationException("Invalid note ID format")
+
+        note = await self.notes_collection.find_one(
+            {
+                "_id": ObjectId(note_id),
+                "$or": [{"userId": user_id}, {"collaborators.userId": user_id}]
+            },
+            {"_id": 1}
+        )
+        if not note:
+            raise NotFoundException(f"Note with ID {note_id} not found or you don't have access")
+
+    async def list_versions(
+        self,
+        note_id: str,
+        user_id: str,
+        limit: int = 50,
+        before: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        List a note's recorded versions, newest first (metadata only).
+
+        Args:
+            note_id: Note's ObjectId as string
+            user_id: User's ID (for authorization)
+            limit: Maximum number of versions to return
+            before: Only versions older than this one (for paging)
+
+        Returns:
+            Dictionary with versions and nextBefore (None on the last page)
+
+        Raises:
+            NotFoundException: If the note doesn't exist or the user can't read it
+        """
+        await self._check_access(note_id, user_id)
+
+        query: Dict[str, Any] = {"noteId": note_id}
+        if before is not None:
+            query["version"] = {"$lt": before}
+
+        versions = await self.versions_collection.find(
+            query,
+            {"_id": 0, "version": 1, "size": 1, "contentHash": 1, "createdAt": 1}
+        ).sort("version", -1).limit(limit + 1).to_list(length=limit + 1)
+
+        has_more = len(versions) > limit
+        versions = versions[:limit]
+        return {
+            "versions": versions,
+            "nextBefore": versions[-1]["version"] if has_more else None
+        }
+
+    async def get_version(self, note_id: str, user_id: str, version: int) -> Dict[str, Any]:
+        """
+        Reconstruct a note's content at a recorded version.
+
+        Loads the version and the newer versions up to the snapshot its
+        delta chain ends at, then applies the deltas newest to oldest.
+
+        Args:
+            note_id: Note's ObjectId as string
+            user_id: User's ID (for authorization)
+            version: Note version to read
+
+        Returns:
+            Dictionary with version, content, contentHash, size and createdAt
+
+        Raises:
+            NotFoundException: If the note or version doesn't exist
+        """
+        await self._check_access(note_id, user_id)
+
+        target = await self.versions_collection.find_one({"noteId": note_id, "version": version})
+        if not target:
+            raise NotFoundException(f"Version {version} of this note was not found")
+
+        entries = {version: target}
+        if target["kind"] == DELTA:
+            snapshot = await self.versions_collection.find_one(
+                {"noteId": note_id, "version": {"$gt": version}, "kind": SNAPSHOT},
+                {"version": 1},
+                sort=[("version", 1)]
+            )
+            if snapshot:
+                async for entry in self.versions_collection.find(
+                    {"noteId": note_id, "version": {"$gt": version, "$lte": snapshot["version"]}}
+                ):
+                    entries[entry["version"]] = entry
+
+        # Walk the delta chain up to its snapshot
+        chain = [target]
+        while chain[-1]["kind"] == DELTA:
+            base_version = chain[-1]["baseVersion"]
+            base = entries.get(base_version) or await self.versions_collection.find_one(
+                {"noteId": note_id, "version": base_version}
+            )
+            if not base:
+                raise NotFoundException(f"Version {version} of this note is no longer available")
+            chain.append(base)
+
+        content = self._decompress(chain[-1]["data"])
+        for entry in reversed(chain[:-1]):
+            content = apply_edits(content, json.loads(self._decompress(entry["data"])))
+
+        return {
+            "version": version,
+            "content": content,
+            "contentHash": target["contentHash"],
+            "size": target["size"],
+            "createdAt": target["createdAt"]
+        }
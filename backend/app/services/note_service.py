@@ -2,8 +2,23 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from pymongo import ReturnDocument
+import json
 
-from app.utils.exceptions import NotFoundException, ValidationException
+from app.config import settings
+from app.services.collab_service import CollabService
+from app.services.folder_service import FolderService
+from app.services.markdown_renderer import MarkdownRenderer
+from app.services.note_history_service import NoteHistoryService
+from app.services.note_similarity_service import NoteSimilarityService
+from app.services.sync_service import SyncService
+from app.services.tag_index_service import TagIndexService
+from app.services.version_service import VersionService
+from app.utils.compression import compress_content, decode_note, decompress_content
+from app.utils.etag import version_condition
+from app.utils.exceptions import NotFoundException, PreconditionFailedException, ValidationException
+from app.utils.excerpt import make_excerpt
+from app.utils.text_patch import apply_edits, content_hash
 
 
 class NoteService:
@@ -14,6 +29,30 @@ class NoteService:
         self.notes_collection = db.notes
         self.folders_collection = db.folders
         self.users_collection = db.users
+        self.version_service = VersionService(db)
+        self.sync_service = SyncService(db)
+        self.history_service = NoteHistoryService(db)
+        self.collab_service = CollabService(db)
+        self.tag_index_service = TagIndexService(db)
+        self.folder_service = FolderService(db)
+    
+    async def _bump_version(self, note: Dict[str, Any]) -> None:
+        """Bump the notes collection version for the note's owner and collaborators."""
+        user_ids = [note.get("userId")] + [c["userId"] for c in note.get("collaborators", [])]
+        await self.version_service.bump(user_ids, "notes")
+    
+    async def _raise_write_failed(
+        self,
+        note_id: str,
+        user_id: str,
+        expected_versions: Optional[List[int]]
+    ) -> None:
+        """Explain a conditional write that matched nothing: missing note or stale If-Match."""
+        if expected_versions is not None and await self.notes_collection.find_one(
+            {"_id": ObjectId(note_id), "userId": user_id}, {"_id": 1}
+        ):
+            raise PreconditionFailedException("Note has been modified since it was read")
+        raise NotFoundException(f"Note with ID {note_id} not found")
     
     async def get_notes(
         self,
@@ -22,7 +61,10 @@ class NoteService:
         folder_id: Optional[str] = None,
         tags: Optional[List[str]] = None,
         is_pinned: Optional[bool] = None,
-        is_favorite: Optional[bool] = None
+        is_favorite: Optional[bool] = None,
+        projection: Optional[Dict[str, int]] = None,
+        match_all_tags: bool = False,
+        include_subfolders: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Get all notes for a user (owned or shared with them) with optional filters.
@@ -34,6 +76,9 @@ class NoteService:
             tags: Filter by tags (optional)
             is_pinned: Filter by pinned status (optional)
             is_favorite: Filter by favorite status (optional)
+            projection: Fields to return (optional, defaults to all)
+            match_all_tags: Require all tags instead of any
+            include_subfolders: With folder_id, also notes in folders nested under it
         
         Returns:
             List of note documents sorted by pinned status and creation date
@@ -49,10 +94,12 @@ class NoteService:
             query["isDeleted"] = {"$ne": True}
         
         if folder_id:
-            query["folderId"] = folder_id
+            query["folderId"] = (
+                {"$in": await self.folder_service.get_subtree_ids(folder_id)} if include_subfolders else folder_id
+            )
         
         if tags:
-            query["tags"] = {"$in": tags}
+            query["tags"] = {"$all" if match_all_tags else "$in": tags}
         
         if is_pinned is not None:
             query["isPinned"] = is_pinned
@@ -61,19 +108,24 @@ class NoteService:
             query["isFavorite"] = is_favorite
         
         # Sort: pinned notes first, then by creation date (newest first)
-        notes = await self.notes_collection.find(query).sort([
+        notes = await self.notes_collection.find(query, projection).sort([
             ("isPinned", -1),
             ("createdAt", -1)
         ]).to_list(length=None)
         
-        return notes
+        return [decode_note(note) for note in notes]
     
-    async def get_favorite_notes(self, user_id: str) -> List[Dict[str, Any]]:
+    async def get_favorite_notes(
+        self,
+        user_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Get all favorite/starred notes for a user.
         
         Args:
             user_id: User's ID
+            projection: Fields to return (optional, defaults to all)
         
         Returns:
             List of favorite note documents
@@ -84,12 +136,91 @@ class NoteService:
             "isDeleted": {"$ne": True}
         }
         
-        notes = await self.notes_collection.find(query).sort([
+        notes = await self.notes_collection.find(query, projection).sort([
             ("isPinned", -1),
             ("createdAt", -1)
         ]).to_list(length=None)
         
-        return notes
+        return [decode_note(note) for note in notes]
+    
+    async def _find_readable(self, note_id: str, user_id: str, projection: Dict[str, int]) -> Dict[str, Any]:
+        """Fetch fields of a note the user owns or collaborates on."""
+        if not ObjectId.is_valid(note_id):
+            raise ValidationException("Invalid note ID format")
+        
+        note = await self.notes_collection.find_one(
+            {
+                "_id": ObjectId(note_id),
+                "$or": [{"userId": user_id}, {"collaborators.userId": user_id}]
+            },
+            projection
+        )
+        
+        if not note:
+            raise NotFoundException(f"Note with ID {note_id} not found or you don't have access")
+        
+        return decode_note(note)
+    
+    async def get_note_role(self, note_id: str, user_id: str) -> str:
+        """
+        Get the user's role on a live (not trashed) note: owner, editor or viewer.
+        
+        Raises:
+            NotFoundException: If note not found, trashed, or user doesn't have access
+            ValidationException: If note_id is invalid
+        """
+        note = await self._find_readable(note_id, user_id, {"userId": 1, "collaborators": 1, "isDeleted": 1})
+        if note.get("isDeleted"):
+            raise NotFoundException(f"Note with ID {note_id} is in the trash")
+        
+        if note["userId"] == user_id:
+            return "owner"
+        return "editor" if await self._has_note_permission(note, user_id, "editor") else "viewer"
+    
+    async def get_note_content_hash(self, note_id: str, user_id: str) -> str:
+        """
+        Get the hash of a note's content without loading the content (when stored).
+        
+        Raises:
+            NotFoundException: If note not found or user doesn't have access
+            ValidationException: If note_id is invalid
+        """
+        note = await self._find_readable(note_id, user_id, {"contentHash": 1})
+        if note.get("contentHash"):
+            return note["contentHash"]
+        
+        # Written before content hashes were stored
+        note = await self._find_readable(note_id, user_id, {"content": 1})
+        return content_hash(note.get("content") or "")
+    
+    async def render_note_html(self, note_id: str, user_id: str) -> tuple:
+        """
+        Render a note's Markdown content to sanitized HTML (cached by content hash).
+        
+        Args:
+            note_id: Note's ObjectId as string
+            user_id: User's ID (for authorization)
+        
+        Returns:
+            Tuple of (html, content hash)
+        
+        Raises:
+            NotFoundException: If note not found or user doesn't have access
+            ValidationException: If note_id is invalid or the note holds JSON rich text
+        """
+        note = await self._find_readable(note_id, user_id, {"content": 1, "contentHash": 1})
+        content = note.get("content") or ""
+        digest = note.get("contentHash") or content_hash(content)
+        
+        if content.lstrip()[:1] in ("{", "["):
+            try:
+                json.loads(content)
+                raise ValidationException("Note content is rich text, not Markdown")
+            except ValueError:
+                pass  # Markdown that happens to start with a bracket
+        
+        html = await MarkdownRenderer.render(content, digest)
+        return html, digest
     
     async def get_note_by_id(self, note_id: str, user_id: str) -> Dict[str, Any]:
         """
@@ -120,7 +251,7 @@ class NoteService:
         if not note:
             raise NotFoundException(f"Note with ID {note_id} not found or you don't have access")
         
-        return note
+        return decode_note(note)
     
     async def create_note(self, user_id: str, note_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -158,6 +289,8 @@ class NoteService:
             "userId": user_id,
             "title": note_data["title"],
             "content": note_data.get("content", ""),
+            "contentHash": content_hash(note_data.get("content", "")),
+            "excerpt": make_excerpt(note_data.get("content", ""), settings.note_excerpt_length),
             "folderId": note_data.get("folderId"),
             "tags": note_data.get("tags", []),
             "color": note_data.get("color"),  # Hex color code
@@ -166,20 +299,31 @@ class NoteService:
             "collaborators": [],  # Initialize empty collaborators list
             "isDeleted": False,
             "deletedAt": None,
+            "version": 1,
             "createdAt": now,
             "updatedAt": now
         }
         
-        result = await self.notes_collection.insert_one(note_document)
+        # Stored compressed (when large); the caller gets the text back
+        result = await self.notes_collection.insert_one(
+            {**note_document, "content": compress_content(note_document["content"])}
+        )
         note_document["_id"] = result.inserted_id
         
+        await self._bump_version(note_document)
+        await self.tag_index_service.update(user_id, "notes", None, note_document["tags"])
+        await self.folder_service.invalidate_summary([user_id])
+        NoteHistoryService.enqueue(str(note_document["_id"]))
+        NoteSimilarityService.enqueue(str(note_document["_id"]))
+        
         return note_document
     
     async def update_note(
         self,
         note_id: str,
         user_id: str,
-        note_data: Dict[str, Any]
+        note_data: Dict[str, Any],
+        expected_versions: Optional[List[int]] = None
     ) -> Dict[str, Any]:
         """
         Update a note.
@@ -188,6 +332,7 @@ class NoteService:
             note_id: Note's ObjectId as string
             user_id: User's ID (for authorization)
             note_data: Updated note data
+            expected_versions: Only update if the note is at one of these versions (If-Match)
         
         Returns:
             Updated note document
@@ -195,19 +340,11 @@ class NoteService:
         Raises:
             NotFoundException: If note not found
             ValidationException: If validation fails
+            PreconditionFailedException: If the note changed since the expected version
         """
         if not ObjectId.is_valid(note_id):
             raise ValidationException("Invalid note ID format")
         
-        # Check if note exists and belongs to user
-        note = await self.notes_collection.find_one({
-            "_id": ObjectId(note_id),
-            "userId": user_id
-        })
-        
-        if not note:
-            raise NotFoundException(f"Note with ID {note_id} not found")
-        
         # Validate folder if being updated (handle empty strings)
         if "folderId" in note_data:
             folder_id = note_data["folderId"]
@@ -227,22 +364,159 @@ class NoteService:
         
         # Prepare update data
         update_data = {**note_data, "updatedAt": datetime.utcnow()}
+        if "content" in update_data:
+            update_data["contentHash"] = content_hash(update_data["content"])
+            update_data["excerpt"] = make_excerpt(update_data["content"], settings.note_excerpt_length)
+            update_data["content"] = compress_content(update_data["content"])
+        
+        # Update note (ownership and If-Match are checked by the same write; a tag
+        # change needs the previous tags, so that case merges the update into the old note)
+        tags_changed = "tags" in update_data
+        updated_note = await self.notes_collection.find_one_and_update(
+            {"_id": ObjectId(note_id), "userId": user_id, **version_condition(expected_versions)},
+            {"$set": update_data, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE if tags_changed else ReturnDocument.AFTER
+        )
         
-        # Update note
-        await self.notes_collection.update_one(
-            {"_id": ObjectId(note_id)},
-            {"$set": update_data}
+        if not updated_note:
+            await self._raise_write_failed(note_id, user_id, expected_versions)
+        
+        if tags_changed:
+            previous = updated_note
+            updated_note = {**previous, **update_data, "version": previous.get("version", 0) + 1}
+            if not previous.get("isDeleted"):
+                await self.tag_index_service.update(user_id, "notes", previous.get("tags"), update_data["tags"])
+        
+        await self._bump_version(updated_note)
+        if "folderId" in update_data:
+            await self.folder_service.invalidate_summary([user_id])
+        if "content" in update_data:
+            NoteHistoryService.enqueue(note_id)
+            CollabService.apply_content(note_id, note_data["content"])
+        if "content" in update_data or "title" in update_data:
+            NoteSimilarityService.enqueue(note_id)
+        return decode_note(updated_note)
+    
+    async def patch_note_content(
+        self,
+        note_id: str,
+        user_id: str,
+        base_version: int,
+        base_hash: str,
+        edits: List[Dict[str, Any]],
+        result_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply text edits to a note's content (autosave without resending the whole note).
+        
+        The edits are applied to the stored content, which must be the
+        version and content the client diffed against; the write is
+        conditional on that version, so a concurrent save makes it fail
+        instead of being overwritten.
+        
+        Args:
+            note_id: Note's ObjectId as string
+            user_id: User's ID (for authorization)
+            base_version: Note version the edits were made against
+            base_hash: SHA-256 of the content the edits were made against
+            edits: Positional edits (offset, delete, insert) against the base content
+            result_hash: SHA-256 the patched content should have (optional)
+        
+        Returns:
+            Dictionary with _id, version, contentHash, excerpt and updatedAt
+        
+        Raises:
+            NotFoundException: If note not found
+            ValidationException: If the edits don't apply or don't produce result_hash
+            PreconditionFailedException: If the note is no longer at the base version/content
+        """
+        if not ObjectId.is_valid(note_id):
+            raise ValidationException("Invalid note ID format")
+        
+        if len(edits) > settings.note_patch_max_edits:
+            raise ValidationException(f"A patch can contain at most {settings.note_patch_max_edits} edits")
+        
+        note = await self.notes_collection.find_one(
+            {"_id": ObjectId(note_id), "userId": user_id},
+            {"content": 1, "contentHash": 1, "version": 1, "collaborators.userId": 1}
         )
         
-        # Return updated note
-        updated_note = await self.notes_collection.find_one({"_id": ObjectId(note_id)})
-        return updated_note
+        if not note:
+            raise NotFoundException(f"Note with ID {note_id} not found")
+        
+        base = decompress_content(note.get("content")) or ""
+        if note.get("version", 0) != base_version or (note.get("contentHash") or content_hash(base)) != base_hash:
+            raise PreconditionFailedException("Note has been modified since it was read")
+        
+        content = apply_edits(base, edits)
+        new_hash = content_hash(content)
+        if result_hash and new_hash != result_hash:
+            raise ValidationException("Patched content does not match resultHash; send the full content instead")
+        
+        update_data = {
+            "content": compress_content(content),
+            "contentHash": new_hash,
+            "excerpt": make_excerpt(content, settings.note_excerpt_length),
+            "updatedAt": datetime.utcnow()
+        }
+        
+        # Same version check as the read, so a save in between fails instead of being lost
+        result = await self.notes_collection.update_one(
+            {"_id": note["_id"], "userId": user_id, **version_condition([base_version])},
+            {"$set": update_data, "$inc": {"version": 1}}
+        )
+        
+        if result.matched_count == 0:
+            await self._raise_write_failed(note_id, user_id, [base_version])
+        
+        await self._bump_version({**note, "userId": user_id})
+        NoteHistoryService.enqueue(note_id)
+        CollabService.apply_content(note_id, content)
+        NoteSimilarityService.enqueue(note_id)
+        
+        return {
+            "_id": note["_id"],
+            "version": base_version + 1,
+            "contentHash": new_hash,
+            "excerpt": update_data["excerpt"],
+            "updatedAt": update_data["updatedAt"]
+        }
+    
+    async def restore_note_version(
+        self,
+        note_id: str,
+        user_id: str,
+        version: int,
+        expected_versions: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Replace a note's content with the content it had at an earlier version.
+        
+        The restore is a regular content update, so it becomes the newest
+        version in the history rather than rewinding it.
+        
+        Args:
+            note_id: Note's ObjectId as string
+            user_id: User's ID (for authorization)
+            version: Recorded version to restore
+            expected_versions: Only update if the note is at one of these versions (If-Match)
+        
+        Returns:
+            Updated note document
+        
+        Raises:
+            NotFoundException: If the note or version doesn't exist
+            PreconditionFailedException: If the note changed since the expected version
+        """
+        recorded = await self.history_service.get_version(note_id, user_id, version)
+        return await self.update_note(note_id, user_id, {"content": recorded["content"]}, expected_versions)
     
     async def pin_unpin_note(
         self,
         note_id: str,
         user_id: str,
-        is_pinned: bool
+        is_pinned: bool,
+        expected_versions: Optional[List[int]] = None
     ) -> Dict[str, Any]:
         """
         Pin or unpin a note.
@@ -251,6 +525,7 @@ class NoteService:
             note_id: Note's ObjectId as string
             user_id: User's ID (for authorization)
             is_pinned: Whether to pin or unpin
+            expected_versions: Only update if the note is at one of these versions (If-Match)
         
         Returns:
             Updated note document
@@ -258,28 +533,23 @@ class NoteService:
         Raises:
             NotFoundException: If note not found
             ValidationException: If note_id is invalid
+            PreconditionFailedException: If the note changed since the expected version
         """
         if not ObjectId.is_valid(note_id):
             raise ValidationException("Invalid note ID format")
         
-        # Check if note exists and belongs to user
-        note = await self.notes_collection.find_one({
-            "_id": ObjectId(note_id),
-            "userId": user_id
-        })
-        
-        if not note:
-            raise NotFoundException(f"Note with ID {note_id} not found")
-        
         # Update pin status
-        await self.notes_collection.update_one(
-            {"_id": ObjectId(note_id)},
-            {"$set": {"isPinned": is_pinned, "updatedAt": datetime.utcnow()}}
+        updated_note = await self.notes_collection.find_one_and_update(
+            {"_id": ObjectId(note_id), "userId": user_id, **version_condition(expected_versions)},
+            {"$set": {"isPinned": is_pinned, "updatedAt": datetime.utcnow()}, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER
         )
         
-        # Return updated note
-        updated_note = await self.notes_collection.find_one({"_id": ObjectId(note_id)})
-        return updated_note
+        if not updated_note:
+            await self._raise_write_failed(note_id, user_id, expected_versions)
+        
+        await self._bump_version(updated_note)
+        return decode_note(updated_note)
     
     async def delete_note(self, note_id: str, user_id: str) -> Dict[str, str]:
         """
@@ -299,27 +569,30 @@ class NoteService:
         if not ObjectId.is_valid(note_id):
             raise ValidationException("Invalid note ID format")
         
-        # Check if note exists and belongs to user
-        note = await self.notes_collection.find_one({
-            "_id": ObjectId(note_id),
-            "userId": user_id
-        })
-        
-        if not note:
-            raise NotFoundException(f"Note with ID {note_id} not found")
-        
         # Soft delete
-        await self.notes_collection.update_one(
-            {"_id": ObjectId(note_id)},
+        note = await self.notes_collection.find_one_and_update(
+            {"_id": ObjectId(note_id), "userId": user_id},
             {
                 "$set": {
                     "isDeleted": True,
                     "deletedAt": datetime.utcnow(),
                     "updatedAt": datetime.utcnow()
-                }
-            }
+                },
+                "$inc": {"version": 1}
+            },
+            projection={"userId": 1, "collaborators.userId": 1, "tags": 1, "isDeleted": 1}
         )
         
+        if not note:
+            raise NotFoundException(f"Note with ID {note_id} not found")
+        
+        await self._bump_version(note)
+        if not note.get("isDeleted"):
+            await self.tag_index_service.update(user_id, "notes", note.get("tags"), None)
+            await self.folder_service.invalidate_summary([user_id])
+        await self.collab_service.save_and_close_room(note_id)
+        NoteSimilarityService.enqueue(note_id)
+        
         return {"message": "Note moved to trash successfully"}
     
     async def restore_note(self, note_id: str, user_id: str) -> Dict[str, Any]:
@@ -340,31 +613,28 @@ class NoteService:
         if not ObjectId.is_valid(note_id):
             raise ValidationException("Invalid note ID format")
         
-        # Check if note exists and belongs to user
-        note = await self.notes_collection.find_one({
-            "_id": ObjectId(note_id),
-            "userId": user_id,
-            "isDeleted": True
-        })
-        
-        if not note:
-            raise NotFoundException(f"Deleted note with ID {note_id} not found")
-        
         # Restore note
-        await self.notes_collection.update_one(
-            {"_id": ObjectId(note_id)},
+        restored_note = await self.notes_collection.find_one_and_update(
+            {"_id": ObjectId(note_id), "userId": user_id, "isDeleted": True},
             {
                 "$set": {
                     "isDeleted": False,
                     "deletedAt": None,
                     "updatedAt": datetime.utcnow()
-                }
-            }
+                },
+                "$inc": {"version": 1}
+            },
+            return_document=ReturnDocument.AFTER
         )
         
-        # Return restored note
-        restored_note = await self.notes_collection.find_one({"_id": ObjectId(note_id)})
-        return restored_note
+        if not restored_note:
+            raise NotFoundException(f"Deleted note with ID {note_id} not found")
+        
+        await self._bump_version(restored_note)
+        await self.tag_index_service.update(user_id, "notes", None, restored_note.get("tags"))
+        await self.folder_service.invalidate_summary([user_id])
+        NoteSimilarityService.enqueue(note_id)
+        return decode_note(restored_note)
     
     async def permanently_delete_note(self, note_id: str, user_id: str) -> Dict[str, str]:
         """
@@ -396,14 +666,33 @@ class NoteService:
         # Permanently delete
         await self.notes_collection.delete_one({"_id": ObjectId(note_id)})
         
+        await self._bump_version(note)
+        await self.sync_service.record_tombstones(
+            [note["userId"]] + [c["userId"] for c in note.get("collaborators", [])],
+            "notes",
+            note_id
+        )
+        await self.history_service.delete_history([note_id])
+        if not note.get("isDeleted"):
+            await self.tag_index_service.update(user_id, "notes", note.get("tags"), None)
+            await self.folder_service.invalidate_summary([user_id])
+        await self.collab_service.delete_state([note_id])
+        await CollabService.close_room(note_id)
+        NoteSimilarityService.enqueue(note_id)
+        
         return {"message": "Note permanently deleted"}
     
-    async def get_trashed_notes(self, user_id: str) -> List[Dict[str, Any]]:
+    async def get_trashed_notes(
+        self,
+        user_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Get all soft-deleted notes for a user.
         
         Args:
             user_id: User's ID
+            projection: Fields to return (optional, defaults to all)
         
         Returns:
             List of trashed note documents
@@ -411,9 +700,9 @@ class NoteService:
         notes = await self.notes_collection.find({
             "userId": user_id,
             "isDeleted": True
-        }).sort("deletedAt", -1).to_list(length=None)
+        }, projection).sort("deletedAt", -1).to_list(length=None)
         
-        return notes
+        return [decode_note(note) for note in notes]
     
     async def _has_note_permission(
         self,
@@ -515,13 +804,15 @@ class NoteService:
             {"_id": ObjectId(note_id)},
             {
                 "$push": {"collaborators": new_collaborator},
-                "$set": {"updatedAt": datetime.utcnow()}
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
             }
         )
         
         # Return updated note
         updated_note = await self.notes_collection.find_one({"_id": ObjectId(note_id)})
-        return updated_note
+        await self._bump_version(updated_note)
+        return decode_note(updated_note)
     
     async def get_note_collaborators(
         self,
@@ -617,9 +908,15 @@ class NoteService:
             {"_id": ObjectId(note_id)},
             {
                 "$pull": {"collaborators": {"userId": collaborator_id}},
-                "$set": {"updatedAt": datetime.utcnow()}
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
             }
         )
         
+        # The removed collaborator is still in the pre-update audience
+        await self._bump_version(note)
+        await self.sync_service.record_tombstones([collaborator_id], "notes", note_id)
+        await CollabService.disconnect_user(note_id, collaborator_id)
+        
         return {"message": "Collaborator removed successfully"}
 
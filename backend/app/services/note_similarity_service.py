@@ -0,0 +1,349 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import UpdateOne
+from typing import List, Dict, Any, Iterable
+from datetime import datetime
+import asyncio
+import math
+
+from app.config import settings
+from app.utils.compression import decompress_content
+from app.utils.exceptions import NotFoundException, ValidationException
+from app.utils.similarity import cosine, note_features, signature_similarity
+
+
+class NoteSimilarityService:
+    """
+    Related notes and near-duplicate detection.
+
+    Each note has a note_similarity entry with its sparse term frequencies
+    and MinHash LSH bucket keys (see app.utils.similarity); document
+    frequencies per user live in note_term_df. Candidates for a note are
+    the user's notes sharing a bucket, found through a multikey index, so
+    a query reads a bounded candidate set rather than every note; they are
+    then ranked by TF-IDF cosine (related) or by estimated shingle Jaccard
+    similarity (duplicates).
+
+    Indexing runs off the request path: NoteService enqueues notes after
+    writes and a background job re-indexes them. Trashed and deleted
+    notes are dropped from the index. Each user's index covers the notes
+    they own.
+    """
+
+    _pending: Dict[str, None] = {}  # Insertion-ordered set of note IDs
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.notes_collection = db.notes
+        self.index_collection = db.note_similarity
+        self.df_collection = db.note_term_df
+
+    # Queue (called by NoteService after writes)
+
+    @classmethod
+    def enqueue(cls, note_id: str) -> None:
+        """Mark a note for re-indexing on the next flush."""
+        if settings.note_similarity_enabled:
+            cls._pending[note_id] = None
+
+    @classmethod
+    async def flush(cls, db: AsyncIOMotorDatabase) -> int:
+        """
+        Re-index every queued note (run periodically by BackgroundJobs).
+
+        Returns:
+            Number of notes whose index entry changed
+        """
+        pending, cls._pending = list(cls._pending), {}
+        service = cls(db)
+        changed = 0
+
+        for note_id in pending:
+            try:
+                if await service.index(note_id):
+                    changed += 1
+            except Exception as e:
+                print(f"⚠️ Could not index note {note_id} for similarity: {e}")
+                cls._pending[note_id] = None  # Retry on the next flush
+
+        return changed
+
+    # Indexing
+
+    async def _update_df(self, user_id: str, removed: Iterable[str], added: Iterable[str]) -> None:
+        """Apply a note's term set change to its owner's document frequencies."""
+        operations = [
+            UpdateOne({"userId": user_id, "term": term}, {"$inc": {"df": delta}}, upsert=True)
+            for terms, delta in ((added, 1), (removed, -1))
+            for term in terms
+        ]
+        if not operations:
+            return
+
+        await self.df_collection.bulk_write(operations, ordered=False)
+        if removed:
+            await self.df_collection.delete_many(
+                {"userId": user_id, "term": {"$in": list(removed)}, "df": {"$lte": 0}}
+            )
+
+    async def index(self, note_id: str) -> bool:
+        """
+        Bring a note's index entry up to date (removing it for trashed or deleted notes).
+
+        Args:
+            note_id: Note's ObjectId as string
+
+        Returns:
+            True if the entry was written or removed
+        """
+        note = await self.notes_collection.find_one(
+            {"_id": ObjectId(note_id)},
+            {"userId": 1, "title": 1, "content": 1, "contentHash": 1, "isDeleted": 1}
+        )
+        entry = await self.index_collection.find_one(
+            {"_id": note_id},
+            {"userId": 1, "terms": 1, "title": 1, "contentHash": 1}
+        )
+
+        if not note or note.get("isDeleted"):
+            if not entry:
+                return False
+            await self.index_collection.delete_one({"_id": note_id})
+            await self._update_df(entry["userId"], list(entry["terms"]), [])
+            return True
+
+        if (
+            entry
+            and entry["userId"] == note["userId"]
+            and entry.get("title") == note.get("title")
+            and entry.get("contentHash") and entry["contentHash"] == note.get("contentHash")
+        ):
+            return False  # Only metadata changed
+
+        # Tokenizing and hashing a long note takes a while: keep it off the event loop
+        features = await asyncio.get_running_loop().run_in_executor(
+            None,
+            note_features,
+            note.get("title") or "",
+            decompress_content(note.get("content")) or "",
+            settings.note_similarity_max_terms
+        )
+
+        await self.index_collection.replace_one(
+            {"_id": note_id},
+            {
+                "userId": note["userId"],
+                "title": note.get("title"),
+                "contentHash": note.get("contentHash"),
+                **features,
+                "updatedAt": datetime.utcnow()
+            },
+            upsert=True
+        )
+
+        old_terms = set(entry["terms"]) if entry else set()
+        new_terms = set(features["terms"])
+        if entry and entry["userId"] != note["userId"]:
+            await self._update_df(entry["userId"], old_terms, [])
+            old_terms = set()
+        await self._update_df(note["userId"], old_terms - new_terms, new_terms - old_terms)
+        return True
+
+    async def remove(self, note_ids: List[str]) -> None:
+        """Drop index entries of purged notes (the trash normally removed them already)."""
+        async for entry in self.index_collection.find({"_id": {"$in": note_ids}}, {"userId": 1, "terms": 1}):
+            await self.index_collection.delete_one({"_id": entry["_id"]})
+            await self._update_df(entry["userId"], list(entry["terms"]), [])
+
+    # Queries
+
+    async def _get_entry(self, note_id: str, user_id: str) -> Dict[str, Any]:
+        """Get the index entry of a note the user can read (indexing it now if it isn't yet)."""
+        if not ObjectId.is_valid(note_id):
+            raise ValidationException("Invalid note ID format")
+
+        note = await self.notes_collection.find_one(
+            {
+                "_id": ObjectId(note_id),
+                "$or": [{"userId": user_id}, {"collaborators.userId": user_id}]
+            },
+            {"_id": 1}
+        )
+        if not note:
+            raise NotFoundException(f"Note with ID {note_id} not found or you don't have access")
+
+        entry = await self.index_collection.find_one({"_id": note_id})
+        if not entry and await self.index(note_id):
+            entry = await self.index_collection.find_one({"_id": note_id})
+        return entry or {"terms": {}, "termBands": [], "shingleSignature": [], "shingleBands": []}
+
+    async def _candidates(self, user_id: str, note_id: str, field: str, bands: List[str]) -> List[Dict[str, Any]]:
+        """The user's indexed notes sharing at least one LSH bucket with a note."""
+        if not bands:
+            return []
+        return await self.index_collection.find(
+            {"userId": user_id, field: {"$in": bands}, "_id": {"$ne": note_id}},
+            {"terms": 1, "shingleSignature": 1}
+        ).limit(settings.note_similarity_max_candidates).to_list(length=None)
+
+    async def _note_cards(self, note_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Titles and excerpts of live notes, by ID."""
+        notes = await self.notes_collection.find(
+            {"_id": {"$in": [ObjectId(note_id) for note_id in note_ids]}, "isDeleted": {"$ne": True}},
+            {"title": 1, "excerpt": 1, "updatedAt": 1}
+        ).to_list(length=None)
+        return {str(note["_id"]): {**note, "_id": str(note["_id"])} for note in notes}
+
+    async def get_related_notes(self, note_id: str, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get the user's notes most similar in topic to a note.
+
+        Args:
+            note_id: Note's ObjectId as string
+            user_id: User's ID (candidates are notes this user owns)
+            limit: Maximum number of notes
+
+        Returns:
+            Notes with _id, title, excerpt, updatedAt, score (TF-IDF cosine)
+            and duplicate (near-identical text), best match first
+
+        Raises:
+            NotFoundException: If the note doesn't exist or the user can't read it
+        """
+        entry = await self._get_entry(note_id, user_id)
+        candidates = await self._candidates(user_id, note_id, "termBands", entry["termBands"])
+        if not candidates:
+            return []
+
+        # IDF over the user's own notes, for the terms involved only
+        terms = set(entry["terms"])
+        for candidate in candidates:
+            terms.update(candidate["terms"])
+        total = await self.index_collection.count_documents({"userId": user_id})
+        df = {
+            row["term"]: row["df"]
+            async for row in self.df_collection.find({"userId": user_id, "term": {"$in": list(terms)}})
+        }
+
+        def weigh(vector: Dict[str, float]) -> Dict[str, float]:
+            return {term: tf * (math.log((total + 1) / (df.get(term, 0) + 1)) + 1) for term, tf in vector.items()}
+
+        query_vector = weigh(entry["terms"])
+        scored = []
+        for candidate in candidates:
+            score = cosine(query_vector, weigh(candidate["terms"]))
+            if score >= settings.note_similarity_min_score:
+                similarity = signature_similarity(entry["shingleSignature"], candidate.get("shingleSignature", []))
+                scored.append((score, candidate["_id"], similarity))
+        scored.sort(reverse=True)
+
+        cards = await self._note_cards([candidate_id for _, candidate_id, _ in scored[:limit * 2]])
+        related = []
+        for score, candidate_id, similarity in scored:
+            if candidate_id in cards:
+                related.append({
+                    **cards[candidate_id],
+                    "score": round(score, 4),
+                    "duplicate": similarity >= settings.note_similarity_duplicate_threshold
+                })
+            if len(related) == limit:
+                break
+        return related
+
+    async def get_duplicate_groups(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Find groups of the user's notes with near-identical text.
+
+        Pairs come from notes sharing a shingle LSH bucket and are kept when
+        their estimated Jaccard similarity reaches
+        note_similarity_duplicate_threshold; overlapping pairs merge into groups.
+        Buckets of more than note_similarity_max_bucket_size notes (many
+        copies of one template, say) pair each note with the bucket's first
+        note only, so the work stays linear in the bucket size.
+
+        Args:
+            user_id: User's ID
+
+        Returns:
+            Groups with notes (_id, title, excerpt, updatedAt; newest first)
+            and similarity (lowest pairwise estimate in the group)
+        """
+        buckets = await self.index_collection.aggregate([
+            {"$match": {"userId": user_id, "shingleBands.0": {"$exists": True}}},
+            {"$unwind": "$shingleBands"},
+            {"$group": {"_id": "$shingleBands", "notes": {"$push": "$_id"}}},
+            {"$match": {"notes.1": {"$exists": True}}}
+        ]).to_list(length=None)
+
+        pairs = set()
+        for bucket in buckets:
+            notes = sorted(bucket["notes"])
+            if len(notes) > settings.note_similarity_max_bucket_size:
+                pairs.update((notes[0], second) for second in notes[1:])
+            else:
+                pairs.update(
+                    (first, second) for i, first in enumerate(notes) for second in notes[i + 1:]
+                )
+        if not pairs:
+            return []
+
+        note_ids = list({note_id for pair in pairs for note_id in pair})
+        signatures = {
+            entry["_id"]: entry["shingleSignature"]
+            async for entry in self.index_collection.find({"_id": {"$in": note_ids}}, {"shingleSignature": 1})
+        }
+
+        # Union-find over the confirmed pairs
+        parent: Dict[str, str] = {}
+
+        def root(note_id: str) -> str:
+            while parent.get(note_id, note_id) != note_id:
+                note_id = parent[note_id]
+            return note_id
+
+        lowest: Dict[str, float] = {}
+        confirmed = []
+        for first, second in pairs:
+            similarity = signature_similarity(signatures.get(first, []), signatures.get(second, []))
+            if similarity >= settings.note_similarity_duplicate_threshold:
+                confirmed.append((first, second, similarity))
+                parent[root(first)] = root(second)
+
+        groups: Dict[str, List[str]] = {}
+        for first, second, similarity in confirmed:
+            group = root(first)
+            lowest[group] = min(lowest.get(group, 1.0), similarity)
+            for note_id in (first, second):
+                members = groups.setdefault(group, [])
+                if note_id not in members:
+                    members.append(note_id)
+
+        cards = await self._note_cards([note_id for members in groups.values() for note_id in members])
+        result = []
+        for group, members in groups.items():
+            notes = sorted(
+                (cards[note_id] for note_id in members if note_id in cards),
+                key=lambda note: note["updatedAt"],
+                reverse=True
+            )
+            if len(notes) > 1:
+                result.append({"notes": notes, "similarity": round(lowest[group], 4)})
+
+        result.sort(key=lambda group: (-group["similarity"], -len(group["notes"])))
+        return result
+
+    async def rebuild(self) -> int:
+        """
+        Index every live note from scratch (for the backfill script).
+
+        Returns:
+            Number of notes indexed
+        """
+        await self.index_collection.delete_many({})
+        await self.df_collection.delete_many({})
+
+        indexed = 0
+        async for note in self.notes_collection.find({"isDeleted": {"$ne": True}}, {"_id": 1}):
+            if await self.index(str(note["_id"])):
+                indexed += 1
+        return indexed
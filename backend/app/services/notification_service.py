@@ -39,6 +39,37 @@ class NotificationService:
         notification["_id"] = result.inserted_id
         return notification
     
+    async def create_notifications(self, notifications: List[Dict[str, Any]]) -> int:
+        """
+        Create many notifications in one insert.
+        
+        Args:
+            notifications: Dicts with userId, type, title, message and optional actionUrl, metadata
+        
+        Returns:
+            Number of notifications created
+        """
+        if not notifications:
+            return 0
+        
+        now = datetime.utcnow()
+        documents = [
+            {
+                "userId": n["userId"],
+                "type": n["type"].value,
+                "title": n["title"],
+                "message": n["message"],
+                "actionUrl": n.get("actionUrl"),
+                "metadata": n.get("metadata") or {},
+                "isRead": False,
+                "createdAt": now
+            }
+            for n in notifications
+        ]
+        
+        result = await self.collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    
     async def get_user_notifications(
         self,
         user_id: str,
@@ -215,3 +246,36 @@ class NotificationService:
             action_url=f"/habits/{habit_id}",
             metadata={"habitId": habit_id, "milestone": milestone}
         )
+    
+    async def notify_tasks_due(self, tasks: List[Dict[str, Any]], overdue: bool = False) -> int:
+        """
+        Create "due soon" or "overdue" notifications for a batch of tasks.
+        
+        The task owner and its assignees are notified.
+        
+        Args:
+            tasks: Task documents (with _id, title, dueDate, userId, collaborators)
+            overdue: Send overdue notifications instead of due-soon ones
+        
+        Returns:
+            Number of notifications created
+        """
+        notifications = []
+        
+        for task in tasks:
+            task_id = str(task["_id"])
+            recipients = {task["userId"]} | {
+                c["userId"] for c in task.get("collaborators", []) if c.get("role") == "assignee"
+            }
+            
+            for recipient_id in recipients:
+                notifications.append({
+                    "userId": recipient_id,
+                    "type": NotificationType.TASK_OVERDUE if overdue else NotificationType.TASK_DUE_SOON,
+                    "title": "Task overdue" if overdue else "Task due soon",
+                    "message": f"{task['title']} is overdue" if overdue else f"{task['title']} is due soon",
+                    "actionUrl": f"/tasks/{task_id}",
+                    "metadata": {"taskId": task_id, "dueDate": task.get("dueDate")}
+                })
+        
+        return await self.create_notifications(notifications)
@@ -0,0 +1,409 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from typing import Optional, List, Dict, Any, Iterable
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.services.index_advisor import IndexAdvisor
+from app.utils.exceptions import NotFoundException, ValidationException
+from app.utils.recurrence import to_naive_utc
+
+
+class SmartListService:
+    """
+    Service for smart lists: saved task filters with stored membership.
+
+    Each smart list keeps the IDs of its matching tasks (taskIds) and their
+    count, so sidebar badges and opening a list never run the filter.
+    TaskService calls sync_task() / remove_task() on every write, which
+    re-evaluates only the changed task against its audience's lists and
+    pushes or pulls its ID. Lists are rebuilt from a query when created or
+    edited, and lists with a relative due window (dueWithinDays) are rebuilt
+    once per UTC day, since their membership changes as time passes.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.smart_lists_collection = db.smart_lists
+        self.tasks_collection = db.tasks
+
+    # Filter evaluation
+
+    @staticmethod
+    def _due_window(filters: Dict[str, Any], now: datetime) -> Optional[tuple]:
+        """Resolve dueWithinDays to a (lower, upper) dueDate range; lower is None with includeOverdue."""
+        days = filters.get("dueWithinDays")
+        if days is None:
+            return None
+        today = datetime(now.year, now.month, now.day)
+        return (None if filters.get("includeOverdue") else today), today + timedelta(days=days + 1)
+
+    @classmethod
+    def build_query(cls, user_id: str, filters: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """
+        Build the tasks query for a smart list (the same filters GET /tasks applies).
+
+        Args:
+            user_id: Owner of the smart list
+            filters: Filter definition
+            now: Time the relative due window is resolved against
+
+        Returns:
+            MongoDB filter
+        """
+        query = {
+            "$or": [{"userId": user_id}, {"collaborators.userId": user_id}],
+            "isDeleted": {"$ne": True}
+        }
+
+        if filters.get("folderId"):
+            query["folderId"] = filters["folderId"]
+
+        for field, values in (("status", filters.get("status")), ("priority", filters.get("priority")),
+                              ("labels.name", filters.get("labels"))):
+            if values:
+                query[field] = values[0] if len(values) == 1 else {"$in": values}
+
+        if filters.get("tags"):
+            query["tags"] = {"$all" if filters.get("matchAllTags") else "$in": filters["tags"]}
+
+        window = cls._due_window(filters, now)
+        if window:
+            lower, upper = window
+            query["dueDate"] = {"$gte": lower, "$lt": upper} if lower else {"$lt": upper}
+
+        return query
+
+    @classmethod
+    def matches(cls, task: Dict[str, Any], user_id: str, filters: Dict[str, Any], now: datetime) -> bool:
+        """
+        Check whether a task belongs in a smart list (in-memory twin of build_query).
+
+        Args:
+            task: Task document
+            user_id: Owner of the smart list
+            filters: Filter definition
+            now: Time the relative due window is resolved against
+
+        Returns:
+            True if the task matches
+        """
+        if task.get("isDeleted"):
+            return False
+        if task.get("userId") != user_id and not any(
+            c.get("userId") == user_id for c in task.get("collaborators", [])
+        ):
+            return False
+
+        if filters.get("folderId") and task.get("folderId") != filters["folderId"]:
+            return False
+        if filters.get("status") and task.get("status") not in filters["status"]:
+            return False
+        if filters.get("priority") and task.get("priority") not in filters["priority"]:
+            return False
+
+        if filters.get("labels"):
+            names = {label.get("name") for label in task.get("labels") or []}
+            if not names & set(filters["labels"]):
+                return False
+
+        if filters.get("tags"):
+            tags = set(task.get("tags") or [])
+            wanted = set(filters["tags"])
+            if not (wanted <= tags if filters.get("matchAllTags") else wanted & tags):
+                return False
+
+        window = cls._due_window(filters, now)
+        if window:
+            due = task.get("dueDate")
+            if not isinstance(due, datetime):
+                return False
+            due = to_naive_utc(due)
+            lower, upper = window
+            if due >= upper or (lower and due < lower):
+                return False
+
+        return True
+
+    # Incremental maintenance (called by TaskService)
+
+    async def sync_task(self, task: Dict[str, Any], extra_user_ids: Iterable[str] = ()) -> None:
+        """
+        Re-evaluate one task against the smart lists of everyone who sees it.
+
+        Args:
+            task: Task document as it is after the write (must include the filtered fields)
+            extra_user_ids: Users who stopped seeing the task (their lists drop it)
+        """
+        task_id = str(task["_id"])
+        user_ids = [task.get("userId")] + [c["userId"] for c in task.get("collaborators", [])]
+        user_ids.extend(extra_user_ids)
+
+        smart_lists = await self.smart_lists_collection.find(
+            {"userId": {"$in": user_ids}},
+            {"userId": 1, "filters": 1}
+        ).to_list(length=None)
+        if not smart_lists:
+            return
+
+        now = datetime.utcnow()
+        operations = []
+        for smart_list in smart_lists:
+            if self.matches(task, smart_list["userId"], smart_list.get("filters", {}), now):
+                # Conditional push/pull keeps count equal to len(taskIds) under retries and races
+                operations.append(UpdateOne(
+                    {"_id": smart_list["_id"], "taskIds": {"$ne": task_id}},
+                    {"$push": {"taskIds": task_id}, "$inc": {"count": 1}}
+                ))
+            else:
+                operations.append(UpdateOne(
+                    {"_id": smart_list["_id"], "taskIds": task_id},
+                    {"$pull": {"taskIds": task_id}, "$inc": {"count": -1}}
+                ))
+
+        await self.smart_lists_collection.bulk_write(operations, ordered=False)
+
+    async def remove_task(self, task_id: str, user_ids: Iterable[str]) -> None:
+        """
+        Drop a task from the given users' smart lists (trashed, deleted or unshared).
+
+        Args:
+            task_id: Task's ObjectId as string
+            user_ids: Users whose lists may contain the task
+        """
+        await self.smart_lists_collection.update_many(
+            {"userId": {"$in": list(user_ids)}, "taskIds": task_id},
+            {"$pull": {"taskIds": task_id}, "$inc": {"count": -1}}
+        )
+
+    async def rebuild(self, smart_list: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Recompute a smart list's membership from a query.
+
+        Args:
+            smart_list: Smart list document (needs _id, userId and filters)
+
+        Returns:
+            Updated smart list document
+        """
+        now = datetime.utcnow()
+        query = self.build_query(smart_list["userId"], smart_list.get("filters", {}), now)
+        IndexAdvisor.record("tasks", query)
+
+        task_ids = [str(task["_id"]) async for task in self.tasks_collection.find(query, {"_id": 1})]
+
+        result = await self.smart_lists_collection.find_one_and_update(
+            {"_id": smart_list["_id"]},
+            {"$set": {
+                "taskIds": task_ids,
+                "count": len(task_ids),
+                "evaluatedOn": now.date().isoformat(),
+                "evaluatedAt": now
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+        return result or {**smart_list, "taskIds": task_ids, "count": len(task_ids), "evaluatedAt": now}
+
+    @staticmethod
+    def _is_stale(smart_list: Dict[str, Any], now: datetime) -> bool:
+        """Check whether a relative-window list was last evaluated on an earlier day."""
+        return (
+            smart_list.get("filters", {}).get("dueWithinDays") is not None
+            and smart_list.get("evaluatedOn") != now.date().isoformat()
+        )
+
+    async def refresh_stale(self) -> int:
+        """
+        Rebuild every relative-window smart list not yet evaluated today.
+
+        Returns:
+            Number of lists rebuilt
+        """
+        today = datetime.utcnow().date().isoformat()
+        cursor = self.smart_lists_collection.find(
+            {"filters.dueWithinDays": {"$type": "number"}, "evaluatedOn": {"$ne": today}},
+            {"userId": 1, "filters": 1}
+        )
+
+        rebuilt = 0
+        async for smart_list in cursor:
+            await self.rebuild(smart_list)
+            rebuilt += 1
+        return rebuilt
+
+    # CRUD
+
+    async def get_smart_lists(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Get a user's smart lists with their counts (without member IDs).
+
+        Args:
+            user_id: User's ID
+
+        Returns:
+            List of smart list documents
+        """
+        smart_lists = await self.smart_lists_collection.find(
+            {"userId": user_id},
+            {"taskIds": 0}
+        ).sort("createdAt", 1).to_list(length=None)
+
+        now = datetime.utcnow()
+        for index, smart_list in enumerate(smart_lists):
+            if self._is_stale(smart_list, now):
+                rebuilt = await self.rebuild(smart_list)
+                rebuilt.pop("taskIds", None)
+                smart_lists[index] = rebuilt
+
+        return smart_lists
+
+    async def _get_owned(self, list_id: str, user_id: str, projection: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Fetch a smart list owned by the user."""
+        try:
+            smart_list = await self.smart_lists_collection.find_one(
+                {"_id": ObjectId(list_id), "userId": user_id},
+                projection
+            )
+        except Exception:
+            raise NotFoundException("Smart list not found")
+
+        if not smart_list:
+            raise NotFoundException("Smart list not found")
+
+        return smart_list
+
+    async def create_smart_list(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create a smart list and compute its initial membership.
+
+        Args:
+            user_id: User's ID
+            data: Smart list data (name, color, filters)
+
+        Returns:
+            Created smart list document
+
+        Raises:
+            ValidationException: If the user already has the maximum number of smart lists
+        """
+        existing = await self.smart_lists_collection.count_documents({"userId": user_id})
+        if existing >= settings.smart_list_max_per_user:
+            raise ValidationException(
+                f"You can have at most {settings.smart_list_max_per_user} smart lists"
+            )
+
+        now = datetime.utcnow()
+        smart_list = {
+            "userId": user_id,
+            "name": data.get("name"),
+            "color": data.get("color"),
+            "filters": data.get("filters") or {},
+            "taskIds": [],
+            "count": 0,
+            "createdAt": now,
+            "updatedAt": now
+        }
+
+        result = await self.smart_lists_collection.insert_one(smart_list)
+        smart_list["_id"] = result.inserted_id
+
+        return await self.rebuild(smart_list)
+
+    async def update_smart_list(self, list_id: str, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rename a smart list or change its filters (which rebuilds its membership).
+
+        Args:
+            list_id: Smart list's ObjectId as string
+            user_id: User's ID (for authorization)
+            data: Fields to change
+
+        Returns:
+            Updated smart list document
+
+        Raises:
+            NotFoundException: If the smart list doesn't exist
+        """
+        update_doc = {"updatedAt": datetime.utcnow()}
+        for field in ("name", "color", "filters"):
+            if data.get(field) is not None:
+                update_doc[field] = data[field]
+
+        try:
+            result = await self.smart_lists_collection.find_one_and_update(
+                {"_id": ObjectId(list_id), "userId": user_id},
+                {"$set": update_doc},
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception:
+            raise NotFoundException("Smart list not found")
+
+        if not result:
+            raise NotFoundException("Smart list not found")
+
+        if "filters" in update_doc:
+            result = await self.rebuild(result)
+
+        return result
+
+    async def delete_smart_list(self, list_id: str, user_id: str) -> Dict[str, str]:
+        """
+        Delete a smart list (its tasks are untouched).
+
+        Raises:
+            NotFoundException: If the smart list doesn't exist
+        """
+        try:
+            result = await self.smart_lists_collection.delete_one({"_id": ObjectId(list_id), "userId": user_id})
+        except Exception:
+            raise NotFoundException("Smart list not found")
+
+        if result.deleted_count == 0:
+            raise NotFoundException("Smart list not found")
+
+        return {"message": "Smart list deleted successfully"}
+
+    async def refresh_smart_list(self, list_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Rebuild a smart list's membership on demand.
+
+        Raises:
+            NotFoundException: If the smart list doesn't exist
+        """
+        smart_list = await self._get_owned(list_id, user_id, {"userId": 1, "filters": 1})
+        return await self.rebuild(smart_list)
+
+    async def get_smart_list_tasks(
+        self,
+        list_id: str,
+        user_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> tuple:
+        """
+        Get a smart list and its tasks, looked up by the stored member IDs.
+
+        Args:
+            list_id: Smart list's ObjectId as string
+            user_id: User's ID (for authorization)
+            projection: Task fields to return (optional, defaults to all)
+
+        Returns:
+            (smart list document without taskIds, task documents in creation order)
+
+        Raises:
+            NotFoundException: If the smart list doesn't exist
+        """
+        smart_list = await self._get_owned(list_id, user_id)
+        if self._is_stale(smart_list, datetime.utcnow()):
+            smart_list = await self.rebuild(smart_list)
+
+        task_ids = [ObjectId(task_id) for task_id in smart_list.pop("taskIds", [])]
+        tasks = []
+        if task_ids:
+            tasks = await self.tasks_collection.find(
+                {"_id": {"$in": task_ids}, "isDeleted": {"$ne": True}},
+                projection
+            ).sort("_id", 1).to_list(length=None)
+
+        return smart_list, tasks
@@ -0,0 +1,158 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional, List, Dict, Any, Iterable
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.utils.compression import decode_note
+from app.utils.exceptions import ValidationException
+
+
+class SyncService:
+    """Service for delta sync of tasks, notes, folders and habits."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.tasks_collection = db.tasks
+        self.notes_collection = db.notes
+        self.folders_collection = db.folders
+        self.habits_collection = db.habits
+        self.tombstones_collection = db.sync_tombstones
+
+    @staticmethod
+    def encode_cursor(moment: datetime) -> str:
+        """Encode a server timestamp as an opaque sync cursor (milliseconds since epoch)."""
+        return str(int((moment - datetime(1970, 1, 1)).total_seconds() * 1000))
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> datetime:
+        """
+        Decode a sync cursor back to a server timestamp.
+
+        Raises:
+            ValidationException: If the cursor is malformed
+        """
+        try:
+            millis = int(cursor)
+        except (TypeError, ValueError):
+            raise ValidationException("Invalid sync cursor")
+
+        if millis < 0:
+            raise ValidationException("Invalid sync cursor")
+
+        return datetime(1970, 1, 1) + timedelta(milliseconds=millis)
+
+    async def record_tombstones(
+        self,
+        user_ids: Iterable[Optional[str]],
+        collection: str,
+        document_id: str
+    ) -> None:
+        """
+        Record that a document is gone for the given users.
+
+        Written when a document is permanently deleted, or when a user loses
+        access to it, so that delta sync can tell clients to drop it.
+
+        Args:
+            user_ids: IDs of users who could see the document
+            collection: Collection name (tasks, notes, folders, habits)
+            document_id: Document's ObjectId as string
+        """
+        now = datetime.utcnow()
+        tombstones = [
+            {
+                "userId": user_id,
+                "collection": collection,
+                "documentId": document_id,
+                "deletedAt": now
+            }
+            for user_id in {uid for uid in user_ids if uid}
+        ]
+
+        if tombstones:
+            await self.tombstones_collection.insert_many(tombstones)
+
+    async def get_changes(self, user_id: str, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get everything that changed for a user since a cursor.
+
+        Without a cursor (or with one older than the tombstone retention
+        window) a full snapshot of live documents is returned and
+        `fullResync` is set so the client replaces its local state.
+        Delta results include soft-deleted documents so clients learn about
+        moves to trash; permanently deleted documents come back as tombstones.
+        Because the window overlaps the previous one slightly, the same
+        document may be returned twice; clients should upsert by ID.
+
+        Args:
+            user_id: User's ID
+            cursor: Cursor returned by the previous sync (optional)
+
+        Returns:
+            Dictionary with changed documents per collection, tombstones and the next cursor
+
+        Raises:
+            ValidationException: If the cursor is malformed
+        """
+        now = datetime.utcnow()
+        since = self.decode_cursor(cursor) if cursor else None
+
+        retention_start = now - timedelta(days=settings.sync_tombstone_retention_days)
+        full_resync = since is None or since < retention_start
+
+        if full_resync:
+            changed_filter: Dict[str, Any] = {}
+            live_filter: Dict[str, Any] = {"isDeleted": {"$ne": True}}
+        else:
+            # Overlap the window to catch writes still in flight at the last cursor
+            window_start = since - timedelta(seconds=settings.sync_cursor_overlap_seconds)
+            changed_filter = {"updatedAt": {"$gt": window_start}}
+            live_filter = {}
+
+        tasks = await self.tasks_collection.find({
+            "$or": [
+                {"userId": user_id},
+                {"collaborators.userId": user_id}
+            ],
+            **changed_filter,
+            **live_filter
+        }).to_list(length=None)
+
+        notes = await self.notes_collection.find({
+            "$or": [
+                {"userId": user_id},
+                {"collaborators.userId": user_id}
+            ],
+            **changed_filter,
+            **live_filter
+        }).to_list(length=None)
+
+        folders = await self.folders_collection.find({
+            "userId": user_id,
+            **changed_filter
+        }).to_list(length=None)
+
+        habits = await self.habits_collection.find({
+            "$or": [
+                {"userId": user_id},
+                {"sharedWith": user_id}
+            ],
+            **changed_filter
+        }).to_list(length=None)
+
+        deleted: List[Dict[str, Any]] = []
+        if not full_resync:
+            deleted = await self.tombstones_collection.find(
+                {"userId": user_id, "deletedAt": {"$gt": window_start}},
+                {"_id": 0, "collection": 1, "documentId": 1, "deletedAt": 1}
+            ).to_list(length=None)
+
+        return {
+            "tasks": tasks,
+            "notes": [decode_note(note) for note in notes],
+            "folders": folders,
+            "habits": habits,
+            "deleted": deleted,
+            "cursor": self.encode_cursor(now),
+            "fullResync": full_resync
+        }
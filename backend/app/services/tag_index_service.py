@@ -0,0 +1,158 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from typing import Optional, List, Dict, Any, Iterable
+from datetime import datetime
+
+from app.utils.exceptions import ValidationException
+
+
+COLLECTIONS = ("notes", "tasks")
+
+
+class TagIndexService:
+    """
+    Per-user tag counts for notes and tasks (the user_tags collection).
+
+    One document per (userId, tag) holds how many of the user's live
+    (not trashed) notes and tasks carry the tag, plus a lowercase key for
+    prefix lookups. NoteService and TaskService apply the difference
+    between a document's old and new tags on every write, so facet counts
+    and autocomplete never scan notes or tasks. Counts cover documents the
+    user owns; rebuild() recomputes them from scratch.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.tags_collection = db.user_tags
+
+    # Maintenance (called by NoteService and TaskService)
+
+    async def update(
+        self,
+        user_id: str,
+        collection: str,
+        old_tags: Optional[Iterable[str]],
+        new_tags: Optional[Iterable[str]]
+    ) -> None:
+        """
+        Apply a document's tag change to its owner's tag counts.
+
+        Args:
+            user_id: Owner's ID
+            collection: "notes" or "tasks"
+            old_tags: Tags before the write (None or [] when the document wasn't counted)
+            new_tags: Tags after the write (None or [] when it no longer counts, e.g. trashed)
+        """
+        old, new = set(old_tags or []), set(new_tags or [])
+        deltas = {tag: 1 for tag in new - old}
+        deltas.update({tag: -1 for tag in old - new})
+        if not user_id or not deltas:
+            return
+
+        now = datetime.utcnow()
+        await self.tags_collection.bulk_write([
+            UpdateOne(
+                {"userId": user_id, "tag": tag},
+                {"$inc": {collection: delta}, "$set": {"key": tag.lower(), "updatedAt": now}},
+                upsert=True
+            )
+            for tag, delta in deltas.items()
+        ], ordered=False)
+
+        removed = [tag for tag, delta in deltas.items() if delta < 0]
+        if removed:
+            await self.tags_collection.delete_many({
+                "userId": user_id,
+                "tag": {"$in": removed},
+                **{name: {"$not": {"$gt": 0}} for name in COLLECTIONS}
+            })
+
+    async def delete_user(self, user_id: str) -> None:
+        """Drop all tag counts of a deleted account."""
+        await self.tags_collection.delete_many({"userId": user_id})
+
+    async def rebuild(self, user_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Recompute tag counts from the notes and tasks collections.
+
+        Args:
+            user_id: Only rebuild this user's tags (default: everyone's)
+
+        Returns:
+            Dictionary with the number of tags written and stale tags removed
+        """
+        match: Dict[str, Any] = {"isDeleted": {"$ne": True}, "tags.0": {"$exists": True}}
+        if user_id:
+            match["userId"] = user_id
+
+        counts: Dict[tuple, Dict[str, int]] = {}
+        for collection in COLLECTIONS:
+            async for row in self.db[collection].aggregate([
+                {"$match": match},
+                {"$project": {"userId": 1, "tags": {"$setUnion": ["$tags", []]}}},
+                {"$unwind": "$tags"},
+                {"$group": {"_id": {"userId": "$userId", "tag": "$tags"}, "count": {"$sum": 1}}}
+            ]):
+                key = (row["_id"]["userId"], row["_id"]["tag"])
+                counts.setdefault(key, {name: 0 for name in COLLECTIONS})[collection] = row["count"]
+
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"userId": owner, "tag": tag},
+                {"$set": {**tag_counts, "key": tag.lower(), "updatedAt": now}},
+                upsert=True
+            )
+            for (owner, tag), tag_counts in counts.items()
+        ]
+        for start in range(0, len(operations), 1000):
+            await self.tags_collection.bulk_write(operations[start:start + 1000], ordered=False)
+
+        # Tags no longer used anywhere weren't rewritten above
+        stale = await self.tags_collection.delete_many(
+            {"updatedAt": {"$lt": now}, **({"userId": user_id} if user_id else {})}
+        )
+        return {"tagsWritten": len(operations), "tagsRemoved": stale.deleted_count}
+
+    # Reading
+
+    async def get_tags(
+        self,
+        user_id: str,
+        collection: Optional[str] = None,
+        prefix: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        List a user's tags with usage counts, most used first.
+
+        Args:
+            user_id: User's ID
+            collection: Only tags used by "notes" or "tasks" (default: both)
+            prefix: Only tags starting with this text, case-insensitively (autocomplete)
+            limit: Maximum number of tags to return
+
+        Returns:
+            List of dictionaries with tag, notes, tasks and total
+
+        Raises:
+            ValidationException: If the collection is unknown
+        """
+        query: Dict[str, Any] = {"userId": user_id}
+        if collection:
+            if collection not in COLLECTIONS:
+                raise ValidationException(f"collection must be one of: {', '.join(COLLECTIONS)}")
+            query[collection] = {"$gt": 0}
+        if prefix:
+            # Range scan over the (userId, key) index
+            key = prefix.lower()
+            query["key"] = {"$gte": key, "$lt": key + "\uffff"}
+
+        tags = []
+        async for doc in self.tags_collection.find(query, {"_id": 0, "tag": 1, "notes": 1, "tasks": 1}):
+            notes, tasks = max(doc.get("notes", 0), 0), max(doc.get("tasks", 0), 0)
+            tags.append({"tag": doc["tag"], "notes": notes, "tasks": tasks, "total": notes + tasks})
+
+        sort_key = (lambda t: -t[collection]) if collection else (lambda t: -t["total"])
+        tags.sort(key=lambda t: (sort_key(t), t["tag"].lower()))
+        return tags[:limit]
@@ -0,0 +1,341 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from typing import Optional, List, Dict, Any, Iterable
+from datetime import date, datetime, timedelta
+from collections import defaultdict
+
+from app.config import settings
+from app.utils.exceptions import NotFoundException, ValidationException
+
+
+STATUSES = ("todo", "doing", "done")
+COUNTERS = ("created", "completed", "reopened", "leadTimeSeconds", "leadTimeCount",
+            "cycleTimeSeconds", "cycleTimeCount")
+
+
+class TaskAnalyticsService:
+    """
+    Service for task productivity analytics.
+
+    Analytics are read from task_daily_rollups, one document per scope
+    (user or team) and UTC day, so dashboards never aggregate raw tasks.
+    Rollups are updated incrementally as tasks are created, change status,
+    or move in and out of the trash, and rebuilt nightly by reconcile().
+
+    Rollup counters per day:
+    - created / completed / reopened: task events
+    - flow.<status>: net change in tasks per status (summed for cumulative flow)
+    - leadTime* / cycleTime*: sums and counts for tasks completed that day
+      (lead = created -> done, cycle = first started -> done)
+    - overdue: open overdue tasks, snapshotted by the nightly reconcile
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.tasks_collection = db.tasks
+        self.teams_collection = db.teams
+        self.rollups_collection = db.task_daily_rollups
+
+    # Incremental maintenance (called by TaskService)
+
+    @staticmethod
+    def _scopes(task: Dict[str, Any]) -> List[tuple]:
+        """Get the (scope, scopeId) pairs a task's events count towards."""
+        scopes = [("user", task.get("userId"))]
+        if task.get("teamId"):
+            scopes.append(("team", task["teamId"]))
+        return [scope for scope in scopes if scope[1]]
+
+    async def _apply(self, task: Dict[str, Any], at: datetime, inc: Dict[str, int]) -> None:
+        """Add counter deltas to the task's rollups for the day of `at`."""
+        inc = {key: value for key, value in inc.items() if value}
+        if not inc:
+            return
+
+        day = at.date().isoformat()
+        for scope, scope_id in self._scopes(task):
+            await self.rollups_collection.update_one(
+                {"_id": f"{scope}:{scope_id}:{day}"},
+                {
+                    "$inc": inc,
+                    "$setOnInsert": {"scope": scope, "scopeId": scope_id, "date": day}
+                },
+                upsert=True
+            )
+
+    @staticmethod
+    def _completion(task: Dict[str, Any], at: datetime) -> Dict[str, int]:
+        """Counter deltas for a task reaching done at `at`."""
+        inc = {"completed": 1}
+        if task.get("createdAt"):
+            inc["leadTimeSeconds"] = int((at - task["createdAt"]).total_seconds())
+            inc["leadTimeCount"] = 1
+        started = task.get("startedAt") or at
+        inc["cycleTimeSeconds"] = int((at - started).total_seconds())
+        inc["cycleTimeCount"] = 1
+        return inc
+
+    async def record_created(self, task: Dict[str, Any]) -> None:
+        """Record a new task."""
+        at = task.get("createdAt") or datetime.utcnow()
+        status = task.get("status", "todo")
+        inc = {"created": 1, f"flow.{status}": 1}
+        if status == "done":
+            inc.update(self._completion(task, at))
+        await self._apply(task, at, inc)
+
+    async def record_status_change(self, task: Dict[str, Any], new_status: str, at: datetime) -> None:
+        """
+        Record a task moving between statuses.
+
+        Args:
+            task: Task document as it was before the change
+            new_status: Status the task moved to
+            at: Time of the change
+        """
+        old_status = task.get("status", "todo")
+        if old_status == new_status:
+            return
+
+        inc = {f"flow.{old_status}": -1, f"flow.{new_status}": 1}
+        if new_status == "done":
+            inc.update(self._completion(task, at))
+        elif old_status == "done":
+            inc["reopened"] = 1
+        await self._apply(task, at, inc)
+
+    async def record_trashed(self, task: Dict[str, Any], at: datetime) -> None:
+        """Record a task leaving the board (moved to trash)."""
+        await self._apply(task, at, {f"flow.{task.get('status', 'todo')}": -1})
+
+    async def record_restored(self, task: Dict[str, Any], at: datetime) -> None:
+        """Record a task returning from the trash."""
+        await self._apply(task, at, {f"flow.{task.get('status', 'todo')}": 1})
+
+    # Nightly rebuild
+
+    async def reconcile(self) -> Dict[str, int]:
+        """
+        Rebuild all rollups from the tasks collection.
+
+        Live tasks are replayed along their recorded timestamps (created ->
+        startedAt -> completedAt), which reproduces current per-status
+        totals exactly; reopen history and trashed tasks are dropped.
+        Today's overdue snapshot is taken at the same time. Existing
+        overdue snapshots for past days are kept.
+
+        Returns:
+            Counts of tasks scanned and rollup documents written
+        """
+        now = datetime.utcnow()
+        rollups: Dict[tuple, Dict[str, Any]] = defaultdict(lambda: defaultdict(int))
+        overdue: Dict[tuple, int] = defaultdict(int)
+        scanned = 0
+
+        cursor = self.tasks_collection.find(
+            {"isDeleted": {"$ne": True}},
+            {"userId": 1, "teamId": 1, "status": 1, "dueDate": 1,
+             "createdAt": 1, "startedAt": 1, "completedAt": 1, "updatedAt": 1}
+        )
+
+        async for task in cursor:
+            scanned += 1
+            status = task.get("status", "todo")
+            created = task.get("createdAt") or now
+            started = task.get("startedAt") if status in ("doing", "done") else None
+            completed = (task.get("completedAt") or task.get("updatedAt") or now) if status == "done" else None
+
+            events = [(created, {"created": 1, "flow.todo": 1})]
+            if started:
+                events.append((started, {"flow.todo": -1, "flow.doing": 1}))
+            if completed:
+                previous = "doing" if started else "todo"
+                events.append((completed, {f"flow.{previous}": -1, "flow.done": 1, **self._completion(task, completed)}))
+
+            for scope in self._scopes(task):
+                for at, inc in events:
+                    counters = rollups[(*scope, at.date().isoformat())]
+                    for key, value in inc.items():
+                        counters[key] += value
+
+                due = task.get("dueDate")
+                if status != "done" and isinstance(due, datetime) and due < now:
+                    overdue[scope] += 1
+
+        today = now.date().isoformat()
+        for scope, count in overdue.items():
+            rollups[(*scope, today)]["overdue"] = count
+
+        operations = []
+        for (scope, scope_id, day), counters in rollups.items():
+            fields = {key: counters.get(key, 0) for key in COUNTERS}
+            fields["flow"] = {s: counters.get(f"flow.{s}", 0) for s in STATUSES}
+            if day == today:
+                fields["overdue"] = counters.get("overdue", 0)
+            operations.append(UpdateOne(
+                {"_id": f"{scope}:{scope_id}:{day}"},
+                {"$set": {**fields, "scope": scope, "scopeId": scope_id, "date": day, "rebuiltAt": now}},
+                upsert=True
+            ))
+
+        for start in range(0, len(operations), 1000):
+            await self.rollups_collection.bulk_write(operations[start:start + 1000], ordered=False)
+
+        # Days no live task contributes to anymore (today's untouched docs may
+        # have been created by writes that raced the scan, so they are kept)
+        await self.rollups_collection.update_many(
+            {"$or": [
+                {"rebuiltAt": {"$lt": now}},
+                {"rebuiltAt": {"$exists": False}, "date": {"$lt": today}}
+            ]},
+            {"$set": {
+                **{key: 0 for key in COUNTERS},
+                "flow": {s: 0 for s in STATUSES},
+                "rebuiltAt": now
+            }}
+        )
+        await self.rollups_collection.update_many(
+            {"date": today, "overdue": {"$exists": False}},
+            {"$set": {"overdue": 0}}
+        )
+
+        return {"tasksScanned": scanned, "rollupsWritten": len(operations)}
+
+    async def reconcile_if_due(self) -> Optional[Dict[str, int]]:
+        """
+        Run reconcile() if no worker has run it within the reconcile interval.
+
+        The last run is claimed in scheduler_leases, so restarts and multiple
+        workers don't rebuild more than once per interval.
+
+        Returns:
+            reconcile() result, or None if it wasn't due
+        """
+        now = datetime.utcnow()
+        try:
+            await self.db.scheduler_leases.find_one_and_update(
+                {
+                    "_id": "task_rollup_reconcile",
+                    "ranAt": {"$lt": now - timedelta(hours=settings.task_rollup_reconcile_interval_hours)}
+                },
+                {"$set": {"ranAt": now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return None
+
+        return await self.reconcile()
+
+    # Queries
+
+    async def _check_scope(self, user_id: str, team_id: Optional[str]) -> tuple:
+        """Resolve the scope to report on, checking team membership."""
+        if not team_id:
+            return "user", user_id
+
+        try:
+            team = await self.teams_collection.find_one(
+                {
+                    "_id": ObjectId(team_id),
+                    "$or": [{"ownerId": user_id}, {"members.userId": user_id}]
+                },
+                {"_id": 1}
+            )
+        except Exception:
+            raise NotFoundException("Team not found")
+
+        if not team:
+            raise NotFoundException("Team not found or you're not a member")
+
+        return "team", team_id
+
+    @staticmethod
+    def _days(start: date, end: date) -> Iterable[str]:
+        day = start
+        while day <= end:
+            yield day.isoformat()
+            day += timedelta(days=1)
+
+    async def get_task_analytics(
+        self,
+        user_id: str,
+        start_date: date,
+        end_date: date,
+        team_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get task analytics for a user or team over a date range.
+
+        Args:
+            user_id: User's ID
+            start_date: First day (inclusive, UTC)
+            end_date: Last day (inclusive, UTC)
+            team_id: Report on this team instead of the user (optional)
+
+        Returns:
+            Dictionary with throughput, cumulative flow, lead/cycle time and overdue series
+
+        Raises:
+            NotFoundException: If the team doesn't exist or the user isn't a member
+            ValidationException: If the range is invalid or longer than a year
+        """
+        if end_date < start_date:
+            raise ValidationException("end_date must not be before start_date")
+        if (end_date - start_date).days > 366:
+            raise ValidationException("Range cannot exceed 366 days")
+
+        scope, scope_id = await self._check_scope(user_id, team_id)
+        start, end = start_date.isoformat(), end_date.isoformat()
+
+        # Flow before the window: the cumulative flow starting point
+        baseline = await self.rollups_collection.aggregate([
+            {"$match": {"scope": scope, "scopeId": scope_id, "date": {"$lt": start}}},
+            {"$group": {"_id": None, **{s: {"$sum": f"$flow.{s}"} for s in STATUSES}}}
+        ]).to_list(length=1)
+        running = {s: baseline[0][s] if baseline else 0 for s in STATUSES}
+
+        docs = await self.rollups_collection.find(
+            {"scope": scope, "scopeId": scope_id, "date": {"$gte": start, "$lte": end}}
+        ).to_list(length=None)
+        by_day = {doc["date"]: doc for doc in docs}
+
+        throughput = []
+        cumulative_flow = []
+        overdue_series = []
+        totals = defaultdict(int)
+
+        for day in self._days(start_date, end_date):
+            doc = by_day.get(day, {})
+            for s in STATUSES:
+                running[s] += doc.get("flow", {}).get(s, 0)
+            for key in COUNTERS:
+                totals[key] += doc.get(key, 0)
+
+            throughput.append({"date": day, "created": doc.get("created", 0), "completed": doc.get("completed", 0)})
+            cumulative_flow.append({"date": day, **running})
+            if "overdue" in doc:
+                overdue_series.append({"date": day, "overdue": doc["overdue"]})
+
+        def average_hours(seconds_key: str, count_key: str) -> Optional[float]:
+            if not totals[count_key]:
+                return None
+            return round(totals[seconds_key] / totals[count_key] / 3600, 2)
+
+        return {
+            "scope": scope,
+            "scopeId": scope_id,
+            "startDate": start_date,
+            "endDate": end_date,
+            "throughput": throughput,
+            "cumulativeFlow": cumulative_flow,
+            "totals": {
+                "created": totals["created"],
+                "completed": totals["completed"],
+                "reopened": totals["reopened"]
+            },
+            "leadTimeHours": average_hours("leadTimeSeconds", "leadTimeCount"),
+            "cycleTimeHours": average_hours("cycleTimeSeconds", "cycleTimeCount"),
+            "overdue": overdue_series
+        }
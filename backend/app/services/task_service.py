@@ -1,9 +1,30 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import base64
+import json
 
-from app.utils.exceptions import NotFoundException, ValidationException
+from app.config import settings
+from app.schemas.task import TaskStatus
+from app.services.attachment_service import AttachmentService
+from app.services.due_date_scheduler import DueDateScheduler
+from app.services.folder_service import FolderService
+from app.services.index_advisor import IndexAdvisor
+from app.services.smart_list_service import SmartListService
+from app.services.sync_service import SyncService
+from app.services.tag_index_service import TagIndexService
+from app.services.task_analytics_service import TaskAnalyticsService
+from app.services.version_service import VersionService
+from app.utils.etag import version_condition
+from app.utils.exceptions import NotFoundException, PreconditionFailedException, ValidationException
+from app.utils.recurrence import expand, last_occurrence, parse_rrule, to_naive_utc
+
+
+SORT_FIELDS = ("dueDate", "priority", "status", "position", "title", "createdAt", "updatedAt")
+PRIORITY_ORDER = ["low", "medium", "high"]
 
 
 class TaskService:
@@ -14,25 +35,322 @@ class TaskService:
         self.tasks_collection = db.tasks
         self.users_collection = db.users
         self.teams_collection = db.teams
+        self.version_service = VersionService(db)
+        self.sync_service = SyncService(db)
+        self.attachment_service = AttachmentService(db)
+        self.analytics_service = TaskAnalyticsService(db)
+        self.smart_list_service = SmartListService(db)
+        self.tag_index_service = TagIndexService(db)
+        self.folder_service = FolderService(db)
+    
+    @staticmethod
+    def _audience(task: Dict[str, Any]) -> List[str]:
+        """Get IDs of users who see a task in their task list (owner and collaborators)."""
+        return [task.get("userId")] + [c["userId"] for c in task.get("collaborators", [])]
+    
+    @staticmethod
+    def _with_subtask_ids(subtasks: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Give every subtask a stable ID so it can be addressed with arrayFilters."""
+        return [
+            {**subtask, "id": subtask.get("id") or str(ObjectId())}
+            for subtask in subtasks or []
+        ]
+    
+    @staticmethod
+    def _merge_attachments(
+        requested: Optional[List[Dict[str, Any]]],
+        stored: Optional[List[Dict[str, Any]]]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Reconcile a client's attachment list with the task's stored attachments.
+        
+        Uploaded files are only attached through /tasks/{id}/attachments, so
+        their id, sha256 and size are server-owned: an entry naming a stored
+        attachment's id keeps the stored entry as is, and any other entry is
+        kept as a plain link without those fields.
+        
+        Args:
+            requested: Attachments sent by the client
+            stored: Attachments currently on the task
+        
+        Returns:
+            Tuple of (attachments to store, hashes of uploads the client dropped)
+        """
+        stored_by_id = {a["id"]: a for a in stored or [] if a.get("id")}
+        merged, kept = [], set()
+        for attachment in requested or []:
+            attachment_id = attachment.get("id")
+            if attachment_id in stored_by_id:
+                if attachment_id not in kept:
+                    merged.append(stored_by_id[attachment_id])
+                    kept.add(attachment_id)
+            else:
+                merged.append({k: v for k, v in attachment.items() if k not in ("id", "sha256", "size")})
+        
+        released = [a.get("sha256") for a_id, a in stored_by_id.items() if a_id not in kept]
+        return merged, released
+    
+    async def _bump_version(self, *tasks: Dict[str, Any]) -> None:
+        """Bump the tasks collection version for everyone who sees the given tasks."""
+        user_ids = []
+        for task in tasks:
+            user_ids.extend(self._audience(task))
+        await self.version_service.bump(user_ids, "tasks")
+    
+    async def _record_status_change(
+        self,
+        before: Dict[str, Any],
+        new_status: Optional[str],
+        now: datetime
+    ) -> Dict[str, Any]:
+        """
+        Stamp startedAt/completedAt for a status change and update the analytics rollups.
+        
+        Args:
+            before: Task document as it was before the update
+            new_status: Status the task was set to (None if unchanged)
+            now: Time of the update
+        
+        Returns:
+            Stamped fields to merge into the returned task
+        """
+        if not new_status or before.get("status", "todo") == new_status or before.get("isDeleted"):
+            return {}
+        
+        stamps = {"completedAt": now if new_status == "done" else None}
+        update = {"$set": dict(stamps)}
+        if new_status in ("doing", "done"):
+            stamps["startedAt"] = min(before.get("startedAt") or now, now)
+            update["$min"] = {"startedAt": now}
+        
+        # Skip the stamp if another write moved the task on in the meantime
+        await self.tasks_collection.update_one({"_id": before["_id"], "status": new_status}, update)
+        await self.analytics_service.record_status_change(before, new_status, now)
+        await self.folder_service.invalidate_summary([before.get("userId")])
+        
+        return stamps
+    
+    async def _raise_write_failed(
+        self,
+        task_id: str,
+        user_id: str,
+        expected_versions: Optional[List[int]]
+    ) -> None:
+        """Explain a conditional write that matched nothing: missing task or stale If-Match."""
+        if expected_versions is not None and await self.tasks_collection.find_one(
+            {"_id": ObjectId(task_id), "userId": user_id}, {"_id": 1}
+        ):
+            raise PreconditionFailedException("Task has been modified since it was read")
+        raise NotFoundException("Task not found")
+    
+    @staticmethod
+    def _recurrence_fields(rule: Optional[str], due_date: Optional[datetime]) -> Dict[str, Any]:
+        """
+        Validate a recurrence rule and derive the fields stored with it.
+        
+        Raises:
+            ValidationException: If the rule is invalid or the task has no due date
+        """
+        if not rule:
+            return {"recurrence": None, "recurrenceEnd": None}
+        
+        if not due_date:
+            raise ValidationException("Recurring tasks need a dueDate (the first occurrence)")
+        
+        parse_rrule(rule)
+        due_date = to_naive_utc(due_date)
+        
+        return {
+            "recurrence": rule.strip(),
+            # Lets window queries skip series that ended before the window
+            "recurrenceEnd": last_occurrence(rule, due_date)
+        }
+    
+    async def _with_occurrences(
+        self,
+        query: Dict[str, Any],
+        start: datetime,
+        end: datetime,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get tasks due in [start, end), expanding recurring tasks into occurrences.
+        
+        Only the window is expanded. Occurrences that were completed or
+        edited exist as their own documents (with recurrenceId and
+        occurrenceDate) and replace the generated ones.
+        
+        Args:
+            query: Base filter (access, folder, status, ...)
+            start: Window start (inclusive, naive UTC)
+            end: Window end (exclusive, naive UTC)
+            projection: Fields to return (optional, defaults to all)
+        
+        Returns:
+            Task documents sorted by due date; generated occurrences have isOccurrence set
+        """
+        tasks = await self.tasks_collection.find({
+            **query,
+            "dueDate": {"$gte": start, "$lt": end},
+            "recurrence": None
+        }, projection).to_list(length=None)
+        
+        master_projection = None
+        if projection:
+            master_projection = {**projection, "recurrence": 1, "recurrenceExceptions": 1, "dueDate": 1}
+        
+        masters = await self.tasks_collection.find({
+            **query,
+            "recurrence": {"$type": "string"},
+            "dueDate": {"$lt": end},
+            "$and": [{"$or": [{"recurrenceEnd": None}, {"recurrenceEnd": {"$gte": start}}]}]
+        }, master_projection).to_list(length=None)
+        
+        if masters:
+            materialized = await self.tasks_collection.find(
+                {
+                    "recurrenceId": {"$in": [str(master["_id"]) for master in masters]},
+                    "occurrenceDate": {"$gte": start, "$lt": end}
+                },
+                {"recurrenceId": 1, "occurrenceDate": 1}
+            ).to_list(length=None)
+            taken = {(doc["recurrenceId"], doc["occurrenceDate"]) for doc in materialized}
+            
+            for master in masters:
+                master_id = str(master["_id"])
+                template = {
+                    key: value for key, value in master.items()
+                    if key not in ("_id", "recurrence", "recurrenceExceptions", "recurrenceEnd")
+                }
+                
+                for occurrence in expand(
+                    master["recurrence"], master["dueDate"], start, end,
+                    master.get("recurrenceExceptions", [])
+                ):
+                    if (master_id, occurrence) in taken:
+                        continue
+                    tasks.append({
+                        **template,
+                        "_id": f"{master_id}:{occurrence:%Y%m%dT%H%M%SZ}",
+                        "dueDate": occurrence,
+                        "recurrenceId": master_id,
+                        "occurrenceDate": occurrence,
+                        "isOccurrence": True
+                    })
+        
+        tasks.sort(key=lambda task: task["dueDate"])
+        return tasks
+    
+    @staticmethod
+    def parse_sort(sort: Optional[str]) -> List[tuple]:
+        """
+        Parse a sort parameter like "dueDate,-priority" into (field, direction) pairs.
+        
+        _id is always appended as the last key so equal values keep a stable order.
+        
+        Raises:
+            ValidationException: If a field can't be sorted on
+        """
+        spec = []
+        for part in filter(None, (p.strip() for p in (sort or "").split(","))):
+            field, direction = (part[1:], -1) if part.startswith("-") else (part.lstrip("+"), 1)
+            if field not in SORT_FIELDS:
+                raise ValidationException(f"Cannot sort by {field}; use one of {', '.join(SORT_FIELDS)}")
+            if field not in (f for f, _ in spec):
+                spec.append((field, direction))
+        
+        spec.append(("_id", 1))
+        return spec
+    
+    @staticmethod
+    def _sort_in_memory(tasks: List[Dict[str, Any]], sort: List[tuple]) -> None:
+        """Sort already-fetched tasks like MongoDB would (missing values first, priority by rank)."""
+        for field, direction in reversed(sort):
+            def key(task: Dict[str, Any], field: str = field) -> tuple:
+                value = task.get(field)
+                if field == "priority":
+                    value = PRIORITY_ORDER.index(value) if value in PRIORITY_ORDER else -1
+                elif field == "_id":
+                    value = str(value)
+                return (value is not None, value if value is not None else 0)
+            tasks.sort(key=key, reverse=direction < 0)
+    
+    async def _find_sorted(
+        self,
+        query: Dict[str, Any],
+        sort: List[tuple],
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run a task query with a sort that may include priority.
+        
+        Priority is stored as a name, so sorting by it goes through an
+        aggregation that ranks low < medium < high; other sorts are a plain find.
+        """
+        IndexAdvisor.record("tasks", query, sort)
+        
+        if not any(field == "priority" for field, _ in sort):
+            cursor = self.tasks_collection.find(query, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            return await cursor.to_list(length=None)
+        
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": query},
+            {"$addFields": {"_priorityRank": {"$indexOfArray": [PRIORITY_ORDER, "$priority"]}}},
+            {"$sort": {("_priorityRank" if field == "priority" else field): direction for field, direction in sort}},
+            {"$project": projection} if projection else {"$unset": "_priorityRank"}
+        ]
+        return await self.tasks_collection.aggregate(pipeline).to_list(length=None)
     
     async def get_tasks(
         self,
         user_id: str,
         include_deleted: bool = False,
         folder_id: Optional[str] = None,
-        status: Optional[str] = None
+        status: Optional[List[str]] = None,
+        projection: Optional[Dict[str, int]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        priority: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        match_all_tags: bool = False,
+        labels: Optional[List[str]] = None,
+        due_from: Optional[datetime] = None,
+        due_to: Optional[datetime] = None,
+        sort: Optional[str] = None,
+        include_subfolders: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Get all tasks for a user (owned or shared with them).
         
+        Without a window, each recurring task is returned once (as its series).
+        With start and end, only tasks due in the window are returned and
+        recurring tasks are expanded into their occurrences.
+        
         Args:
             user_id: User's ID
             include_deleted: Whether to include soft-deleted tasks
             folder_id: Filter by folder ID (optional)
-            status: Filter by status (optional)
+            status: Only tasks in one of these statuses (optional)
+            projection: Fields to return (optional, defaults to all)
+            start: Due date window start (optional, requires end)
+            end: Due date window end (optional, requires start)
+            priority: Only tasks with one of these priorities (optional)
+            tags: Only tasks with any of these tags (optional)
+            match_all_tags: Require every tag in `tags` instead of any
+            labels: Only tasks with a label of one of these names (optional)
+            due_from: Only tasks due at or after this time (optional)
+            due_to: Only tasks due before this time (optional)
+            sort: Sort fields, e.g. "dueDate,-priority" (optional, defaults to _id)
+            include_subfolders: With folder_id, also tasks in folders nested under it
         
         Returns:
             List of task documents
+        
+        Raises:
+            ValidationException: If only one of start/end is given, a due range is
+                combined with a window, or the sort is invalid
         """
         query = {
             "$or": [
@@ -45,13 +363,85 @@ class TaskService:
             query["isDeleted"] = {"$ne": True}
         
         if folder_id:
-            query["folderId"] = folder_id
+            query["folderId"] = (
+                {"$in": await self.folder_service.get_subtree_ids(folder_id)} if include_subfolders else folder_id
+            )
         
-        if status:
-            query["status"] = status
+        # Single values match by equality, several with $in
+        for field, values in (("status", status), ("priority", priority), ("labels.name", labels)):
+            if values:
+                query[field] = values[0] if len(values) == 1 else {"$in": values}
+        
+        if tags:
+            query["tags"] = {"$all" if match_all_tags else "$in": tags}
+        
+        sort_spec = self.parse_sort(sort) if sort else []  # Unsorted unless asked, as before
+        
+        if start or end:
+            if not (start and end):
+                raise ValidationException("start and end must be given together")
+            if due_from or due_to:
+                raise ValidationException("due_from/due_to cannot be combined with start/end")
+            tasks = await self._with_occurrences(query, to_naive_utc(start), to_naive_utc(end), projection)
+            if sort_spec:
+                self._sort_in_memory(tasks, sort_spec)
+            return tasks
+        
+        if due_from or due_to:
+            due_range = {}
+            if due_from:
+                due_range["$gte"] = to_naive_utc(due_from)
+            if due_to:
+                due_range["$lt"] = to_naive_utc(due_to)
+            query["dueDate"] = due_range
+        
+        return await self._find_sorted(query, sort_spec, projection)
+    
+    async def get_calendar_tasks(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get tasks due within a date range, ordered by due date.
         
-        tasks = await self.tasks_collection.find(query).to_list(length=None)
-        return tasks
+        Recurring tasks are expanded into their occurrences in the range.
+        
+        Args:
+            user_id: User's ID
+            start: Range start (inclusive)
+            end: Range end (exclusive)
+            projection: Fields to return (optional, defaults to all)
+        
+        Returns:
+            List of task documents
+        
+        Raises:
+            ValidationException: If the range is empty or too long
+        """
+        # Stored dates are naive UTC
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        
+        if end <= start:
+            raise ValidationException("end must be after start")
+        
+        if (end - start).days > settings.calendar_max_range_days:
+            raise ValidationException(f"Range cannot exceed {settings.calendar_max_range_days} days")
+        
+        return await self._with_occurrences(
+            {
+                "$or": [
+                    {"userId": user_id},
+                    {"collaborators.userId": user_id}
+                ],
+                "isDeleted": {"$ne": True}
+            },
+            start,
+            end,
+            projection
+        )
     
     async def get_task_by_id(self, task_id: str, user_id: str) -> Dict[str, Any]:
         """
@@ -93,6 +483,9 @@ class TaskService:
         
         Returns:
             Created task document
+        
+        Raises:
+            ValidationException: If the recurrence rule is invalid
         """
         task_doc = {
             "userId": user_id,
@@ -107,25 +500,41 @@ class TaskService:
             "color": task_data.get("color"),
             "labels": task_data.get("labels", []),
             "position": task_data.get("position"),
-            "subtasks": task_data.get("subtasks", []),
-            "attachments": task_data.get("attachments", []),
+            "subtasks": self._with_subtask_ids(task_data.get("subtasks", [])),
+            "attachments": self._merge_attachments(task_data.get("attachments"), [])[0],
+            **self._recurrence_fields(task_data.get("recurrence"), task_data.get("dueDate")),
+            "recurrenceExceptions": [],
             "collaborators": [],  # Initialize empty collaborators list
             "isDeleted": False,
             "deletedAt": None,
+            "version": 1,
             "createdAt": datetime.utcnow(),
             "updatedAt": datetime.utcnow()
         }
         
+        if task_doc["status"] in ("doing", "done"):
+            task_doc["startedAt"] = task_doc["createdAt"]
+        if task_doc["status"] == "done":
+            task_doc["completedAt"] = task_doc["createdAt"]
+        
         result = await self.tasks_collection.insert_one(task_doc)
         task_doc["_id"] = result.inserted_id
         
+        await self._bump_version(task_doc)
+        await self.analytics_service.record_created(task_doc)
+        await self.folder_service.invalidate_summary([user_id])
+        await self.smart_list_service.sync_task(task_doc)
+        await self.tag_index_service.update(user_id, "tasks", None, task_doc["tags"])
+        DueDateScheduler.schedule(task_doc)
+        
         return task_doc
     
     async def update_task(
         self,
         task_id: str,
         user_id: str,
-        task_data: Dict[str, Any]
+        task_data: Dict[str, Any],
+        expected_versions: Optional[List[int]] = None
     ) -> Dict[str, Any]:
         """
         Update a task.
@@ -134,12 +543,15 @@ class TaskService:
             task_id: Task's ObjectId as string
             user_id: User's ID (for authorization)
             task_data: Updated task data
+            expected_versions: Only update if the task is at one of these versions (If-Match)
         
         Returns:
             Updated task document
         
         Raises:
             NotFoundException: If task not found
+            ValidationException: If the recurrence rule is invalid
+            PreconditionFailedException: If the task changed since the expected version
         """
         # Build update document
         update_doc = {"updatedAt": datetime.utcnow()}
@@ -155,18 +567,91 @@ class TaskService:
             if field in task_data and task_data[field] is not None:
                 update_doc[field] = task_data[field]
         
-        # Update task
+        if "subtasks" in update_doc:
+            update_doc["subtasks"] = self._with_subtask_ids(update_doc["subtasks"])
+        
+        # Uploads keep their stored entries; the write below only applies if no
+        # upload or removal happened in between (dropped uploads are released after it)
+        attachment_condition, released = {}, []
+        if "attachments" in update_doc:
+            try:
+                current = await self.tasks_collection.find_one(
+                    {"_id": ObjectId(task_id), "userId": user_id},
+                    {"attachments": 1}
+                )
+            except Exception:
+                raise NotFoundException("Task not found")
+            
+            if not current:
+                raise NotFoundException("Task not found")
+            
+            stored = current.get("attachments", [])
+            update_doc["attachments"], released = self._merge_attachments(update_doc["attachments"], stored)
+            attachment_condition = {"attachments": stored}
+        
+        # Recurrence: "" clears it; a new rule or first due date re-derives its end
+        rule_changed = task_data.get("recurrence") is not None
+        if rule_changed or "dueDate" in update_doc:
+            try:
+                current = await self.tasks_collection.find_one(
+                    {"_id": ObjectId(task_id), "userId": user_id},
+                    {"dueDate": 1, "recurrence": 1}
+                )
+            except Exception:
+                raise NotFoundException("Task not found")
+            
+            if not current:
+                raise NotFoundException("Task not found")
+            
+            rule = task_data["recurrence"] if rule_changed else current.get("recurrence")
+            if rule_changed or rule:
+                update_doc.update(self._recurrence_fields(
+                    rule, update_doc.get("dueDate", current.get("dueDate"))
+                ))
+        
+        # Update task (a status change needs the previous status for analytics and a
+        # tag change the previous tags, so those cases return the old document and
+        # merge the update into it)
+        status_changed = "status" in update_doc
+        tags_changed = "tags" in update_doc
+        query = {
+            "_id": ObjectId(task_id),
+            "userId": user_id,
+            **version_condition(expected_versions),
+            **attachment_condition
+        }
         try:
             result = await self.tasks_collection.find_one_and_update(
-                {"_id": ObjectId(task_id), "userId": user_id},
-                {"$set": update_doc},
-                return_document=True
+                query,
+                {"$set": update_doc, "$inc": {"version": 1}},
+                return_document=ReturnDocument.BEFORE if status_changed or tags_changed else ReturnDocument.AFTER
             )
         except Exception:
             raise NotFoundException("Task not found")
         
         if not result:
-            raise NotFoundException("Task not found")
+            if attachment_condition and await self.tasks_collection.find_one(
+                {"_id": ObjectId(task_id), "userId": user_id, **version_condition(expected_versions)}, {"_id": 1}
+            ):
+                raise PreconditionFailedException("Task attachments changed while saving; reload and retry")
+            await self._raise_write_failed(task_id, user_id, expected_versions)
+        
+        await self.attachment_service.release(released)
+        
+        if status_changed or tags_changed:
+            previous = result
+            stamps = {}
+            if status_changed:
+                stamps = await self._record_status_change(previous, update_doc["status"], update_doc["updatedAt"])
+            result = {**previous, **update_doc, **stamps, "version": previous.get("version", 0) + 1}
+            if tags_changed and not previous.get("isDeleted"):
+                await self.tag_index_service.update(user_id, "tasks", previous.get("tags"), update_doc["tags"])
+        
+        await self._bump_version(result)
+        if "folderId" in update_doc:
+            await self.folder_service.invalidate_summary([user_id])
+        await self.smart_list_service.sync_task(result)
+        DueDateScheduler.schedule(result)
         
         return result
     
@@ -185,20 +670,34 @@ class TaskService:
             NotFoundException: If task not found
         """
         try:
-            result = await self.tasks_collection.update_one(
+            result = await self.tasks_collection.find_one_and_update(
                 {"_id": ObjectId(task_id), "userId": user_id},
-                {"$set": {
-                    "isDeleted": True,
-                    "deletedAt": datetime.utcnow(),
-                    "updatedAt": datetime.utcnow()
-                }}
+                {
+                    "$set": {
+                        "isDeleted": True,
+                        "deletedAt": datetime.utcnow(),
+                        "updatedAt": datetime.utcnow()
+                    },
+                    "$inc": {"version": 1}
+                },
+                projection={
+                    "userId": 1, "collaborators.userId": 1, "teamId": 1, "status": 1, "isDeleted": 1, "tags": 1
+                }
             )
         except Exception:
             raise NotFoundException("Task not found")
         
-        if result.matched_count == 0:
+        if not result:
             raise NotFoundException("Task not found")
         
+        await self._bump_version(result)
+        if not result.get("isDeleted"):
+            await self.analytics_service.record_trashed(result, datetime.utcnow())
+            await self.folder_service.invalidate_summary([user_id])
+            await self.tag_index_service.update(user_id, "tasks", result.get("tags"), None)
+        await self.smart_list_service.remove_task(task_id, self._audience(result))
+        DueDateScheduler.unschedule(task_id)
+        
         return {"message": "Task moved to trash"}
     
     async def restore_task(self, task_id: str, user_id: str) -> Dict[str, Any]:
@@ -215,21 +714,33 @@ class TaskService:
         Raises:
             NotFoundException: If task not found
         """
+        now = datetime.utcnow()
+        
         try:
             result = await self.tasks_collection.find_one_and_update(
-                {"_id": ObjectId(task_id), "userId": user_id},
-                {"$set": {
-                    "isDeleted": False,
-                    "deletedAt": None,
-                    "updatedAt": datetime.utcnow()
-                }},
-                return_document=True
+                {"_id": ObjectId(task_id), "userId": user_id, "isDeleted": True},
+                {
+                    "$set": {"isDeleted": False, "deletedAt": None, "updatedAt": now},
+                    "$inc": {"version": 1}
+                },
+                return_document=ReturnDocument.AFTER
             )
         except Exception:
             raise NotFoundException("Task not found")
         
         if not result:
-            raise NotFoundException("Task not found")
+            # Restoring a task that isn't in the trash is a no-op
+            result = await self.tasks_collection.find_one({"_id": ObjectId(task_id), "userId": user_id})
+            if not result:
+                raise NotFoundException("Task not found")
+            return result
+        
+        await self.analytics_service.record_restored(result, now)
+        await self.folder_service.invalidate_summary([user_id])
+        await self._bump_version(result)
+        await self.smart_list_service.sync_task(result)
+        await self.tag_index_service.update(user_id, "tasks", None, result.get("tags"))
+        DueDateScheduler.schedule(result)
         
         return result
     
@@ -248,24 +759,38 @@ class TaskService:
             NotFoundException: If task not found
         """
         try:
-            result = await self.tasks_collection.delete_one({
-                "_id": ObjectId(task_id),
-                "userId": user_id
-            })
+            result = await self.tasks_collection.find_one_and_delete(
+                {"_id": ObjectId(task_id), "userId": user_id},
+                projection={"userId": 1, "collaborators.userId": 1, "attachments.sha256": 1, "tags": 1, "isDeleted": 1}
+            )
         except Exception:
             raise NotFoundException("Task not found")
         
-        if result.deleted_count == 0:
+        if not result:
             raise NotFoundException("Task not found")
         
+        await self._bump_version(result)
+        await self.sync_service.record_tombstones(self._audience(result), "tasks", task_id)
+        await self.attachment_service.release(a.get("sha256") for a in result.get("attachments", []))
+        await self.smart_list_service.remove_task(task_id, self._audience(result))
+        if not result.get("isDeleted"):
+            await self.folder_service.invalidate_summary([user_id])
+            await self.tag_index_service.update(user_id, "tasks", result.get("tags"), None)
+        DueDateScheduler.unschedule(task_id)
+        
         return {"message": "Task permanently deleted"}
     
-    async def get_trashed_tasks(self, user_id: str) -> List[Dict[str, Any]]:
+    async def get_trashed_tasks(
+        self,
+        user_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Get all trashed (soft-deleted) tasks for a user.
         
         Args:
             user_id: User's ID
+            projection: Fields to return (optional, defaults to all)
         
         Returns:
             List of trashed task documents
@@ -273,7 +798,7 @@ class TaskService:
         tasks = await self.tasks_collection.find({
             "userId": user_id,
             "isDeleted": True
-        }).to_list(length=None)
+        }, projection).to_list(length=None)
         
         return tasks
     
@@ -385,12 +910,15 @@ class TaskService:
             {"_id": ObjectId(task_id)},
             {
                 "$push": {"collaborators": new_collaborator},
-                "$set": {"updatedAt": datetime.utcnow()}
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
             }
         )
         
         # Return updated task
         updated_task = await self.tasks_collection.find_one({"_id": ObjectId(task_id)})
+        await self._bump_version(updated_task)
+        await self.smart_list_service.sync_task(updated_task)
         return updated_task
     
     async def invite_task_collaborator(
@@ -458,12 +986,15 @@ class TaskService:
             {"_id": ObjectId(task_id)},
             {
                 "$push": {"collaborators": new_collaborator},
-                "$set": {"updatedAt": datetime.utcnow()}
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
             }
         )
         
         # Return updated task
         updated_task = await self.tasks_collection.find_one({"_id": ObjectId(task_id)})
+        await self._bump_version(updated_task)
+        await self.smart_list_service.sync_task(updated_task)
         return updated_task
     
     async def get_task_collaborators(
@@ -560,10 +1091,16 @@ class TaskService:
             {"_id": ObjectId(task_id)},
             {
                 "$pull": {"collaborators": {"userId": collaborator_id}},
-                "$set": {"updatedAt": datetime.utcnow()}
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
             }
         )
         
+        # The removed collaborator is still in the pre-update audience
+        await self._bump_version(task)
+        await self.sync_service.record_tombstones([collaborator_id], "tasks", task_id)
+        await self.smart_list_service.remove_task(task_id, [collaborator_id])
+        
         return {"message": "Collaborator removed successfully"}
     
     async def duplicate_task(self, task_id: str, user_id: str) -> Dict[str, Any]:
@@ -596,11 +1133,12 @@ class TaskService:
             "color": original_task.get("color"),
             "labels": original_task.get("labels", []),
             "position": None,  # Will be positioned at end
-            "subtasks": original_task.get("subtasks", []),
+            "subtasks": self._with_subtask_ids(original_task.get("subtasks", [])),
             "attachments": original_task.get("attachments", []),
             "collaborators": [],  # Don't copy collaborators
             "isDeleted": False,
             "deletedAt": None,
+            "version": 1,
             "createdAt": datetime.utcnow(),
             "updatedAt": datetime.utcnow()
         }
@@ -608,6 +1146,14 @@ class TaskService:
         result = await self.tasks_collection.insert_one(task_copy)
         task_copy["_id"] = result.inserted_id
         
+        await self.attachment_service.retain(a.get("sha256") for a in task_copy["attachments"])
+        
+        await self._bump_version(task_copy)
+        await self.analytics_service.record_created(task_copy)
+        await self.folder_service.invalidate_summary([user_id])
+        await self.smart_list_service.sync_task(task_copy)
+        DueDateScheduler.schedule(task_copy)
+        
         return task_copy
     
     async def reorder_tasks(
@@ -629,31 +1175,861 @@ class TaskService:
             NotFoundException: If any task not found
             ValidationException: If user doesn't own tasks
         """
-        for update in updates:
-            task_id = update.get("taskId")
-            position = update.get("position")
-            new_status = update.get("status")
-            
-            if not ObjectId.is_valid(task_id):
-                raise ValidationException(f"Invalid task ID: {task_id}")
-            
-            # Build update document
-            update_doc = {
-                "position": position,
-                "updatedAt": datetime.utcnow()
-            }
+        updated_tasks = []
+        
+        try:
+            for update in updates:
+                task_id = update.get("taskId")
+                position = update.get("position")
+                new_status = update.get("status")
+                
+                if not ObjectId.is_valid(task_id):
+                    raise ValidationException(f"Invalid task ID: {task_id}")
+                
+                # Build update document
+                update_doc = {
+                    "position": position,
+                    "updatedAt": datetime.utcnow()
+                }
+                
+                if new_status:
+                    update_doc["status"] = new_status
+                
+                # Update the task
+                result = await self.tasks_collection.find_one_and_update(
+                    {"_id": ObjectId(task_id), "userId": user_id},
+                    {"$set": update_doc, "$inc": {"version": 1}},
+                    projection={
+                        "userId": 1, "collaborators.userId": 1, "teamId": 1, "status": 1,
+                        "isDeleted": 1, "createdAt": 1, "startedAt": 1,
+                        # Smart list filters and the due date, re-evaluated when the status changes
+                        "priority": 1, "tags": 1, "labels.name": 1, "folderId": 1, "dueDate": 1
+                    }
+                )
+                
+                if not result:
+                    raise NotFoundException(f"Task {task_id} not found or you don't have permission")
+                
+                updated_tasks.append(result)
+                await self._record_status_change(result, new_status, update_doc["updatedAt"])
+                if new_status and new_status != result.get("status"):
+                    await self.smart_list_service.sync_task({**result, "status": new_status})
+                    DueDateScheduler.schedule({**result, "status": new_status})
+        finally:
+            # Tasks updated before a failure still changed
+            await self._bump_version(*updated_tasks)
+        
+        return {"message": f"Successfully updated {len(updates)} task(s)"}
+    
+    @staticmethod
+    def encode_board_cursor(task: Dict[str, Any]) -> str:
+        """Encode a task's (position, _id) sort key as an opaque board column cursor."""
+        key = json.dumps([task.get("position"), str(task["_id"])])
+        return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def decode_board_cursor(cursor: str) -> tuple:
+        """
+        Decode a board column cursor back to its (position, _id) sort key.
+        
+        Raises:
+            ValidationException: If the cursor is malformed
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            position, task_id = json.loads(base64.urlsafe_b64decode(padded))
+            if position is not None and not isinstance(position, int):
+                raise ValueError
+            return position, ObjectId(task_id)
+        except Exception:
+            raise ValidationException("Invalid board cursor")
+    
+    @staticmethod
+    def _after_cursor(position: Optional[int], task_id: ObjectId) -> Dict[str, Any]:
+        """
+        Build a keyset filter for tasks sorted after (position, _id).
+        
+        Tasks sort by position ascending, then _id; tasks without a position
+        sort first, matching MongoDB's ordering of null before numbers.
+        """
+        if position is None:
+            return {"$or": [
+                {"position": None, "_id": {"$gt": task_id}},
+                {"position": {"$type": "number"}}
+            ]}
+        return {"$or": [
+            {"position": {"$gt": position}},
+            {"position": position, "_id": {"$gt": task_id}}
+        ]}
+    
+    def _board_query(self, user_id: str, folder_id: Optional[str]) -> Dict[str, Any]:
+        """Build the base query for tasks shown on a user's board."""
+        query = {
+            "$or": [
+                {"userId": user_id},
+                {"collaborators.userId": user_id}
+            ],
+            "isDeleted": {"$ne": True}
+        }
+        
+        if folder_id:
+            query["folderId"] = folder_id
+        
+        return query
+    
+    def _column_page(self, tasks: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+        """Trim a limit+1 fetch to a page and compute its next cursor."""
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        return {
+            "tasks": tasks,
+            "nextCursor": self.encode_board_cursor(tasks[-1]) if has_more else None
+        }
+    
+    async def get_board(
+        self,
+        user_id: str,
+        limit: int = 20,
+        folder_id: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the kanban board: per-status counts and the first tasks of each column.
+        
+        Runs as a single $facet aggregation so the board renders without
+        downloading every card. Use get_board_column with a column's
+        nextCursor to load more.
+        
+        Args:
+            user_id: User's ID
+            limit: Maximum tasks per column
+            folder_id: Filter by folder ID (optional)
+            projection: Fields to return per task (optional, defaults to all)
+        
+        Returns:
+            Dictionary with columns (status, count, tasks, nextCursor) and total
+        """
+        statuses = [s.value for s in TaskStatus]
+        
+        facets: Dict[str, List[Dict[str, Any]]] = {
+            "counts": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        }
+        for task_status in statuses:
+            column = [
+                {"$match": {"status": task_status}},
+                {"$sort": {"position": 1, "_id": 1}},
+                {"$limit": limit + 1}
+            ]
+            if projection:
+                column.append({"$project": projection})
+            facets[task_status] = column
+        
+        pipeline = [
+            {"$match": self._board_query(user_id, folder_id)},
+            {"$facet": facets}
+        ]
+        
+        result = await self.tasks_collection.aggregate(pipeline).to_list(length=1)
+        board = result[0] if result else {}
+        counts = {c["_id"]: c["count"] for c in board.get("counts", [])}
+        
+        columns = []
+        for task_status in statuses:
+            columns.append({
+                "status": task_status,
+                "count": counts.get(task_status, 0),
+                **self._column_page(board.get(task_status, []), limit)
+            })
+        
+        return {"columns": columns, "total": sum(counts.values())}
+    
+    async def get_board_column(
+        self,
+        user_id: str,
+        status: str,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        folder_id: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the next page of tasks in one board column.
+        
+        Args:
+            user_id: User's ID
+            status: Column status (todo, doing, done)
+            cursor: nextCursor from the board or the previous page (optional)
+            limit: Maximum tasks to return
+            folder_id: Filter by folder ID (optional)
+            projection: Fields to return per task (optional, defaults to all)
+        
+        Returns:
+            Dictionary with status, tasks and nextCursor
+        
+        Raises:
+            ValidationException: If the cursor is malformed
+        """
+        query = self._board_query(user_id, folder_id)
+        query["status"] = status
+        
+        if cursor:
+            position, task_id = self.decode_board_cursor(cursor)
+            query = {"$and": [query, self._after_cursor(position, task_id)]}
+        
+        tasks = await self.tasks_collection.find(query, projection).sort(
+            [("position", 1), ("_id", 1)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        
+        return {"status": status, **self._column_page(tasks, limit)}
+    
+    # Team task views
+    
+    async def _check_team_access(self, team_id: str, user_id: str) -> None:
+        """Ensure the user owns or belongs to a team."""
+        try:
+            team = await self.teams_collection.find_one(
+                {
+                    "_id": ObjectId(team_id),
+                    "$or": [{"ownerId": user_id}, {"members.userId": user_id}]
+                },
+                {"_id": 1}
+            )
+        except Exception:
+            raise NotFoundException("Team not found")
+        
+        if not team:
+            raise NotFoundException("Team not found or you don't have access")
+    
+    def encode_team_cursor(self, task: Dict[str, Any]) -> str:
+        """Encode a task's (status, position, _id) sort key as an opaque team task cursor."""
+        return f"{task.get('status', 'todo')}.{self.encode_board_cursor(task)}"
+    
+    def decode_team_cursor(self, cursor: str) -> tuple:
+        """
+        Decode a team task cursor back to its (status, position, _id) sort key.
+        
+        Raises:
+            ValidationException: If the cursor is malformed
+        """
+        task_status, sep, board_cursor = cursor.partition(".")
+        if not sep or task_status not in {s.value for s in TaskStatus}:
+            raise ValidationException("Invalid cursor")
+        return (task_status, *self.decode_board_cursor(board_cursor))
+    
+    async def get_team_tasks(
+        self,
+        team_id: str,
+        user_id: str,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        assignee_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        projection: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get a page of a team's tasks, ordered by status, then board position.
+        
+        Pages are keyset-based on (status, position, _id), which the
+        (teamId, status, position) index serves without skipping.
+        
+        Args:
+            team_id: Team's ObjectId as string
+            user_id: User's ID (must own or belong to the team)
+            status: Filter by status (optional)
+            priority: Filter by priority (optional)
+            assignee_id: Only tasks assigned to this user (optional)
+            cursor: nextCursor from the previous page (optional)
+            limit: Maximum tasks to return
+            projection: Fields to return per task (optional, defaults to all)
+        
+        Returns:
+            Dictionary with tasks and nextCursor
+        
+        Raises:
+            NotFoundException: If the team doesn't exist or the user isn't a member
+            ValidationException: If the cursor is malformed
+        """
+        await self._check_team_access(team_id, user_id)
+        
+        query: Dict[str, Any] = {"teamId": team_id, "isDeleted": {"$ne": True}}
+        if status:
+            query["status"] = status
+        if priority:
+            query["priority"] = priority
+        if assignee_id:
+            query["collaborators"] = {"$elemMatch": {"userId": assignee_id, "role": "assignee"}}
+        
+        if cursor:
+            after_status, position, task_id = self.decode_team_cursor(cursor)
+            query = {"$and": [query, {"$or": [
+                {"status": {"$gt": after_status}},
+                {"status": after_status, **self._after_cursor(position, task_id)}
+            ]}]}
+        
+        tasks = await self.tasks_collection.find(query, projection).sort(
+            [("status", 1), ("position", 1), ("_id", 1)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        
+        return {
+            "tasks": tasks,
+            "nextCursor": self.encode_team_cursor(tasks[-1]) if has_more else None
+        }
+    
+    async def get_team_workload(self, team_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Get open task counts per assignee for a team.
+        
+        Counts come from a single aggregation over the team's open tasks;
+        assignee names are then fetched in one query.
+        
+        Args:
+            team_id: Team's ObjectId as string
+            user_id: User's ID (must own or belong to the team)
+        
+        Returns:
+            Dictionary with per-assignee counts, unassigned and total open tasks
+        
+        Raises:
+            NotFoundException: If the team doesn't exist or the user isn't a member
+        """
+        await self._check_team_access(team_id, user_id)
+        
+        now = datetime.utcnow()
+        
+        def count_if(condition: Dict[str, Any]) -> Dict[str, Any]:
+            return {"$sum": {"$cond": [condition, 1, 0]}}
+        
+        pipeline = [
+            {"$match": {"teamId": team_id, "isDeleted": {"$ne": True}, "status": {"$ne": "done"}}},
+            {"$facet": {
+                "assignees": [
+                    {"$unwind": "$collaborators"},
+                    {"$match": {"collaborators.role": "assignee"}},
+                    {"$group": {
+                        "_id": "$collaborators.userId",
+                        "open": {"$sum": 1},
+                        "todo": count_if({"$eq": ["$status", "todo"]}),
+                        "doing": count_if({"$eq": ["$status", "doing"]}),
+                        "highPriority": count_if({"$eq": ["$priority", "high"]}),
+                        "overdue": count_if({"$and": [
+                            {"$gt": ["$dueDate", None]},
+                            {"$lt": ["$dueDate", now]}
+                        ]})
+                    }},
+                    {"$sort": {"open": -1, "_id": 1}}
+                ],
+                "unassigned": [
+                    {"$match": {"collaborators.role": {"$ne": "assignee"}}},
+                    {"$count": "count"}
+                ],
+                "total": [{"$count": "count"}]
+            }}
+        ]
+        
+        result = await self.tasks_collection.aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {}
+        
+        rows = facets.get("assignees", [])
+        user_ids = [ObjectId(row["_id"]) for row in rows if ObjectId.is_valid(row["_id"])]
+        users = await self.users_collection.find(
+            {"_id": {"$in": user_ids}},
+            {"name": 1, "email": 1}
+        ).to_list(length=None)
+        users_by_id = {str(user["_id"]): user for user in users}
+        
+        assignees = []
+        for row in rows:
+            user = users_by_id.get(row["_id"], {})
+            assignees.append({
+                "userId": row["_id"],
+                "name": user.get("name"),
+                "email": user.get("email"),
+                **{key: row[key] for key in ("open", "todo", "doing", "highPriority", "overdue")}
+            })
+        
+        def facet_count(name: str) -> int:
+            return facets[name][0]["count"] if facets.get(name) else 0
+        
+        return {
+            "teamId": team_id,
+            "assignees": assignees,
+            "unassigned": facet_count("unassigned"),
+            "totalOpen": facet_count("total")
+        }
+    
+    # Subtask operations: update one array element in place and return only it
+    
+    @staticmethod
+    def _subtask_filter(task_id: str, user_id: str, subtask_id: Optional[str] = None) -> Dict[str, Any]:
+        """Build the query for a live task the user may edit (owner, editor or assignee)."""
+        query = {
+            "_id": ObjectId(task_id),
+            "$or": [
+                {"userId": user_id},
+                {"collaborators": {"$elemMatch": {
+                    "userId": user_id,
+                    "role": {"$in": ["editor", "assignee"]}
+                }}}
+            ],
+            "isDeleted": {"$ne": True}
+        }
+        
+        if subtask_id is not None:
+            query["subtasks.id"] = subtask_id
+        
+        return query
+    
+    @staticmethod
+    def _subtask_projection(subtask_id: str) -> Dict[str, Any]:
+        """Project only the addressed subtask plus the fields needed to bump versions."""
+        return {
+            "userId": 1,
+            "collaborators.userId": 1,
+            "subtasks": {"$elemMatch": {"id": subtask_id}}
+        }
+    
+    async def _update_subtask(
+        self,
+        task_id: str,
+        user_id: str,
+        subtask_id: str,
+        update: Any,
+        array_filters: Optional[List[Dict[str, Any]]] = None,
+        query: Optional[Dict[str, Any]] = None,
+        return_document: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Run a single-subtask find_one_and_update and return the projected subtask."""
+        if isinstance(update, list):
+            update = update + [{"$set": {"version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}}}]
+        else:
+            update = {**update, "$inc": {"version": 1}}
+        
+        try:
+            result = await self.tasks_collection.find_one_and_update(
+                query or self._subtask_filter(task_id, user_id, subtask_id),
+                update,
+                projection=self._subtask_projection(subtask_id),
+                array_filters=array_filters,
+                return_document=return_document
+            )
+        except Exception:
+            raise NotFoundException("Task not found")
+        
+        if not result:
+            return None
+        
+        await self._bump_version(result)
+        
+        subtasks = result.get("subtasks") or [None]
+        return subtasks[0]
+    
+    async def add_subtask(
+        self,
+        task_id: str,
+        user_id: str,
+        title: str,
+        completed: bool = False,
+        position: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Add a subtask to a task.
+        
+        Args:
+            task_id: Task's ObjectId as string
+            user_id: User's ID (for authorization)
+            title: Subtask title
+            completed: Initial completion state
+            position: Index to insert at (optional, defaults to the end)
+        
+        Returns:
+            Created subtask
+        
+        Raises:
+            NotFoundException: If task not found or user can't edit it
+        """
+        subtask = {"id": str(ObjectId()), "title": title, "completed": completed}
+        
+        push: Dict[str, Any] = {"$each": [subtask]}
+        if position is not None:
+            push["$position"] = position
+        
+        try:
+            query = self._subtask_filter(task_id, user_id)
+        except Exception:
+            raise NotFoundException("Task not found")
+        
+        result = await self._update_subtask(
+            task_id, user_id, subtask["id"],
+            {"$push": {"subtasks": push}, "$set": {"updatedAt": datetime.utcnow()}},
+            query=query
+        )
+        
+        if not result:
+            raise NotFoundException("Task not found or you don't have permission")
+        
+        return result
+    
+    async def update_subtask(
+        self,
+        task_id: str,
+        user_id: str,
+        subtask_id: str,
+        subtask_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Rename a subtask and/or set its completion state.
+        
+        Args:
+            task_id: Task's ObjectId as string
+            user_id: User's ID (for authorization)
+            subtask_id: Subtask ID
+            subtask_data: Fields to change (title, completed)
+        
+        Returns:
+            Updated subtask
+        
+        Raises:
+            NotFoundException: If task or subtask not found
+            ValidationException: If no fields are given
+        """
+        update_doc = {
+            f"subtasks.$[s].{field}": subtask_data[field]
+            for field in ("title", "completed")
+            if subtask_data.get(field) is not None
+        }
+        
+        if not update_doc:
+            raise ValidationException("Nothing to update")
+        
+        update_doc["updatedAt"] = datetime.utcnow()
+        
+        result = await self._update_subtask(
+            task_id, user_id, subtask_id,
+            {"$set": update_doc},
+            array_filters=[{"s.id": subtask_id}]
+        )
+        
+        if not result:
+            raise NotFoundException("Subtask not found")
+        
+        return result
+    
+    async def toggle_subtask(self, task_id: str, user_id: str, subtask_id: str) -> Dict[str, Any]:
+        """
+        Flip a subtask's completion state.
+        
+        Each attempt matches the subtask in one specific state, so concurrent
+        toggles never lose an update.
+        
+        Args:
+            task_id: Task's ObjectId as string
+            user_id: User's ID (for authorization)
+            subtask_id: Subtask ID
+        
+        Returns:
+            Updated subtask
+        
+        Raises:
+            NotFoundException: If task or subtask not found
+        """
+        for current, new in ((False, True), (True, False)):
+            try:
+                query = self._subtask_filter(task_id, user_id)
+            except Exception:
+                raise NotFoundException("Task not found")
             
-            if new_status:
-                update_doc["status"] = new_status
+            query["subtasks"] = {"$elemMatch": {
+                "id": subtask_id,
+                "completed": current if current else {"$ne": True}
+            }}
             
-            # Update the task
-            result = await self.tasks_collection.update_one(
-                {"_id": ObjectId(task_id), "userId": user_id},
-                {"$set": update_doc}
+            result = await self._update_subtask(
+                task_id, user_id, subtask_id,
+                {"$set": {"subtasks.$.completed": new, "updatedAt": datetime.utcnow()}},
+                query=query
             )
             
-            if result.matched_count == 0:
-                raise NotFoundException(f"Task {task_id} not found or you don't have permission")
+            if result:
+                return result
         
-        return {"message": f"Successfully updated {len(updates)} task(s)"}
-
+        raise NotFoundException("Subtask not found")
+    
+    async def remove_subtask(self, task_id: str, user_id: str, subtask_id: str) -> Dict[str, Any]:
+        """
+        Remove a subtask from a task.
+        
+        Args:
+            task_id: Task's ObjectId as string
+            user_id: User's ID (for authorization)
+            subtask_id: Subtask ID
+        
+        Returns:
+            Removed subtask
+        
+        Raises:
+            NotFoundException: If task or subtask not found
+        """
+        result = await self._update_subtask(
+            task_id, user_id, subtask_id,
+            {"$pull": {"subtasks": {"id": subtask_id}}, "$set": {"updatedAt": datetime.utcnow()}},
+            return_document=False
+        )
+        
+        if not result:
+            raise NotFoundException("Subtask not found")
+        
+        return result
+    
+    async def move_subtask(
+        self,
+        task_id: str,
+        user_id: str,
+        subtask_id: str,
+        position: int
+    ) -> Dict[str, Any]:
+        """
+        Move a subtask to a new index within its task.
+        
+        Runs as a single pipeline update, so the array is reordered on the
+        server without sending it over the wire or racing other writers.
+        
+        Args:
+            task_id: Task's ObjectId as string
+            user_id: User's ID (for authorization)
+            subtask_id: Subtask ID
+            position: Target index (clamped to the end of the list)
+        
+        Returns:
+            Moved subtask
+        
+        Raises:
+            NotFoundException: If task or subtask not found
+        """
+        reorder = [{"$set": {
+            "subtasks": {"$let": {
+                "vars": {
+                    "moved": {"$filter": {"input": "$subtasks", "cond": {"$eq": ["$$this.id", subtask_id]}}},
+                    "rest": {"$filter": {"input": "$subtasks", "cond": {"$ne": ["$$this.id", subtask_id]}}}
+                },
+                "in": {"$concatArrays": [
+                    {"$slice": ["$$rest", position]},
+                    "$$moved",
+                    {"$slice": ["$$rest", position, {"$max": [{"$size": "$$rest"}, 1]}]}
+                ]}
+            }},
+            "updatedAt": datetime.utcnow()
+        }}]
+        
+        result = await self._update_subtask(task_id, user_id, subtask_id, reorder)
+        
+        if not result:
+            raise NotFoundException("Subtask not found")
+        
+        return result
+    
+    # Recurring task occurrences
+    
+    async def _get_recurring_master(self, task_id: str, user_id: str) -> Dict[str, Any]:
+        """Get a recurring task owned by the user."""
+        try:
+            master = await self.tasks_collection.find_one({
+                "_id": ObjectId(task_id),
+                "userId": user_id,
+                "isDeleted": {"$ne": True}
+            })
+        except Exception:
+            raise NotFoundException("Task not found")
+        
+        if not master:
+            raise NotFoundException("Task not found")
+        
+        if not master.get("recurrence"):
+            raise ValidationException("Task is not recurring")
+        
+        return master
+    
+    async def update_occurrence(
+        self,
+        task_id: str,
+        user_id: str,
+        occurrence: datetime,
+        task_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Edit or complete one occurrence of a recurring task.
+        
+        The occurrence is materialized as its own task (linked by
+        recurrenceId and occurrenceDate) the first time it changes;
+        untouched occurrences are never stored.
+        
+        Args:
+            task_id: Recurring task's ObjectId as string
+            user_id: User's ID (for authorization)
+            occurrence: Original due date of the occurrence
+            task_data: Fields to change (as for update_task)
+        
+        Returns:
+            Materialized occurrence document
+        
+        Raises:
+            NotFoundException: If the task or occurrence doesn't exist
+            ValidationException: If the task is not recurring
+        """
+        master = await self._get_recurring_master(task_id, user_id)
+        occurrence = to_naive_utc(occurrence)
+        
+        if occurrence not in expand(
+            master["recurrence"], master["dueDate"], occurrence, occurrence + timedelta(seconds=1),
+            master.get("recurrenceExceptions", [])
+        ):
+            raise NotFoundException("Occurrence not found")
+        
+        updatable_fields = [
+            "title", "description", "status", "priority", "dueDate",
+            "folderId", "teamId", "tags", "color", "labels", "position",
+            "subtasks", "attachments"
+        ]
+        changes = {
+            field: task_data[field] for field in updatable_fields
+            if task_data.get(field) is not None
+        }
+        if "subtasks" in changes:
+            changes["subtasks"] = self._with_subtask_ids(changes["subtasks"])
+        
+        now = datetime.utcnow()
+        inherited = {
+            field: master.get(field)
+            for field in ("title", "description", "status", "priority", "folderId",
+                          "teamId", "tags", "color", "labels", "collaborators")
+        }
+        on_insert = {
+            **inherited,
+            "userId": master["userId"],
+            "dueDate": occurrence,
+            "subtasks": self._with_subtask_ids(master.get("subtasks", [])),
+            "attachments": [],
+            "position": None,
+            "recurrence": None,
+            "recurrenceId": task_id,
+            "occurrenceDate": occurrence,
+            "isDeleted": False,
+            "deletedAt": None,
+            "createdAt": now
+        }
+        
+        # Previous state of an already materialized occurrence (for the tag index and analytics)
+        existing = await self.tasks_collection.find_one(
+            {"recurrenceId": task_id, "occurrenceDate": occurrence},
+            {"tags": 1, "isDeleted": 1, "attachments": 1, "status": 1, "startedAt": 1, "createdAt": 1}
+        )
+        
+        released = []
+        if "attachments" in changes:
+            changes["attachments"], released = self._merge_attachments(
+                changes["attachments"], existing.get("attachments", []) if existing else []
+            )
+        
+        update = {
+            "$setOnInsert": {k: v for k, v in on_insert.items() if k not in changes},
+            "$set": {**changes, "updatedAt": now},
+            "$inc": {"version": 1}
+        }
+        
+        # Two first edits racing: the unique index rejects one upsert, which then updates
+        for attempt in range(2):
+            try:
+                result = await self.tasks_collection.find_one_and_update(
+                    {"recurrenceId": task_id, "occurrenceDate": occurrence},
+                    update,
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                if attempt:
+                    raise
+        
+        await self.attachment_service.release(released)
+        await self._bump_version(result)
+        
+        # The occurrence as it was before this edit: first materialization starts from the master's status
+        before = {
+            **result,
+            "startedAt": None,
+            **(existing or {"status": inherited["status"] or "todo", "createdAt": now, "isDeleted": False})
+        }
+        if not existing:
+            await self.analytics_service.record_created(before)
+        if "status" in changes:
+            result.update(await self._record_status_change(before, changes["status"], now))
+        
+        await self.smart_list_service.sync_task(result)
+        if not existing or any(field in changes for field in FolderService.SUMMARY_FIELDS):
+            await self.folder_service.invalidate_summary([master["userId"]])
+        if not result.get("isDeleted"):
+            await self.tag_index_service.update(
+                master["userId"], "tasks", existing.get("tags") if existing else None, result.get("tags")
+            )
+        DueDateScheduler.schedule(result)
+        
+        return result
+    
+    async def delete_occurrence(
+        self,
+        task_id: str,
+        user_id: str,
+        occurrence: datetime
+    ) -> Dict[str, str]:
+        """
+        Skip one occurrence of a recurring task.
+        
+        Args:
+            task_id: Recurring task's ObjectId as string
+            user_id: User's ID (for authorization)
+            occurrence: Original due date of the occurrence
+        
+        Returns:
+            Success message
+        
+        Raises:
+            NotFoundException: If the task doesn't exist
+            ValidationException: If the task is not recurring
+        """
+        await self._get_recurring_master(task_id, user_id)
+        occurrence = to_naive_utc(occurrence)
+        now = datetime.utcnow()
+        
+        master = await self.tasks_collection.find_one_and_update(
+            {"_id": ObjectId(task_id), "userId": user_id},
+            {
+                "$addToSet": {"recurrenceExceptions": occurrence},
+                "$set": {"updatedAt": now},
+                "$inc": {"version": 1}
+            },
+            projection={"userId": 1, "collaborators.userId": 1}
+        )
+        
+        if not master:
+            raise NotFoundException("Task not found")
+        
+        # A materialized copy goes to trash with it
+        materialized = await self.tasks_collection.find_one_and_update(
+            {"recurrenceId": task_id, "occurrenceDate": occurrence, "isDeleted": {"$ne": True}},
+            {"$set": {"isDeleted": True, "deletedAt": now, "updatedAt": now}, "$inc": {"version": 1}},
+            projection={"userId": 1, "collaborators.userId": 1, "tags": 1}
+        )
+        
+        if materialized:
+            DueDateScheduler.unschedule(str(materialized["_id"]))
+            await self._bump_version(master, materialized)
+            await self.smart_list_service.remove_task(str(materialized["_id"]), self._audience(materialized))
+            await self.tag_index_service.update(materialized["userId"], "tasks", materialized.get("tags"), None)
+            await self.folder_service.invalidate_summary([materialized["userId"]])
+        else:
+            await self._bump_version(master)
+        
+        return {"message": "Occurrence skipped"}
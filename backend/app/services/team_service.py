@@ -3,6 +3,7 @@ from bson import ObjectId
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from app.services.version_service import VersionService
 from app.utils.exceptions import NotFoundException, ValidationException
 
 
@@ -14,6 +15,12 @@ class TeamService:
         self.teams_collection = db.teams
         self.users_collection = db.users
         self.activities_collection = db.activities
+        self.version_service = VersionService(db)
+    
+    async def _bump_version(self, team: Dict[str, Any], *extra_user_ids: str) -> None:
+        """Bump the teams collection version for the team's owner and members."""
+        user_ids = [team.get("ownerId")] + [m["userId"] for m in team.get("members", [])]
+        await self.version_service.bump(user_ids + list(extra_user_ids), "teams")
     
     async def get_teams(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all teams where user is owner or member."""
@@ -40,6 +47,8 @@ class TeamService:
         result = await self.teams_collection.insert_one(team_doc)
         team_doc["_id"] = result.inserted_id
         
+        await self._bump_version(team_doc)
+        
         return team_doc
     
     async def update_team(
@@ -68,21 +77,25 @@ class TeamService:
         if not result:
             raise NotFoundException("Team not found or you don't have permission")
         
+        await self._bump_version(result)
+        
         return result
     
     async def delete_team(self, team_id: str, user_id: str) -> Dict[str, str]:
         """Delete a team (only owner can delete)."""
         try:
-            result = await self.teams_collection.delete_one({
-                "_id": ObjectId(team_id),
-                "ownerId": user_id
-            })
+            result = await self.teams_collection.find_one_and_delete(
+                {"_id": ObjectId(team_id), "ownerId": user_id},
+                projection={"ownerId": 1, "members.userId": 1}
+            )
         except Exception:
             raise NotFoundException("Team not found")
         
-        if result.deleted_count == 0:
+        if not result:
             raise NotFoundException("Team not found or you don't have permission")
         
+        await self._bump_version(result)
+        
         return {"message": "Team deleted successfully"}
     
     async def get_team_members(self, team_id: str, user_id: str) -> List[Dict[str, Any]]:
@@ -227,6 +240,7 @@ class TeamService:
         
         # Return updated team
         updated_team = await self.teams_collection.find_one({"_id": ObjectId(team_id)})
+        await self._bump_version(updated_team)
         return updated_team
     
     async def update_member_role(
@@ -301,6 +315,7 @@ class TeamService:
         
         # Return updated team
         updated_team = await self.teams_collection.find_one({"_id": ObjectId(team_id)})
+        await self._bump_version(updated_team)
         return updated_team
     
     async def remove_member(
@@ -365,6 +380,9 @@ class TeamService:
             }
         )
         
+        # The removed member is still in the pre-update audience
+        await self._bump_version(team)
+        
         # Log activity
         await self._log_activity(
             team_id=team_id,
@@ -0,0 +1,191 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta
+import asyncio
+import time
+
+from app.config import settings
+from app.services.attachment_service import AttachmentService
+from app.services.collab_service import CollabService
+from app.services.note_history_service import NoteHistoryService
+from app.services.note_similarity_service import NoteSimilarityService
+from app.services.sync_service import SyncService
+from app.services.version_service import VersionService
+from app.utils.file_handler import FileHandler
+
+
+class TrashPurgeService:
+    """Service for purging soft-deleted tasks and notes past the trash retention period."""
+
+    # Cumulative metrics for this process (reported by /health/detailed)
+    metrics: Dict[str, Any] = {
+        "runs": 0,
+        "purged": {"tasks": 0, "notes": 0},
+        "filesRemoved": 0,
+        "batches": 0,
+        "lastRun": None
+    }
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collections = {"tasks": db.tasks, "notes": db.notes}
+        self.version_service = VersionService(db)
+        self.sync_service = SyncService(db)
+        self.attachment_service = AttachmentService(db)
+        self.history_service = NoteHistoryService(db)
+        self.collab_service = CollabService(db)
+        self.similarity_service = NoteSimilarityService(db)
+
+    @staticmethod
+    def _audience(doc: Dict[str, Any]) -> List[str]:
+        """Get IDs of users who could see a document (owner and collaborators)."""
+        return [doc.get("userId")] + [c["userId"] for c in doc.get("collaborators", [])]
+
+    async def _cascade(self, collection: str, docs: List[Dict[str, Any]], dry_run: bool) -> int:
+        """
+        Clean up data owned by purged documents.
+
+        Args:
+            collection: Collection the documents belong to
+            docs: Purged documents (or, in a dry run, documents that would be purged)
+            dry_run: Count what would be removed without removing it
+
+        Returns:
+            Number of files removed (or that would be removed)
+        """
+        files_removed = 0
+
+        if collection == "tasks":
+            for doc in docs:
+                for attachment in doc.get("attachments", []):
+                    if attachment.get("sha256"):
+                        # Stored uploads are shared by hash; release the reference
+                        if dry_run:
+                            files_removed += 1
+                        else:
+                            files_removed += await self.attachment_service.release([attachment["sha256"]])
+                        continue
+                    path = FileHandler.local_path_from_url(attachment.get("url"))
+                    if path is None:
+                        continue
+                    if dry_run or FileHandler.delete_file(path):
+                        files_removed += 1
+
+        if collection == "notes" and not dry_run:
+            note_ids = [str(doc["_id"]) for doc in docs]
+            await self.history_service.delete_history(note_ids)
+            await self.collab_service.delete_state(note_ids)
+            await self.similarity_service.remove(note_ids)
+
+        return files_removed
+
+    async def _purge_collection(
+        self,
+        collection: str,
+        cutoff: datetime,
+        batch_size: int,
+        dry_run: bool,
+        max_batches: Optional[int]
+    ) -> Dict[str, int]:
+        """Purge one collection in bounded batches."""
+        coll = self.collections[collection]
+        query = {"isDeleted": True, "deletedAt": {"$lt": cutoff}}
+        projection = {"userId": 1, "collaborators.userId": 1, "attachments": 1}
+
+        purged = 0
+        files_removed = 0
+        batches = 0
+        last_id = None
+
+        while max_batches is None or batches < max_batches:
+            # Page by _id so dry runs (which delete nothing) still advance
+            batch_query = {**query, "_id": {"$gt": last_id}} if last_id else query
+            docs = await coll.find(batch_query, projection).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+
+            if not docs:
+                break
+
+            batches += 1
+            last_id = docs[-1]["_id"]
+            last_batch = len(docs) < batch_size
+
+            if dry_run:
+                purged += len(docs)
+                files_removed += await self._cascade(collection, docs, dry_run)
+            else:
+                # Re-check the trash predicate so a concurrent restore wins. Only the
+                # documents this call deleted are cascaded: one removed meanwhile by
+                # another purger or a permanent delete was cleaned up by that caller.
+                deleted = await asyncio.gather(*(
+                    coll.find_one_and_delete({"_id": doc["_id"], **query}, projection=projection)
+                    for doc in docs
+                ))
+                docs = [doc for doc in deleted if doc]
+                purged += len(docs)
+                files_removed += await self._cascade(collection, docs, dry_run)
+
+                user_ids = []
+                for doc in docs:
+                    audience = self._audience(doc)
+                    user_ids.extend(audience)
+                    await self.sync_service.record_tombstones(audience, collection, str(doc["_id"]))
+                await self.version_service.bump(user_ids, collection)
+
+            if last_batch:
+                break
+
+        return {"purged": purged, "filesRemoved": files_removed, "batches": batches}
+
+    async def purge_expired(
+        self,
+        dry_run: Optional[bool] = None,
+        retention_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_batches: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Permanently delete trashed tasks and notes older than the retention period.
+
+        Args:
+            dry_run: Report what would be purged without deleting (defaults to settings)
+            retention_days: Days a document stays in trash (defaults to settings)
+            batch_size: Trashed documents read and deleted per batch (defaults to settings)
+            max_batches: Stop after this many batches per collection (optional)
+
+        Returns:
+            Run report with per-collection counts, files removed and duration
+        """
+        dry_run = settings.trash_purge_dry_run if dry_run is None else dry_run
+        retention_days = settings.trash_retention_days if retention_days is None else retention_days
+        batch_size = batch_size or settings.trash_purge_batch_size
+
+        started = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+        report = {
+            "dryRun": dry_run,
+            "cutoff": cutoff,
+            "purged": {},
+            "filesRemoved": 0,
+            "batches": 0
+        }
+
+        for collection in self.collections:
+            result = await self._purge_collection(collection, cutoff, batch_size, dry_run, max_batches)
+            report["purged"][collection] = result["purged"]
+            report["filesRemoved"] += result["filesRemoved"]
+            report["batches"] += result["batches"]
+
+        report["durationMs"] = round((time.monotonic() - started) * 1000, 1)
+        report["finishedAt"] = datetime.utcnow()
+
+        metrics = TrashPurgeService.metrics
+        metrics["runs"] += 1
+        metrics["lastRun"] = report
+        if not dry_run:
+            for collection, count in report["purged"].items():
+                metrics["purged"][collection] += count
+            metrics["filesRemoved"] += report["filesRemoved"]
+            metrics["batches"] += report["batches"]
+
+        return report
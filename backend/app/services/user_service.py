@@ -4,6 +4,7 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 
 from app.core.security import hash_password, verify_password
+from app.services.tag_index_service import TagIndexService
 from app.utils.exceptions import NotFoundException, ValidationException, UnauthorizedException
 
 
@@ -172,6 +173,9 @@ class UserService:
         # Delete user's folders
         await self.folders_collection.delete_many({"userId": user_id})
         
+        # Delete user's tag counts
+        await TagIndexService(self.db).delete_user(user_id)
+        
         # Delete user
         await self.users_collection.delete_one({"_id": obj_id})
         
@@ -0,0 +1,51 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Iterable, Optional
+from datetime import datetime
+
+
+class VersionService:
+    """Service for per-user, per-collection change counters."""
+
+    # Collections whose list endpoints are versioned
+    COLLECTIONS = ("tasks", "notes", "habits", "folders", "teams")
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.versions_collection = db.collection_versions
+
+    async def get_version(self, user_id: str, collection: str) -> int:
+        """
+        Get the current version of a collection as seen by a user.
+
+        Args:
+            user_id: User's ID
+            collection: Collection name (tasks, notes, habits, folders, teams)
+
+        Returns:
+            Version counter (0 if the user has never written to the collection)
+        """
+        doc = await self.versions_collection.find_one(
+            {"userId": user_id, "collection": collection},
+            {"version": 1}
+        )
+        return doc["version"] if doc else 0
+
+    async def bump(self, user_ids: Iterable[Optional[str]], collection: str) -> None:
+        """
+        Increment the version counter of a collection for every given user.
+
+        Called by services after each write so that list responses cached
+        under the previous ETag are invalidated for everyone who can see
+        the changed document (owner, collaborators, team members).
+
+        Args:
+            user_ids: IDs of users whose view of the collection changed
+            collection: Collection name
+        """
+        now = datetime.utcnow()
+        for user_id in {uid for uid in user_ids if uid}:
+            await self.versions_collection.update_one(
+                {"userId": user_id, "collection": collection},
+                {"$inc": {"version": 1}, "$set": {"updatedAt": now}},
+                upsert=True
+            )
@@ -0,0 +1,63 @@
+"""
+Compression at rest for large note bodies.
+
+Content at or above note_compression_threshold_bytes (UTF-8) is stored as
+zlib-compressed BSON binary with a user-defined subtype, so a stored value
+says by itself whether it is compressed. Smaller content stays a plain
+string. Only code that returns or processes content decodes it; list
+projections that leave content out never pay for decompression.
+"""
+import zlib
+from typing import Any, Dict, Optional, Union
+
+from bson import Binary
+
+from app.config import settings
+
+
+ZLIB_SUBTYPE = 0x80  # First user-defined BSON binary subtype
+
+
+def compress_content(text: Optional[str]) -> Union[str, Binary, None]:
+    """
+    Encode note content for storage, compressing it if it is large enough to be worth it.
+
+    Args:
+        text: Note content
+
+    Returns:
+        The text itself, or zlib-compressed Binary
+    """
+    if not text or len(text) * 4 < settings.note_compression_threshold_bytes:
+        return text  # Can't reach the threshold even at 4 UTF-8 bytes per character
+
+    raw = text.encode("utf-8")
+    if len(raw) < settings.note_compression_threshold_bytes:
+        return text
+
+    compressed = zlib.compress(raw, settings.note_compression_level)
+    if len(compressed) >= len(raw):
+        return text  # Incompressible (e.g. already-encoded data)
+    return Binary(compressed, ZLIB_SUBTYPE)
+
+
+def decompress_content(value: Any) -> Any:
+    """
+    Decode stored note content back to text (plain strings pass through).
+
+    Args:
+        value: Stored content value
+
+    Returns:
+        Note content as text
+    """
+    if isinstance(value, bytes):  # bson.Binary is a bytes subclass
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+def decode_note(note: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Decode a note document's content in place (if it was fetched) and return the note."""
+    if note and "content" in note:
+        note["content"] = decompress_content(note["content"])
+    return note
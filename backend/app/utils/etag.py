@@ -0,0 +1,136 @@
+"""Utility functions for ETag generation and conditional requests."""
+import hashlib
+from typing import Any, Dict, List, Optional
+from fastapi import Response, status
+
+from app.utils.exceptions import PreconditionFailedException
+
+
+def build_etag(collection: str, version: int, *parts: Any) -> str:
+    """
+    Build a weak ETag for a versioned list response.
+
+    Args:
+        collection: Collection name the response is built from
+        version: Current collection version for the user
+        *parts: Extra values that change the response (query filters, dates)
+
+    Returns:
+        Weak ETag string, e.g. W/"tasks-12-3f2a9c1d"
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:8]
+    return f'W/"{collection}-{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+
+    Args:
+        if_none_match: Raw If-None-Match header value
+        etag: Current ETag
+
+    Returns:
+        True if the client's cached representation is still current
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+
+    return False
+
+
+def set_etag_headers(response: Response, etag: str) -> None:
+    """
+    Attach caching headers for a revalidatable, user-private response.
+
+    Args:
+        response: Response to modify
+        etag: ETag of the response body
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def not_modified_response(etag: str) -> Response:
+    """
+    Build an empty 304 Not Modified response.
+
+    Args:
+        etag: Current ETag (echoed back to the client)
+
+    Returns:
+        304 response with caching headers
+    """
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_etag_headers(response, etag)
+    return response
+
+
+def version_etag(document: Dict[str, Any]) -> str:
+    """
+    Build a strong ETag for a single document from its version field.
+
+    Args:
+        document: Task, note or habit document
+
+    Returns:
+        Strong ETag string, e.g. "v7" (documents created before versioning are "v0")
+    """
+    return f'"v{document.get("version", 0)}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[List[int]]:
+    """
+    Parse an If-Match header into the document versions it accepts.
+
+    Args:
+        if_match: Raw If-Match header value
+
+    Returns:
+        Accepted versions, or None if the write is unconditional (no header or "*")
+
+    Raises:
+        PreconditionFailedException: If no tag can match (weak or foreign ETags)
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+
+    versions = []
+    for candidate in if_match.split(","):
+        candidate = candidate.strip()
+        # If-Match uses strong comparison, so weak tags never match
+        if candidate.startswith('"v') and candidate.endswith('"') and candidate[2:-1].isdigit():
+            versions.append(int(candidate[2:-1]))
+
+    if not versions:
+        raise PreconditionFailedException("If-Match does not match the current version")
+
+    return versions
+
+
+def version_condition(versions: Optional[List[int]]) -> Dict[str, Any]:
+    """
+    Build the query condition for an If-Match precondition.
+
+    Args:
+        versions: Versions from parse_if_match (None for unconditional writes)
+
+    Returns:
+        Filter fragment to merge into the write's query
+    """
+    if versions is None:
+        return {}
+
+    # Version 0 is a document written before versioning (no field)
+    return {"version": {"$in": versions + [None] if 0 in versions else versions}}
@@ -50,3 +50,17 @@ class BadRequestException(AppException):
     
     def __init__(self, message: str = "Bad request"):
         super().__init__(message, status_code=400)
+
+
+class PayloadTooLargeException(AppException):
+    """Exception raised when an upload exceeds the size limit."""
+    
+    def __init__(self, message: str = "Payload too large"):
+        super().__init__(message, status_code=413)
+
+
+class PreconditionFailedException(AppException):
+    """Exception raised when an If-Match precondition doesn't hold."""
+    
+    def __init__(self, message: str = "Resource has been modified"):
+        super().__init__(message, status_code=412)
@@ -0,0 +1,89 @@
+"""
+Plain-text excerpts of note content for list views.
+
+Notes hold Markdown or JSON-based rich text. Excerpts strip the markup,
+collapse whitespace and cut at a word boundary; they are stored with the
+note at write time so listings never read the content field.
+"""
+import json
+import re
+from typing import Any, List, Optional
+
+
+MARKDOWN_PATTERNS = [
+    (re.compile(r"```.*?```", re.DOTALL), " "),              # fenced code blocks
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),           # images -> alt text
+    (re.compile(r"\[([^\]]*)\]\([^)]*\)"), r"\1"),            # links -> link text
+    (re.compile(r"<[^>]+>"), " "),                            # inline HTML
+    (re.compile(r"^\s{0,3}(#{1,6}|>|[-*+]|\d+[.)])\s+", re.MULTILINE), ""),  # headings, quotes, list markers
+    (re.compile(r"^\s*([-*_]\s*){3,}$", re.MULTILINE), " "),  # horizontal rules
+    (re.compile(r"(\*\*|__|~~|`)"), ""),                      # emphasis and inline code markers
+    (re.compile(r"(?<!\w)[*_](?=\S)|(?<=\S)[*_](?!\w)"), ""),  # single * / _ emphasis
+]
+
+
+def _rich_text(node: Any, parts: List[str]) -> None:
+    """Collect the "text" leaves of a JSON rich text document in order."""
+    if isinstance(node, dict):
+        if isinstance(node.get("text"), str):
+            parts.append(node["text"])
+        for key, value in node.items():
+            if key != "text":
+                _rich_text(value, parts)
+        if node.get("type") in ("paragraph", "heading", "listItem", "blockquote", "codeBlock"):
+            parts.append(" ")
+    elif isinstance(node, list):
+        for child in node:
+            _rich_text(child, parts)
+
+
+def to_plain_text(content: str, limit: Optional[int] = None) -> str:
+    """
+    Strip Markdown (or extract JSON rich text) and collapse whitespace.
+
+    Args:
+        content: Note content
+        limit: Only strip this many leading characters of text (optional)
+
+    Returns:
+        Plain text on a single line
+    """
+    text = content or ""
+
+    if text.lstrip()[:1] in ("{", "["):
+        try:
+            parts: List[str] = []
+            _rich_text(json.loads(text), parts)
+            text = "".join(parts)
+        except ValueError:
+            pass  # Not JSON after all: treat as Markdown
+
+    if limit is not None:
+        text = text[:limit]
+
+    for pattern, replacement in MARKDOWN_PATTERNS:
+        text = pattern.sub(replacement, text)
+
+    return " ".join(text.split())
+
+
+def make_excerpt(content: str, length: int) -> str:
+    """
+    Build a short plain-text excerpt of note content.
+
+    Args:
+        content: Note content
+        length: Maximum excerpt length in characters (including the ellipsis)
+
+    Returns:
+        Excerpt, ending in "…" if the text was cut
+    """
+    # Markup rarely more than doubles the text, so huge notes aren't stripped in full
+    text = to_plain_text(content, limit=length * 20)
+    if len(text) <= length:
+        return text
+
+    cut = text[:length - 1]
+    if " " in cut[length // 2:]:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip(" .,;:-") + "…"
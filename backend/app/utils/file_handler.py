@@ -1,14 +1,15 @@
 import os
 import uuid
+import hashlib
 import aiofiles
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator, Tuple
 from fastapi import UploadFile
 from PIL import Image
 from io import BytesIO
 
 from app.config import settings
-from app.utils.exceptions import ValidationException
+from app.utils.exceptions import ValidationException, PayloadTooLargeException
 
 
 class FileHandler:
@@ -90,22 +91,90 @@ class FileHandler:
                 f"Invalid file type. Allowed types: {', '.join(settings.allowed_extensions_list)}"
             )
         
-        # Read file content
-        content = await upload_file.read()
+        # Stream to disk in chunks; never hold the whole upload in memory
+        async def chunks():
+            while chunk := await upload_file.read(settings.upload_chunk_size):
+                yield chunk
         
-        # Validate size
-        if not FileHandler.validate_file_size(len(content), max_size):
-            max_mb = (max_size or settings.max_upload_size) / (1024 * 1024)
-            raise ValidationException(f"File too large. Maximum size: {max_mb:.1f}MB")
+        try:
+            await FileHandler.stream_to_file(chunks(), destination_path, max_size)
+        except PayloadTooLargeException as e:
+            raise ValidationException(e.message)
+        
+        return destination_path
+    
+    @staticmethod
+    async def stream_to_file(
+        chunks: AsyncIterator[bytes],
+        destination_path: str,
+        max_size: Optional[int] = None
+    ) -> Tuple[int, str]:
+        """
+        Write chunks to disk as they arrive, hashing them on the way.
+        
+        Only one chunk is held in memory at a time. The size limit is
+        enforced mid-stream; on any failure the partial file is removed.
+        
+        Args:
+            chunks: Async iterator of byte chunks (e.g. request.stream())
+            destination_path: Path where file should be saved
+            max_size: Maximum file size in bytes
+        
+        Returns:
+            Tuple of (size in bytes, SHA-256 hex digest)
+        
+        Raises:
+            PayloadTooLargeException: If the stream exceeds max_size
+        """
+        if max_size is None:
+            max_size = settings.max_upload_size
         
-        # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(destination_path), exist_ok=True)
         
-        # Save file
-        async with aiofiles.open(destination_path, 'wb') as f:
-            await f.write(content)
+        size = 0
+        digest = hashlib.sha256()
         
-        return destination_path
+        try:
+            async with aiofiles.open(destination_path, 'wb') as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_size:
+                        raise PayloadTooLargeException(
+                            f"File too large. Maximum size: {max_size / (1024 * 1024):.1f}MB"
+                        )
+                    digest.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            FileHandler.delete_file(destination_path)
+            raise
+        
+        return size, digest.hexdigest()
+    
+    @staticmethod
+    async def iter_file(file_path: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Read a byte range of a file in chunks.
+        
+        Args:
+            file_path: Path to file
+            start: First byte offset
+            end: Last byte offset, inclusive (defaults to end of file)
+        
+        Yields:
+            Byte chunks of at most settings.upload_chunk_size
+        """
+        if end is None:
+            end = os.path.getsize(file_path) - 1
+        
+        remaining = end - start + 1
+        async with aiofiles.open(file_path, 'rb') as f:
+            await f.seek(start)
+            while remaining > 0:
+                chunk = await f.read(min(settings.upload_chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
     
     @staticmethod
     async def optimize_image(
@@ -161,3 +230,28 @@ class FileHandler:
         except Exception as e:
             print(f"Error deleting file: {e}")
             return False
+    
+    @staticmethod
+    def local_path_from_url(url: Optional[str]) -> Optional[str]:
+        """
+        Map a public upload URL (e.g. /uploads/avatars/abc.jpg) back to its path on disk.
+        
+        Args:
+            url: URL stored on a document
+        
+        Returns:
+            Local file path, or None if the URL does not point into the upload directory
+        """
+        prefix = f"/{settings.upload_dir.strip('/')}/"
+        if not url or not url.startswith(prefix):
+            return None
+        
+        relative = url[len(prefix):]
+        upload_root = os.path.realpath(settings.upload_dir)
+        path = os.path.realpath(os.path.join(upload_root, relative))
+        
+        # Never resolve outside the upload directory
+        if not path.startswith(upload_root + os.sep):
+            return None
+        
+        return path
@@ -0,0 +1,82 @@
+"""Minimal iCalendar (RFC 5545) rendering for task feeds."""
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, List
+
+
+def escape_text(value: str) -> str:
+    """Escape a TEXT property value."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line to 75 octets, continuing with CRLF + space."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+
+    parts: List[str] = []
+    current = b""
+    limit = 75
+    for char in line:
+        char_bytes = char.encode("utf-8")
+        if len(current) + len(char_bytes) > limit:
+            parts.append(current.decode("utf-8"))
+            current = b""
+            limit = 74  # Continuation lines start with a space
+        current += char_bytes
+    parts.append(current.decode("utf-8"))
+
+    return "\r\n ".join(parts)
+
+
+def format_datetime(value: datetime) -> str:
+    """Format a datetime as a UTC DATE-TIME value (naive values are treated as UTC)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def build_calendar(name: str, events: Iterable[Dict[str, Any]]) -> str:
+    """
+    Render a VCALENDAR document.
+
+    Args:
+        name: Calendar display name
+        events: Dicts with uid, start, end, stamp, summary and optional description, url
+
+    Returns:
+        iCalendar text with CRLF line endings
+    """
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//TaskFlow//Tasks//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ]
+
+    for event in events:
+        lines.extend([
+            "BEGIN:VEVENT",
+            f"UID:{event['uid']}",
+            f"DTSTAMP:{format_datetime(event['stamp'])}",
+            f"DTSTART:{format_datetime(event['start'])}",
+            f"DTEND:{format_datetime(event['end'])}",
+            f"SUMMARY:{escape_text(event['summary'])}",
+        ])
+        if event.get("description"):
+            lines.append(f"DESCRIPTION:{escape_text(event['description'])}")
+        if event.get("url"):
+            lines.append(f"URL:{event['url']}")
+        lines.append("END:VEVENT")
+
+    lines.append("END:VCALENDAR")
+
+    return "\r\n".join(fold_line(line) for line in lines) + "\r\n"
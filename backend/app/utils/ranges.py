@@ -0,0 +1,51 @@
+"""HTTP Range request helpers for file downloads."""
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header cannot be served for the resource size."""
+
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `Range: bytes=...` header.
+
+    Multi-range, non-byte and invalid (e.g. start after end) requests are
+    ignored and the full body is served, as RFC 9110 allows or requires.
+
+    Args:
+        range_header: Value of the Range header
+        size: Size of the resource in bytes
+
+    Returns:
+        (start, end) inclusive byte offsets, or None to serve the full body
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the resource
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start < 0 or (end_text and start > end):
+        return None  # Invalid range: RFC 9110 says to ignore it
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+
+    return start, min(end, size - 1)
@@ -0,0 +1,226 @@
+"""
+Recurrence rules for tasks (RFC 5545 RRULE subset).
+
+Supported parts: FREQ (DAILY, WEEKLY, MONTHLY, YEARLY), INTERVAL,
+BYDAY (WEEKLY only, e.g. MO,WE,FR), COUNT and UNTIL. Occurrences keep the
+time of day of the task's first due date; monthly and yearly rules skip
+periods that lack the start day (e.g. the 31st, Feb 29), as RFC 5545 does.
+"""
+import calendar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils.exceptions import ValidationException
+
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_COUNT = 1000
+MAX_INTERVAL = 1000
+MAX_OCCURRENCES_PER_WINDOW = 1000
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Convert a datetime to naive UTC, the form MongoDB stores and returns."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _parse_until(value: str) -> datetime:
+    for fmt in ("%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            until = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        # A date-only UNTIL includes that whole day
+        return until + timedelta(days=1, microseconds=-1) if fmt == "%Y%m%d" else until
+    raise ValidationException(f"Invalid UNTIL value: {value}")
+
+
+def parse_rrule(rule: str) -> Dict[str, Any]:
+    """
+    Parse and validate a recurrence rule.
+
+    Args:
+        rule: RRULE string, e.g. "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH"
+
+    Returns:
+        Dict with freq, interval, byday (weekday numbers or None), count and until
+
+    Raises:
+        ValidationException: If the rule is malformed or uses unsupported parts
+    """
+    rule = rule.strip()
+    if rule.upper().startswith("RRULE:"):
+        rule = rule[len("RRULE:"):]
+
+    parts: Dict[str, str] = {}
+    for item in filter(None, rule.split(";")):
+        key, sep, value = item.partition("=")
+        if not sep or not value:
+            raise ValidationException(f"Invalid recurrence rule part: {item}")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    unsupported = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"}
+    if unsupported:
+        raise ValidationException(f"Unsupported recurrence rule parts: {', '.join(sorted(unsupported))}")
+
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValidationException(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+
+    try:
+        interval = int(parts.get("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise ValidationException("INTERVAL and COUNT must be integers")
+
+    if not 1 <= interval <= MAX_INTERVAL:
+        raise ValidationException(f"INTERVAL must be between 1 and {MAX_INTERVAL}")
+    if count is not None and not 1 <= count <= MAX_COUNT:
+        raise ValidationException(f"COUNT must be between 1 and {MAX_COUNT}")
+    if count is not None and "UNTIL" in parts:
+        raise ValidationException("COUNT and UNTIL cannot be combined")
+
+    byday = None
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValidationException("BYDAY is only supported with FREQ=WEEKLY")
+        days = parts["BYDAY"].split(",")
+        if any(day not in WEEKDAYS for day in days):
+            raise ValidationException("BYDAY must list weekdays like MO,WE,FR")
+        byday = sorted({WEEKDAYS.index(day) for day in days})
+
+    return {
+        "freq": freq,
+        "interval": interval,
+        "byday": byday,
+        "count": count,
+        "until": _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    }
+
+
+def _period(rule: Dict[str, Any], dtstart: datetime, index: int) -> tuple:
+    """Get (period start, candidate occurrences) for the index-th period of a rule."""
+    freq, step = rule["freq"], rule["interval"] * index
+
+    if freq == "DAILY":
+        day = dtstart + timedelta(days=step)
+        return day, [day]
+
+    if freq == "WEEKLY":
+        week_start = dtstart - timedelta(days=dtstart.weekday()) + timedelta(weeks=step)
+        weekdays = rule["byday"] or [dtstart.weekday()]
+        return week_start, [week_start + timedelta(days=d) for d in weekdays]
+
+    if freq == "MONTHLY":
+        months = dtstart.month - 1 + step
+        year, month = dtstart.year + months // 12, months % 12 + 1
+        period_start = dtstart.replace(year=year, month=month, day=1)
+        if dtstart.day > calendar.monthrange(year, month)[1]:
+            return period_start, []
+        return period_start, [dtstart.replace(year=year, month=month)]
+
+    year = dtstart.year + step
+    period_start = dtstart.replace(year=year, month=1, day=1)
+    if dtstart.month == 2 and dtstart.day == 29 and not calendar.isleap(year):
+        return period_start, []
+    return period_start, [dtstart.replace(year=year)]
+
+
+def _first_period(rule: Dict[str, Any], dtstart: datetime, start: datetime) -> int:
+    """Get the index of a period at or just before `start`, skipping earlier ones without iterating."""
+    if rule["count"] is not None or start <= dtstart:
+        return 0  # COUNT needs every occurrence from the beginning
+
+    freq, interval = rule["freq"], rule["interval"]
+    if freq == "DAILY":
+        elapsed = (start - dtstart).days
+    elif freq == "WEEKLY":
+        elapsed = (start - (dtstart - timedelta(days=dtstart.weekday()))).days // 7
+    elif freq == "MONTHLY":
+        elapsed = (start.year - dtstart.year) * 12 + start.month - dtstart.month
+    else:
+        elapsed = start.year - dtstart.year
+
+    return max(elapsed // interval - 1, 0)
+
+
+def expand(
+    rule: str,
+    dtstart: datetime,
+    start: datetime,
+    end: datetime,
+    exdates: Iterable[datetime] = ()
+) -> List[datetime]:
+    """
+    Expand a recurrence rule into the occurrences inside [start, end).
+
+    Only the requested window is generated (periods before it are skipped
+    arithmetically unless COUNT requires counting from the first one).
+    Expansion stops at the last representable datetime (year 9999).
+
+    Args:
+        rule: RRULE string
+        dtstart: First occurrence (the task's due date)
+        start: Window start (inclusive)
+        end: Window end (exclusive)
+        exdates: Occurrences to leave out (deleted occurrences)
+
+    Returns:
+        Sorted occurrence datetimes
+    """
+    parsed = parse_rrule(rule)
+    excluded = set(exdates)
+    occurrences: List[datetime] = []
+    emitted = 0
+    index = _first_period(parsed, dtstart, start)
+
+    while len(occurrences) < MAX_OCCURRENCES_PER_WINDOW:
+        try:
+            period_start, candidates = _period(parsed, dtstart, index)
+        except (OverflowError, ValueError):
+            break  # Past datetime.max: the rule has no later occurrences
+        if period_start >= end:
+            break
+
+        for occurrence in candidates:
+            if occurrence < dtstart:
+                continue
+            if parsed["until"] and occurrence > parsed["until"]:
+                return occurrences
+            emitted += 1
+            if parsed["count"] and emitted > parsed["count"]:
+                return occurrences
+            if occurrence >= end:
+                return occurrences
+            if occurrence >= start and occurrence not in excluded:
+                occurrences.append(occurrence)
+
+        index += 1
+
+    return occurrences
+
+
+def last_occurrence(rule: str, dtstart: datetime) -> Optional[datetime]:
+    """
+    Get the final occurrence of a bounded rule.
+
+    Args:
+        rule: RRULE string
+        dtstart: First occurrence
+
+    Returns:
+        Last occurrence, or None if the rule repeats forever
+    """
+    parsed = parse_rrule(rule)
+
+    if parsed["until"]:
+        return parsed["until"]
+
+    if parsed["count"]:
+        occurrences = expand(rule, dtstart, dtstart, datetime.max)
+        return occurrences[-1] if occurrences else dtstart
+
+    return None
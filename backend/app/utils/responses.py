@@ -0,0 +1,81 @@
+"""Fast JSON responses rendered with orjson."""
+from functools import lru_cache
+from typing import Any, Dict, List, Type
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Serialize types orjson does not handle natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    Handles ObjectId, datetime and date natively, so MongoDB documents can be
+    returned without walking them through serialize_dates or str(_id) loops.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default)
+
+
+@lru_cache(maxsize=None)
+def _model_fields(model: Type[BaseModel]) -> tuple:
+    """Get (output key, has default, default factory or value) for each model field."""
+    fields = []
+    for name, field in model.model_fields.items():
+        key = field.alias or name
+        if field.is_required():
+            fields.append((key, False, None))
+        elif field.default_factory is not None:
+            fields.append((key, True, field.default_factory))
+        else:
+            fields.append((key, True, lambda value=field.default: value))
+    return tuple(fields)
+
+
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """
+    Build a MongoDB projection selecting only the fields of a response model.
+
+    Args:
+        model: Pydantic response model (e.g. TaskResponse)
+
+    Returns:
+        Projection dict for find()
+    """
+    return {key: 1 for key, _, _ in _model_fields(model)}
+
+
+def trusted_documents(documents: List[Dict[str, Any]], model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """
+    Prepare documents written by our own services for a response without
+    re-validating them through the response model.
+
+    Documents must have been fetched with model_projection(model) so no
+    extra fields leak; missing optional fields are filled with the model's
+    defaults so the payload shape matches the validated path.
+
+    Args:
+        documents: MongoDB documents
+        model: Pydantic response model the documents conform to
+
+    Returns:
+        The same documents, ready for FastJSONResponse
+    """
+    optional_fields = [(key, default) for key, has_default, default in _model_fields(model) if has_default]
+
+    for doc in documents:
+        for key, default in optional_fields:
+            if key not in doc:
+                doc[key] = default()
+
+    return documents
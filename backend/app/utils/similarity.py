@@ -0,0 +1,135 @@
+"""
+Text features for related-note and near-duplicate detection.
+
+Notes are reduced to sparse term frequencies (for TF-IDF cosine ranking)
+and two MinHash signatures: one over the note's distinct terms, banded
+with few rows per band so that topically similar notes share a bucket,
+and one over word shingles, banded with more rows so that only
+near-identical text does. Hashes are stable across processes (BLAKE2b),
+so signatures stored in MongoDB stay comparable.
+"""
+import hashlib
+import math
+import random
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+from app.utils.excerpt import to_plain_text
+
+
+NUM_PERMUTATIONS = 64
+TERM_BAND_ROWS = 2      # 32 bands: candidates from Jaccard ~0.2 up
+SHINGLE_BAND_ROWS = 4   # 16 bands: candidates from Jaccard ~0.6 up
+SHINGLE_SIZE = 3
+MAX_TEXT_LENGTH = 50_000  # Characters of a note considered
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240611)  # Fixed seed: signatures must not change between runs
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_WORD = re.compile(r"[^\W\d_]{2,}|\d{3,}")  # Words of 2+ letters, numbers of 3+ digits
+STOPWORDS = frozenset("""
+    a about above after again all also am an and any are as at be because been before being
+    below between both but by can could did do does doing down during each few for from
+    further had has have having he her here hers him his how if in into is it its just me
+    more most my no nor not now of off on once only or other our out over own same she
+    should so some such than that the their them then there these they this those through
+    to too under until up very was we were what when where which while who whom why will
+    with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split plain text into lowercase words, dropping stopwords."""
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def term_frequencies(tokens: List[str], max_terms: int) -> Dict[str, float]:
+    """
+    Sublinear term frequencies (1 + log count) of the most frequent terms.
+
+    Args:
+        tokens: Note tokens
+        max_terms: Keep at most this many terms
+
+    Returns:
+        Mapping of term to weight
+    """
+    counts = Counter(tokens).most_common(max_terms)
+    return {term: round(1 + math.log(count), 4) for term, count in counts}
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(items: Iterable[str]) -> List[int]:
+    """MinHash signature of a set of strings (empty list for an empty set)."""
+    hashes = {_token_hash(item) for item in items}
+    if not hashes:
+        return []
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def shingles(tokens: List[str]) -> List[str]:
+    """Overlapping word n-grams (the whole text if it is shorter than one shingle)."""
+    if len(tokens) < SHINGLE_SIZE:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+
+
+def lsh_bands(signature: List[int], rows: int, prefix: str) -> List[str]:
+    """Bucket keys of a signature split into bands of `rows` values."""
+    bands = []
+    for band, start in enumerate(range(0, len(signature), rows)):
+        digest = hashlib.blake2b(repr(signature[start:start + rows]).encode(), digest_size=6).hexdigest()
+        bands.append(f"{prefix}{band}:{digest}")
+    return bands
+
+
+def signature_similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of the sets behind two MinHash signatures."""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def cosine(first: Dict[str, float], second: Dict[str, float]) -> float:
+    """Cosine similarity of two sparse vectors."""
+    if len(first) > len(second):
+        first, second = second, first
+    dot = sum(weight * second[term] for term, weight in first.items() if term in second)
+    if not dot:
+        return 0.0
+    norm = math.sqrt(sum(w * w for w in first.values())) * math.sqrt(sum(w * w for w in second.values()))
+    return dot / norm
+
+
+def note_features(title: str, content: str, max_terms: int) -> Dict[str, Any]:
+    """
+    Compute everything stored for a note in the similarity index.
+
+    Args:
+        title: Note title
+        content: Note content (Markdown or JSON rich text)
+        max_terms: Terms kept for the TF-IDF vector
+
+    Returns:
+        Dictionary with terms, termBands, shingleSignature and shingleBands
+        (all empty for a note without words)
+    """
+    title_tokens = tokenize(title or "")
+    content_tokens = tokenize(to_plain_text(content or "", limit=MAX_TEXT_LENGTH))
+    # The title counts twice for topic; duplicates are judged on the text alone
+    terms = term_frequencies(title_tokens * 2 + content_tokens, max_terms)
+    shingle_signature = minhash(shingles(content_tokens or title_tokens))
+    return {
+        "terms": terms,
+        "termBands": lsh_bands(minhash(terms), TERM_BAND_ROWS, "t"),
+        "shingleSignature": shingle_signature,
+        "shingleBands": lsh_bands(shingle_signature, SHINGLE_BAND_ROWS, "s")
+    }
@@ -0,0 +1,90 @@
+"""
+Positional text edits for patch-based note saves.
+
+An edit replaces `delete` characters at `offset` of the base text with
+`insert`. Offsets refer to the base text (not to the text as earlier
+edits left it) and count Unicode code points; edits must be sorted by
+offset and must not overlap. Content hashes are SHA-256 of the UTF-8 text.
+
+diff_edits() produces such edits (line-granular) between two texts; note
+version history stores them as reverse deltas.
+"""
+import difflib
+import hashlib
+from typing import Any, Dict, List
+
+from app.utils.exceptions import ValidationException
+
+
+def content_hash(text: str) -> str:
+    """Get the hex SHA-256 of a text's UTF-8 encoding."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def apply_edits(text: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply positional edits to a base text.
+
+    Args:
+        text: Base text
+        edits: Edits with offset, delete and insert
+
+    Returns:
+        Patched text
+
+    Raises:
+        ValidationException: If an edit is out of range or overlaps the previous one
+    """
+    parts = []
+    cursor = 0
+
+    for edit in edits:
+        offset = edit.get("offset", 0)
+        delete = edit.get("delete", 0)
+        if offset < cursor:
+            raise ValidationException("Edits must be sorted by offset and must not overlap")
+        if offset + delete > len(text):
+            raise ValidationException(f"Edit at offset {offset} runs past the end of the content")
+
+        parts.append(text[cursor:offset])
+        parts.append(edit.get("insert") or "")
+        cursor = offset + delete
+
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+def diff_edits(source: str, target: str) -> List[Dict[str, Any]]:
+    """
+    Compute edits that turn `source` into `target`.
+
+    The diff is taken over lines (keeping line endings), which keeps it
+    fast on long notes; changed lines are replaced whole.
+
+    Args:
+        source: Text the edits apply to
+        target: Text the edits produce
+
+    Returns:
+        Edits for apply_edits(source, edits)
+    """
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+
+    # Character offset where each source line starts
+    offsets = [0]
+    for line in source_lines:
+        offsets.append(offsets[-1] + len(line))
+
+    edits = []
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        edits.append({
+            "offset": offsets[i1],
+            "delete": offsets[i2] - offsets[i1],
+            "insert": "".join(target_lines[j1:j2])
+        })
+
+    return edits
@@ -95,6 +95,41 @@ class TokenManager:
         except (SignatureExpired, BadSignature):
             return None
     
+    def generate_calendar_feed_token(self, user_id: str, feed_key: str) -> str:
+        """
+        Generate a calendar feed token.
+        
+        Feed tokens don't expire; rotating the user's feed key revokes them.
+        
+        Args:
+            user_id: User ID
+            feed_key: User's current calendar feed key
+        
+        Returns:
+            Secure token string
+        """
+        data = {
+            "user_id": user_id,
+            "key": feed_key,
+            "type": "calendar_feed"
+        }
+        return self.serializer.dumps(data, salt="calendar-feed")
+    
+    def verify_calendar_feed_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify calendar feed token.
+        
+        Args:
+            token: Token to verify
+        
+        Returns:
+            Token data if valid, None otherwise
+        """
+        try:
+            return self.serializer.loads(token, salt="calendar-feed")
+        except BadSignature:
+            return None
+    
     @staticmethod
     def generate_refresh_token() -> str:
         """
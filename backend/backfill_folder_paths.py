@@ -0,0 +1,39 @@
+"""
+Give existing folders a materialized path so they can be nested.
+
+Folders created before nesting are top-level folders; this stores that
+explicitly (parentId null, path "/<id>/") so subtree queries find them by
+path. The API treats folders without a path the same way, so this can run
+at any time after deploying.
+
+Usage:
+    python backfill_folder_paths.py
+"""
+
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+
+
+async def backfill():
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[settings.database_name]
+
+    print("Backfilling folder paths...")
+    result = await db.folders.update_many(
+        {"path": {"$exists": False}},
+        [{"$set": {
+            "parentId": None,
+            "path": {"$concat": ["/", {"$toString": "$_id"}, "/"]}
+        }}]
+    )
+
+    print(f"✓ Updated {result.modified_count} folders")
+    print("\n✅ Backfill complete!")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
@@ -0,0 +1,44 @@
+"""
+Store plain-text excerpts on existing notes.
+
+Note listings return a stored excerpt instead of the content. New and
+updated notes get one automatically; run this once to backfill notes
+written before excerpts existed.
+
+Usage:
+    python backfill_note_excerpts.py
+"""
+
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.utils.compression import decompress_content
+from app.utils.excerpt import make_excerpt
+
+
+async def backfill():
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[settings.database_name]
+
+    print("Backfilling note excerpts...")
+    updated = 0
+
+    cursor = db.notes.find({"excerpt": {"$exists": False}}, {"content": 1})
+    async for note in cursor:
+        content = decompress_content(note.get("content")) or ""
+        # Only write if the content hasn't changed since it was read
+        result = await db.notes.update_one(
+            {"_id": note["_id"], "content": note.get("content"), "excerpt": {"$exists": False}},
+            {"$set": {"excerpt": make_excerpt(content, settings.note_excerpt_length)}}
+        )
+        updated += result.modified_count
+
+    print(f"✓ Updated {updated} notes")
+    print("\n✅ Backfill complete!")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
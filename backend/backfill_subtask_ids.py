@@ -0,0 +1,49 @@
+"""
+Give existing subtasks stable IDs.
+
+Subtask endpoints (/tasks/{id}/subtasks/{subtaskId}) address subtasks by ID.
+New and updated tasks get IDs automatically; run this once to backfill
+tasks written before subtask IDs existed.
+
+Usage:
+    python backfill_subtask_ids.py
+"""
+
+import asyncio
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+
+
+async def backfill():
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[settings.database_name]
+
+    print("Backfilling subtask IDs...")
+    updated = 0
+
+    cursor = db.tasks.find(
+        {"subtasks": {"$elemMatch": {"id": {"$exists": False}}}},
+        {"subtasks": 1}
+    )
+    async for task in cursor:
+        subtasks = [
+            {**subtask, "id": subtask.get("id") or str(ObjectId())}
+            for subtask in task["subtasks"]
+        ]
+        # Only write if the checklist hasn't changed since it was read
+        result = await db.tasks.update_one(
+            {"_id": task["_id"], "subtasks": task["subtasks"]},
+            {"$set": {"subtasks": subtasks}}
+        )
+        updated += result.modified_count
+
+    print(f"✓ Updated {updated} tasks")
+    print("\n✅ Backfill complete!")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
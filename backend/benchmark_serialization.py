@@ -0,0 +1,165 @@
+"""
+Benchmark list-response serialization: legacy path vs. orjson fast path.
+
+Measures CPU time per request spent turning MongoDB documents into a JSON
+response body, without touching the database:
+
+- tasks (legacy): str(_id) loop + TaskList response_model validation + JSONResponse
+- tasks (fast):   projection defaults + FastJSONResponse (no re-validation)
+- habits (legacy): serialize_dates + str(_id) loop + JSONResponse
+- habits (fast):   FastJSONResponse
+
+Usage:
+    python benchmark_serialization.py [--sizes 50 500] [--iterations 200]
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.schemas.task import TaskList, TaskResponse  # noqa: E402
+from app.utils.responses import FastJSONResponse, trusted_documents  # noqa: E402
+from app.utils.serializers import serialize_dates  # noqa: E402
+
+
+def make_task(i: int) -> dict:
+    """Build a task document shaped like TaskService.create_task output."""
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "userId": str(ObjectId()),
+        "title": f"Task {i}",
+        "description": "Finish the FastAPI migration and update the docs " * 3,
+        "status": ("todo", "doing", "done")[i % 3],
+        "priority": ("low", "medium", "high")[i % 3],
+        "dueDate": now + timedelta(days=i % 30),
+        "folderId": str(ObjectId()),
+        "teamId": None,
+        "tags": ["work", "backend"],
+        "color": "#aabbcc",
+        "labels": [{"name": "urgent", "color": "#ff0000"}],
+        "position": i,
+        "subtasks": [{"title": f"Step {n}", "completed": n % 2 == 0} for n in range(5)],
+        "attachments": [],
+        "isDeleted": False,
+        "deletedAt": None,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+def make_habit(i: int) -> dict:
+    """Build a habit document shaped like HabitService.get_habits output."""
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "userId": str(ObjectId()),
+        "name": f"Habit {i}",
+        "description": "Daily routine",
+        "category": "health",
+        "frequency": "daily",
+        "goal": 1,
+        "reminderTime": "07:00",
+        "color": "#00ff00",
+        "isActive": True,
+        "sharedWith": [str(ObjectId())],
+        "createdAt": now,
+        "updatedAt": now,
+        "currentStreak": i % 10,
+        "longestStreak": i % 20,
+        "totalCompletions": i,
+        "completedToday": i % 2 == 0,
+    }
+
+
+def task_list_field():
+    """Build the response field FastAPI creates for response_model=TaskList."""
+    return create_model_field(name="Response_get_tasks", type_=TaskList, mode="serialization")
+
+
+def tasks_legacy(docs: list, field) -> bytes:
+    for task in docs:
+        task["_id"] = str(task["_id"])
+    content = asyncio.run(serialize_response(field=field, response_content={"tasks": docs, "total": len(docs)}))
+    return JSONResponse(content=content).body
+
+
+def tasks_fast(docs: list) -> bytes:
+    return FastJSONResponse(content={"tasks": trusted_documents(docs, TaskResponse), "total": len(docs)}).body
+
+
+def habits_legacy(docs: list) -> bytes:
+    habits = serialize_dates(docs)
+    for habit in habits:
+        habit["_id"] = str(habit["_id"])
+    return JSONResponse(content={"habits": habits, "total": len(habits)}).body
+
+
+def habits_fast(docs: list) -> bytes:
+    return FastJSONResponse(content={"habits": docs, "total": len(docs)}).body
+
+
+def measure(fn, batches: list) -> float:
+    """Return mean CPU milliseconds per call, one pre-copied batch per call."""
+    start = time.process_time()
+    for batch in batches:
+        fn(batch)
+    return (time.process_time() - start) * 1000 / len(batches)
+
+
+def measure_async_overhead(iterations: int) -> float:
+    """CPU milliseconds per asyncio.run() call, subtracted from the legacy task path."""
+    async def noop():
+        return None
+    start = time.process_time()
+    for _ in range(iterations):
+        asyncio.run(noop())
+    return (time.process_time() - start) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    field = task_list_field()
+    loop_overhead = measure_async_overhead(args.iterations)
+
+    # Sanity check: both paths produce equivalent payloads
+    sample = [make_task(i) for i in range(3)]
+    legacy = TypeAdapter(TaskList).validate_json(tasks_legacy(copy.deepcopy(sample), field))
+    fast = TypeAdapter(TaskList).validate_json(tasks_fast(copy.deepcopy(sample)))
+    assert legacy == fast, "fast path payload differs from validated payload"
+
+    print(f"{'payload':<10}{'items':>7}{'legacy ms':>12}{'fast ms':>10}{'speedup':>9}")
+    for size in args.sizes:
+        tasks = [make_task(i) for i in range(size)]
+        habits = [make_habit(i) for i in range(size)]
+
+        for name, docs, legacy_fn, fast_fn in (
+            ("tasks", tasks, lambda d: tasks_legacy(d, field), tasks_fast),
+            ("habits", habits, habits_legacy, habits_fast),
+        ):
+            legacy_ms = measure(legacy_fn, [copy.deepcopy(docs) for _ in range(args.iterations)])
+            if name == "tasks":
+                legacy_ms -= loop_overhead
+            fast_ms = measure(fast_fn, [copy.deepcopy(docs) for _ in range(args.iterations)])
+            print(f"{name:<10}{size:>7}{legacy_ms:>12.3f}{fast_ms:>10.3f}{legacy_ms / fast_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
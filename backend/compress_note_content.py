@@ -0,0 +1,110 @@
+"""
+Compress the content of existing large notes and report storage savings.
+
+New and updated notes are compressed automatically once their content
+reaches note_compression_threshold_bytes; run this once to compress notes
+written before that (or after lowering the threshold). --dry-run only
+estimates the savings; --decompress stores all content as plain text again.
+
+Usage:
+    python compress_note_content.py [--dry-run] [--decompress]
+"""
+
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.utils.compression import compress_content, decompress_content
+
+
+async def storage_report(db):
+    """Total document and content sizes of the notes collection."""
+    result = await db.notes.aggregate([
+        {"$group": {
+            "_id": None,
+            "notes": {"$sum": 1},
+            "compressed": {"$sum": {"$cond": [{"$eq": [{"$type": "$content"}, "binData"]}, 1, 0]}},
+            "documentBytes": {"$sum": {"$bsonSize": "$$ROOT"}},
+            "contentBytes": {"$sum": {"$switch": {
+                "branches": [
+                    {"case": {"$eq": [{"$type": "$content"}, "string"]}, "then": {"$strLenBytes": "$content"}},
+                    {"case": {"$eq": [{"$type": "$content"}, "binData"]}, "then": {"$binarySize": "$content"}}
+                ],
+                "default": 0
+            }}}
+        }}
+    ]).to_list(length=1)
+    return result[0] if result else {"notes": 0, "compressed": 0, "documentBytes": 0, "contentBytes": 0}
+
+
+def print_report(label, report):
+    print(
+        f"{label}: {report['notes']} notes ({report['compressed']} compressed), "
+        f"{report['documentBytes'] / 1024 / 1024:.2f} MB in documents, "
+        f"{report['contentBytes'] / 1024 / 1024:.2f} MB of content"
+    )
+
+
+async def migrate(dry_run: bool, decompress: bool):
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[settings.database_name]
+
+    before = await storage_report(db)
+    print_report("Before", before)
+
+    if decompress:
+        query = {"content": {"$type": "binData"}}
+    else:
+        print(f"Compressing note content of {settings.note_compression_threshold_bytes} bytes or more...")
+        query = {
+            "content": {"$type": "string"},
+            "$expr": {"$gte": [{"$strLenBytes": "$content"}, settings.note_compression_threshold_bytes]}
+        }
+
+    updated = 0
+    saved = 0
+    async for note in db.notes.find(query, {"content": 1}):
+        stored = note["content"]
+        if decompress:
+            encoded = decompress_content(stored)
+            saved -= len(encoded.encode("utf-8")) - len(stored)
+        else:
+            encoded = compress_content(stored)
+            if isinstance(encoded, str):
+                continue  # Doesn't compress well enough to be worth it
+            saved += len(stored.encode("utf-8")) - len(encoded)
+
+        if dry_run:
+            updated += 1
+            continue
+
+        # Only write if the content hasn't changed since it was read
+        result = await db.notes.update_one(
+            {"_id": note["_id"], "content": stored},
+            {"$set": {"content": encoded}}
+        )
+        updated += result.modified_count
+
+    verb = "Would update" if dry_run else "Updated"
+    print(f"✓ {verb} {updated} notes ({saved / 1024 / 1024:+.2f} MB saved)")
+
+    if not dry_run:
+        after = await storage_report(db)
+        print_report("After", after)
+        if before["documentBytes"]:
+            change = (before["documentBytes"] - after["documentBytes"]) / before["documentBytes"]
+            print(f"✓ Notes collection data is {change:.1%} smaller")
+
+    print("\n✅ Done!")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress stored note content")
+    parser.add_argument("--dry-run", action="store_true", help="Estimate savings without writing")
+    parser.add_argument("--decompress", action="store_true", help="Store all content as plain text again")
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.dry_run, args.decompress))
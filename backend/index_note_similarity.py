@@ -0,0 +1,35 @@
+"""
+Rebuild the related-notes index (note_similarity, note_term_df) from the notes collection.
+
+Notes are indexed in the background as they change; run this once after
+deploying related notes to index existing notes, or after changing
+note_similarity_max_terms.
+
+Usage:
+    python index_note_similarity.py
+"""
+
+import asyncio
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.services.note_similarity_service import NoteSimilarityService
+
+
+async def rebuild():
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[settings.database_name]
+
+    print("Indexing notes for related-note and duplicate detection...")
+    started = time.perf_counter()
+    indexed = await NoteSimilarityService(db).rebuild()
+
+    print(f"✓ Indexed {indexed} notes in {time.perf_counter() - started:.1f}s")
+    print("\n✅ Done")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
@@ -47,6 +47,127 @@ async def create_indexes():
     await db.security_logs.create_index([("userId", 1), ("timestamp", -1)])
     print("✓ Security logs indexes created")
     
+    # Collection versions (ETag counters for list endpoints)
+    await db.collection_versions.create_index([("userId", 1), ("collection", 1)], unique=True)
+    print("✓ Collection versions indexes created")
+    
+    # Delta sync: changed-since scans per owner/collaborator, plus tombstones
+    await db.tasks.create_index([("userId", 1), ("updatedAt", 1)])
+    await db.tasks.create_index([("collaborators.userId", 1), ("updatedAt", 1)])
+    await db.notes.create_index([("userId", 1), ("updatedAt", 1)])
+    await db.notes.create_index([("collaborators.userId", 1), ("updatedAt", 1)])
+    await db.folders.create_index([("userId", 1), ("updatedAt", 1)])
+    await db.habits.create_index([("userId", 1), ("updatedAt", 1)])
+    await db.habits.create_index([("sharedWith", 1), ("updatedAt", 1)])
+    await db.sync_tombstones.create_index([("userId", 1), ("deletedAt", 1)])
+    await db.sync_tombstones.create_index(
+        "deletedAt",
+        name="deletedAt_ttl",
+        expireAfterSeconds=settings.sync_tombstone_retention_days * 86400
+    )  # TTL index
+    print("✓ Sync indexes created")
+    
+    # Trash purge: partial indexes only cover trashed documents
+    await db.tasks.create_index(
+        "deletedAt",
+        name="trash_deletedAt",
+        partialFilterExpression={"isDeleted": True}
+    )
+    await db.notes.create_index(
+        "deletedAt",
+        name="trash_deletedAt",
+        partialFilterExpression={"isDeleted": True}
+    )
+    print("✓ Trash purge indexes created")
+    
+    # Kanban board: per-column keyset pages ordered by position
+    await db.tasks.create_index([("userId", 1), ("status", 1), ("position", 1), ("_id", 1)])
+    await db.tasks.create_index([("collaborators.userId", 1), ("status", 1), ("position", 1), ("_id", 1)])
+    print("✓ Board indexes created")
+    
+    # Calendar: due-date range queries per owner/collaborator
+    await db.tasks.create_index([("userId", 1), ("dueDate", 1)])
+    await db.tasks.create_index([("collaborators.userId", 1), ("dueDate", 1)])
+    print("✓ Calendar indexes created")
+    
+    # Recurring tasks: series lookups per window, one stored doc per changed occurrence
+    await db.tasks.create_index(
+        [("userId", 1), ("dueDate", 1)],
+        name="recurring_userId_dueDate",
+        partialFilterExpression={"recurrence": {"$type": "string"}}
+    )
+    await db.tasks.create_index(
+        [("recurrenceId", 1), ("occurrenceDate", 1)],
+        unique=True,
+        partialFilterExpression={"recurrenceId": {"$exists": True}}
+    )
+    print("✓ Recurring task indexes created")
+    
+    # Due date reminders: scheduler seeds from a dueDate range scan
+    await db.tasks.create_index("dueDate", partialFilterExpression={"dueDate": {"$type": "date"}})
+    print("✓ Due date indexes created")
+    
+    # Attachment blobs are keyed by content hash (_id); find unreferenced ones
+    await db.attachment_blobs.create_index("refCount")
+    print("✓ Attachment blob indexes created")
+    
+    # Team task listing (keyset on status, position) and assignee workload
+    await db.tasks.create_index([("teamId", 1), ("status", 1), ("position", 1), ("_id", 1)])
+    await db.tasks.create_index([("teamId", 1), ("collaborators.userId", 1)])
+    print("✓ Team task indexes created")
+    
+    # Task analytics: rollups are read per scope over a date range
+    await db.task_daily_rollups.create_index([("scope", 1), ("scopeId", 1), ("date", 1)])
+    await db.task_daily_rollups.create_index("rebuiltAt")
+    print("✓ Task analytics rollup indexes created")
+    
+    # Smart lists: per-user lookups on every task write, daily rebuild of relative windows
+    await db.smart_lists.create_index([("userId", 1), ("createdAt", 1)])
+    await db.smart_lists.create_index(
+        "evaluatedOn",
+        name="relative_evaluatedOn",
+        partialFilterExpression={"filters.dueWithinDays": {"$type": "number"}}
+    )
+    print("✓ Smart list indexes created")
+    
+    # Note history: one document per recorded version, read newest first
+    await db.note_versions.create_index([("noteId", 1), ("version", -1)], unique=True)
+    await db.note_versions.create_index(
+        "createdAt",
+        name="createdAt_ttl",
+        expireAfterSeconds=settings.note_history_retention_days * 86400
+    )  # TTL index
+    print("✓ Note history indexes created")
+    
+    # Collaborative editing: CRDT state per note (_id is the note ID)
+    await db.note_collab_states.create_index(
+        "updatedAt",
+        name="updatedAt_ttl",
+        expireAfterSeconds=settings.collab_state_retention_days * 86400
+    )  # TTL index
+    print("✓ Collaborative editing indexes created")
+    
+    # Tag index: counts per (user, tag), prefix autocomplete on the lowercase key;
+    # multikey indexes for tag filters on notes and tasks
+    await db.user_tags.create_index([("userId", 1), ("tag", 1)], unique=True)
+    await db.user_tags.create_index([("userId", 1), ("key", 1)])
+    await db.notes.create_index([("userId", 1), ("tags", 1)])
+    await db.tasks.create_index([("userId", 1), ("tags", 1)])
+    print("✓ Tag indexes created")
+    
+    # Related notes: LSH bucket lookups per user (multikey); document frequencies per term
+    await db.note_similarity.create_index([("userId", 1), ("termBands", 1)])
+    await db.note_similarity.create_index([("userId", 1), ("shingleBands", 1)])
+    await db.note_term_df.create_index([("userId", 1), ("term", 1)], unique=True)
+    print("✓ Related notes indexes created")
+    
+    # Nested folders: subtree lookups are anchored prefix scans on the materialized path;
+    # folder contents are fetched by folderId
+    await db.folders.create_index("path")
+    await db.tasks.create_index([("userId", 1), ("folderId", 1)])
+    await db.notes.create_index([("userId", 1), ("folderId", 1)])
+    print("✓ Folder tree indexes created")
+    
     print("\n✅ All indexes created successfully!")
     
     client.close()
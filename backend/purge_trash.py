@@ -0,0 +1,46 @@
+"""
+Purge trashed tasks and notes older than the trash retention period.
+
+The API server already runs this periodically; use this script for a
+one-off purge or to preview what would be removed.
+
+Usage:
+    python purge_trash.py [--dry-run] [--retention-days N] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.services.trash_service import TrashPurgeService
+
+
+async def purge(dry_run: bool, retention_days: int, batch_size: int):
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[settings.database_name]
+
+    print(f"{'Previewing' if dry_run else 'Purging'} trash older than {retention_days} days...")
+    report = await TrashPurgeService(db).purge_expired(
+        dry_run=dry_run,
+        retention_days=retention_days,
+        batch_size=batch_size
+    )
+
+    verb = "Would purge" if dry_run else "Purged"
+    for collection, count in report["purged"].items():
+        print(f"✓ {verb} {count} {collection}")
+    print(f"✓ {'Would remove' if dry_run else 'Removed'} {report['filesRemoved']} attachment files")
+    print(f"\n✅ Done in {report['durationMs']} ms ({report['batches']} batches)")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge expired trash")
+    parser.add_argument("--dry-run", action="store_true", help="Report without deleting")
+    parser.add_argument("--retention-days", type=int, default=settings.trash_retention_days)
+    parser.add_argument("--batch-size", type=int, default=settings.trash_purge_batch_size)
+    args = parser.parse_args()
+
+    asyncio.run(purge(args.dry_run, args.retention_days, args.batch_size))
@@ -0,0 +1,33 @@
+"""
+Rebuild the task analytics rollups (task_daily_rollups) from the tasks collection.
+
+The API server reconciles the rollups nightly; run this once after
+deploying task analytics to backfill history, or after bulk data changes.
+
+Usage:
+    python rebuild_task_rollups.py
+"""
+
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.services.task_analytics_service import TaskAnalyticsService
+
+
+async def rebuild():
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[settings.database_name]
+
+    print("Rebuilding task analytics rollups...")
+    report = await TaskAnalyticsService(db).reconcile()
+
+    print(f"✓ Scanned {report['tasksScanned']} tasks")
+    print(f"✓ Wrote {report['rollupsWritten']} daily rollups")
+    print("\n✅ Done")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
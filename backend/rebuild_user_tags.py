@@ -0,0 +1,38 @@
+"""
+Rebuild the per-user tag counts (user_tags) from the notes and tasks collections.
+
+Counts are maintained as notes and tasks change; run this once after
+deploying the tag index to backfill it, or after bulk data changes.
+
+Usage:
+    python rebuild_user_tags.py [--user-id ID]
+"""
+
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.services.tag_index_service import TagIndexService
+
+
+async def rebuild(user_id):
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[settings.database_name]
+
+    print(f"Rebuilding tag counts{f' for user {user_id}' if user_id else ''}...")
+    report = await TagIndexService(db).rebuild(user_id)
+
+    print(f"✓ Wrote {report['tagsWritten']} tags")
+    print(f"✓ Removed {report['tagsRemoved']} unused tags")
+    print("\n✅ Done")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-user tag counts")
+    parser.add_argument("--user-id", help="Only rebuild this user's tags")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild(args.user_id))
@@ -1,12 +1,12 @@
 import apiClient from './config';
-import { Note, NoteCreate, NoteUpdate, NoteCollaborator, MessageResponse } from '@/types/api';
+import { Note, NoteSummary, NoteCreate, NoteUpdate, NoteCollaborator, MessageResponse } from '@/types/api';
 
 // ============================================
 // Notes API
 // ============================================
 
 /**
- * Get all notes with optional filters
+ * Get all notes with optional filters, as summaries (load content with getNote)
  */
 export const getNotes = async (params?: {
   folderId?: string;
@@ -14,16 +14,18 @@ export const getNotes = async (params?: {
   isPinned?: boolean;
   isArchived?: boolean;
   isFavorite?: boolean;
-}): Promise<Note[]> => {
-  const response = await apiClient.get<{ notes: Note[]; total: number }>('/notes', { params });
+}): Promise<NoteSummary[]> => {
+  const response = await apiClient.get<{ notes: NoteSummary[]; total: number }>('/notes', {
+    params: { ...params, view: 'summary' },
+  });
   return response.data.notes;
 };
 
 /**
- * Get favorite notes
+ * Get favorite notes, as summaries (load content with getNote)
  */
-export const getFavoriteNotes = async (): Promise<Note[]> => {
-  const response = await apiClient.get<{ notes: Note[]; total: number }>('/notes/favorites');
+export const getFavoriteNotes = async (): Promise<NoteSummary[]> => {
+  const response = await apiClient.get<{ notes: NoteSummary[]; total: number }>('/notes/favorites');
   return response.data.notes;
 };
 
@@ -51,7 +51,7 @@ import * as tasksApi from '@/lib/api/tasks';
 import * as notesApi from '@/lib/api/notes';
 import * as habitsApi from '@/lib/api/habits';
 import { toast } from 'sonner';
-import type { AnalyticsSummary, SocialFeedItem, Task, Note, Habit, StreakInfo } from '@/types/api';
+import type { AnalyticsSummary, SocialFeedItem, Task, NoteSummary, Habit, StreakInfo } from '@/types/api';
 
 const container = {
   hidden: { opacity: 0 },
@@ -100,7 +100,7 @@ export default function DashboardPage() {
   const [categoryData, setCategoryData] = useState<Array<{ name: string; value: number }>>([]);
   const [tasks, setTasks] = useState<Task[]>([]);
   const [habits, setHabits] = useState<Habit[]>([]);
-  const [notes, setNotes] = useState<Note[]>([]);
+  const [notes, setNotes] = useState<NoteSummary[]>([]);
   const [loading, setLoading] = useState(true);
   const [timeRange, setTimeRange] = useState<'week' | 'month' | 'year'>('week');
 
@@ -149,7 +149,7 @@ export default function DashboardPage() {
   };
 
   // Generate weekly chart data
-  const generateWeeklyData = (tasks: Task[], habits: Habit[], notes: Note[]) => {
+  const generateWeeklyData = (tasks: Task[], habits: Habit[], notes: NoteSummary[]) => {
     const days = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
     const today = new Date();
     const weekData = [];
@@ -176,7 +176,7 @@ export default function DashboardPage() {
         }).length;
 
         // Count notes created on this day
-        const notesCount = notes.filter((n: Note) => {
+        const notesCount = notes.filter((n: NoteSummary) => {
           if (!n.createdAt) return false;
           const noteDate = new Date(n.createdAt);
           noteDate.setHours(0, 0, 0, 0);
@@ -245,7 +245,7 @@ export default function DashboardPage() {
         }).length;
 
         // Count notes created in this period
-        const notesCount = notes.filter((n: Note) => {
+        const notesCount = notes.filter((n: NoteSummary) => {
           if (!n.createdAt) return false;
           const noteDate = new Date(n.createdAt);
           return noteDate >= startDate && noteDate <= endDate;
@@ -25,7 +25,7 @@ import { PageHeader } from '@/components/layout/PageHeader';
 import { cn } from '@/lib/utils';
 import * as notesApi from '@/lib/api/notes';
 import { toast } from 'sonner';
-import { Note, NoteCreate, NoteUpdate } from '@/types/api';
+import { Note, NoteSummary, NoteCreate, NoteUpdate } from '@/types/api';
 import { NoteDialog } from '@/components/notes/NoteDialog';
 import { NoteViewDialog } from '@/components/notes/NoteViewDialog';
 
@@ -112,12 +112,12 @@ const mockNotes: Partial<UiNote>[] = [
 ];
 
 interface NoteCardProps {
-  note: UiNote | Note;
+  note: NoteSummary;
   onPin: (id: string) => void;
   onFavorite: (id: string) => void;
   onDelete: (id: string) => void;
-  onEdit: (note: Note) => void;
-  onView: (note: Note) => void;
+  onEdit: (note: NoteSummary) => void;
+  onView: (note: NoteSummary) => void;
 }
 
 function NoteCard({ note, onPin, onFavorite, onDelete, onEdit, onView }: NoteCardProps) {
@@ -128,7 +128,7 @@ function NoteCard({ note, onPin, onFavorite, onDelete, onEdit, onView }: NoteCar
       animate={{ opacity: 1, scale: 1 }}
       exit={{ opacity: 0, scale: 0.95 }}
       whileHover={{ y: -2 }}
-      onClick={() => onView(note as Note)}
+      onClick={() => onView(note)}
       className={cn(
         "group p-4 rounded-xl border bg-card transition-all duration-200 cursor-pointer",
         "hover:shadow-md hover:border-primary/30"
@@ -178,7 +178,7 @@ function NoteCard({ note, onPin, onFavorite, onDelete, onEdit, onView }: NoteCar
               <DropdownMenuItem 
                 onClick={(e) => {
                   e.stopPropagation();
-                  onEdit(note as Note);
+                  onEdit(note);
                 }}
               >
                 <Edit className="h-4 w-4 mr-2" />
@@ -201,7 +201,7 @@ function NoteCard({ note, onPin, onFavorite, onDelete, onEdit, onView }: NoteCar
       </div>
 
       <p className="text-xs text-muted-foreground line-clamp-3 mb-3 whitespace-pre-line">
-        {note.content.replace(/[#*`\[\]]/g, '').slice(0, 150)}
+        {note.excerpt}
       </p>
 
       <div className="flex items-center gap-2">
@@ -219,7 +219,7 @@ function NoteCard({ note, onPin, onFavorite, onDelete, onEdit, onView }: NoteCar
 }
 
 export default function NotesPage() {
-  const [notes, setNotes] = useState<Note[]>([]);
+  const [notes, setNotes] = useState<NoteSummary[]>([]);
   const [loading, setLoading] = useState(true);
   const [searchQuery, setSearchQuery] = useState('');
   const [view, setView] = useState<'grid' | 'list'>('grid');
@@ -299,14 +299,29 @@ export default function NotesPage() {
     }
   };
 
-  const handleView = (note: Note) => {
-    setSelectedNote(note);
+  // List items are summaries: load the full note before showing or editing it
+  const loadNote = async (id: string): Promise<Note | null> => {
+    try {
+      return await notesApi.getNote(id);
+    } catch (error) {
+      console.error('Failed to load note:', error);
+      toast.error('Failed to load note');
+      return null;
+    }
+  };
+
+  const handleView = async (note: NoteSummary) => {
+    const fullNote = await loadNote(note._id);
+    if (!fullNote) return;
+    setSelectedNote(fullNote);
     setViewDialogOpen(true);
   };
 
-  const handleEdit = (note: Note) => {
+  const handleEdit = async (note: NoteSummary | Note) => {
+    const fullNote = await loadNote(note._id);
+    if (!fullNote) return;
     setViewDialogOpen(false); // Close view dialog if open
-    setSelectedNote(note);
+    setSelectedNote(fullNote);
     setEditDialogOpen(true);
   };
 
@@ -334,12 +349,10 @@ export default function NotesPage() {
     }
   };
 
-  const filteredNotes = notes
-    .filter((note) => !note.isDeleted)
-    .filter((note) =>
-      note.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-      note.content.toLowerCase().includes(searchQuery.toLowerCase())
-    );
+  const filteredNotes = notes.filter((note) =>
+    note.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
+    note.excerpt.toLowerCase().includes(searchQuery.toLowerCase())
+  );
 
   const pinnedNotes = filteredNotes.filter((note) => note.isPinned);
   const otherNotes = filteredNotes.filter((note) => !note.isPinned);
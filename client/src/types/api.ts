@@ -174,6 +174,21 @@ export interface Note {
   deletedAt?: string;
 }
 
+// Note as returned by list endpoints with view=summary (no content)
+export interface NoteSummary {
+  _id: string;
+  title: string;
+  excerpt: string;  // Plain-text start of the content
+  folderId?: string;
+  tags?: string[];
+  color?: string;
+  isPinned: boolean;
+  isFavorite: boolean;
+  userId: string;
+  createdAt: string;
+  updatedAt: string;
+}
+
 export interface NoteCollaborator {
   userId: string;
   email: string;